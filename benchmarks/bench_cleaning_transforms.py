@@ -0,0 +1,143 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+# Make the pipeline scripts importable (パイプラインのスクリプトをインポート可能にする)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+
+from clean_revenue_data import clean_revenue_data  # noqa: E402
+from clean_station_data import normalize_station_lines  # noqa: E402
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000, 10_000_000]
+
+# Row-wise baselines are skipped above this size; they take minutes at 10M rows.
+# 行単位のベースラインはこのサイズを超えると省略します（1,000万行では数分かかるため）。
+DEFAULT_MAX_ROWWISE_ROWS = 100_000
+
+LINE_PREFIXES = np.array(["A", "C", "E", "F", "G", "H", "I", "M", "Mb", "N", "S", "T", "Y", "Z"])
+
+
+def make_station_rows(row_count, seed=0):
+    """
+    Generate synthetic station rows with a realistic share of Mb branch stations.
+    (丸ノ内線分岐線の駅を現実的な割合で含む合成駅データを生成します)
+    """
+    rng = np.random.default_rng(seed)
+    prefixes = LINE_PREFIXES[rng.integers(0, len(LINE_PREFIXES), row_count)]
+    numbers = pd.Series(rng.integers(1, 100, row_count)).astype(str).str.zfill(2)
+    station_ids = pd.Series(prefixes) + numbers
+    return pd.DataFrame({
+        "Station_ID": station_ids,
+        "Line_IDs": pd.Series(prefixes).where(prefixes != "Mb", "M, Mb"),
+        "Line_Names_En": "Some Line",
+        "Line_Names_Jp": "某線",
+    })
+
+
+def make_revenue_rows(row_count, seed=0):
+    """
+    Generate synthetic monthly revenue rows in the processed CSV layout.
+    (processed CSV と同じ列構成の合成月次収入データを生成します)
+    """
+    rng = np.random.default_rng(seed)
+    revenue = rng.integers(5_000, 40_000, (row_count, 3))
+    yoy = rng.normal(5.0, 10.0, (row_count, 3)).round(1)
+    return pd.DataFrame({
+        "Fiscal Year": rng.integers(2000, 2030, row_count),
+        "Fiscal Month": rng.integers(1, 13, row_count),
+        "Commuter Revenue": revenue[:, 0],
+        "Commuter YoY (%)": yoy[:, 0],
+        "Non-Commuter Revenue": revenue[:, 1],
+        "Non-Commuter YoY (%)": yoy[:, 1],
+        "Total Revenue": revenue[:, 2],
+        "Total YoY (%)": yoy[:, 2],
+    })
+
+
+def rowwise_normalize_station_lines(station_data):
+    """Previous row-wise implementation, kept as the baseline. (比較用の旧・行単位実装)"""
+    def normalize(row):
+        if str(row["Station_ID"]).strip().startswith("Mb"):
+            row["Line_IDs"] = "Mb"
+            row["Line_Names_En"] = "Marunouchi Line Branch Line"
+            row["Line_Names_Jp"] = "丸ノ内線分岐線"
+        return row
+    return station_data.apply(normalize, axis=1)
+
+
+def rowwise_calendar_year(revenue_data):
+    """Previous row-wise implementation, kept as the baseline. (比較用の旧・行単位実装)"""
+    return revenue_data.apply(
+        lambda row: row["Fiscal Year"] if row["Fiscal Month"] > 9 else row["Fiscal Year"] - 1,
+        axis=1,
+    )
+
+
+def time_call(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def run(sizes, max_rowwise_rows):
+    """
+    Time the vectorized transforms (and the row-wise baselines up to a size limit).
+    (ベクトル化した変換と、上限サイズまでの行単位ベースラインの処理時間を計測します)
+    """
+    results = []
+    for size in sizes:
+        stations = make_station_rows(size)
+        revenue = make_revenue_rows(size)
+
+        station_seconds, normalized = time_call(normalize_station_lines, stations.copy())
+        revenue_seconds, cleaned = time_call(clean_revenue_data, revenue.copy())
+        row = {
+            "rows": size,
+            "station_vectorized_s": station_seconds,
+            "revenue_vectorized_s": revenue_seconds,
+            "station_rowwise_s": None,
+            "revenue_rowwise_s": None,
+        }
+
+        if size <= max_rowwise_rows:
+            row["station_rowwise_s"], expected = time_call(rowwise_normalize_station_lines, stations.copy())
+            row["revenue_rowwise_s"], expected_years = time_call(rowwise_calendar_year, revenue)
+            # Both implementations must agree (両実装の結果が一致することを確認)
+            pd.testing.assert_frame_equal(normalized, expected, check_dtype=False)
+            assert (cleaned["Calendar_Year"].to_numpy() == expected_years.to_numpy()).all()
+
+        results.append(row)
+        print(format_row(row), flush=True)
+    return results
+
+
+def format_row(row):
+    def fmt(seconds):
+        return "        -" if seconds is None else f"{seconds:8.3f}s"
+
+    return (
+        f"{row['rows']:>11,} | station: vectorized {fmt(row['station_vectorized_s'])}"
+        f" row-wise {fmt(row['station_rowwise_s'])}"
+        f" | revenue: vectorized {fmt(row['revenue_vectorized_s'])}"
+        f" row-wise {fmt(row['revenue_rowwise_s'])}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the vectorized cleaning transforms. (ベクトル化したクリーニング変換のベンチマーク)"
+    )
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES,
+                        help="Synthetic row counts to benchmark. (計測する合成データの行数)")
+    parser.add_argument("--max-rowwise-rows", type=int, default=DEFAULT_MAX_ROWWISE_ROWS,
+                        help="Largest size at which the row-wise baseline also runs. (行単位ベースラインを実行する最大行数)")
+    args = parser.parse_args()
+    run(args.sizes, args.max_rowwise_rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import pandas as pd
+
+# Make the pipeline scripts importable (パイプラインのスクリプトをインポート可能にする)
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, os.path.join(ROOT, "scripts"))
+
+from clean_passenger_data import clean_passenger_data  # noqa: E402
+from clean_revenue_data import clean_revenue_data  # noqa: E402
+from clean_station_data import build_station_lines, clean_station_data  # noqa: E402
+from create_line_data import create_lines_table  # noqa: E402
+from import_data_to_sqlite import TABLE_KEYS, load_csv_to_table, reset_database  # noqa: E402
+from synthetic_data import DEFAULT_SEED, generate_dataset  # noqa: E402
+from validate_cleaned_data import ensure_valid, validate_cleaned_tables  # noqa: E402
+
+SCHEMA_PATH = os.path.join(ROOT, "sql", "create_schema.sql")
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+BASELINE_PATH = os.path.join(BENCH_DIR, "baseline_pipeline.json")
+
+# 100,000× (29M station rows) needs tens of GB of memory, so it is opt-in.
+# 100,000倍（駅2,900万行）は数十GBのメモリを要するため、明示的に指定した場合のみ実行します。
+DEFAULT_SCALES = [10, 1_000]
+DEFAULT_REPEAT = 3
+
+# A stage regresses when it is slower or larger than the baseline by more than
+# the tolerance and by more than the noise floor.
+# ベースラインより許容率とノイズ下限の両方を超えて遅い・大きい場合に劣化と判定します。
+DEFAULT_TOLERANCE = 0.25
+NOISE_FLOOR_SECONDS = 0.05
+NOISE_FLOOR_MB = 1.0
+
+
+def write_load_inputs(outputs, workdir):
+    """
+    Write the cleaned frames as the CSVs load_csv_to_table reads.
+    (load_csv_to_table が読み込むクリーン済みCSVを書き出します)
+    """
+    frames = [
+        ("Lines", outputs["create_lines"]),
+        ("Stations", outputs["clean_station"]),
+        ("StationLines", build_station_lines(outputs["clean_station"])),
+        ("Passengers", outputs["clean_passenger"]),
+        ("Revenue", outputs["clean_revenue"]),
+    ]
+    paths = []
+    for table_name, frame in frames:
+        path = os.path.join(workdir, f"{table_name}.csv")
+        frame.to_csv(path, index=False)
+        paths.append((table_name, path))
+    return paths
+
+
+def load_sqlite(db_path, table_paths):
+    """Create the schema and load every table. (スキーマを作成し全テーブルを読み込みます)"""
+    conn = reset_database(db_path, SCHEMA_PATH)
+    try:
+        for table_name, path in table_paths:
+            load_csv_to_table(conn, table_name, path)
+    finally:
+        conn.close()
+
+
+def validate_inputs(db_path, table_paths):
+    """Check the load inputs against the schema. (読み込み入力をスキーマで検証します)"""
+    ensure_valid(validate_cleaned_tables(table_paths, SCHEMA_PATH, table_keys=TABLE_KEYS))
+
+
+def build_stages(dataset, outputs, workdir):
+    """
+    Return (name, input rows, function, argument factory) for each stage. Argument
+    factories run outside the timed region and hand each run fresh copies,
+    because the cleaning functions modify their inputs.
+    (各ステージの (名前, 入力行数, 関数, 引数生成関数) を返します。クリーニング関数は
+    入力を書き換えるため、引数生成は計測対象外で毎回新しいコピーを渡します)
+    """
+    db_path = os.path.join(workdir, "bench.db")
+    table_paths = []
+
+    def load_args():
+        if not table_paths:
+            table_paths.extend(write_load_inputs(outputs, workdir))
+        return db_path, table_paths
+
+    return [
+        ("clean_station", len(dataset["stations"]), clean_station_data,
+         lambda: (dataset["stations"].copy(),)),
+        ("clean_passenger", len(dataset["passengers"]), clean_passenger_data,
+         lambda: (dataset["passengers"].copy(), dataset["stations"].copy())),
+        ("clean_revenue", len(dataset["revenue"]), clean_revenue_data,
+         lambda: (dataset["revenue"].copy(),)),
+        ("create_lines", len(dataset["stations"]), create_lines_table,
+         lambda: (outputs["clean_station"],)),
+        ("validate", len(dataset["stations"]) + len(dataset["passengers"]) + len(dataset["revenue"]),
+         validate_inputs, load_args),
+        ("load_sqlite", len(dataset["stations"]) + len(dataset["passengers"]) + len(dataset["revenue"]),
+         load_sqlite, load_args),
+    ]
+
+
+def measure(func, make_args, repeat, measure_memory):
+    """
+    Return (fastest seconds, peak traced MB, result). Memory is measured in a
+    separate traced run so tracing does not slow the timed runs.
+    (最速の秒数・トレースしたピークMB・結果を返します。計測を遅くしないよう、メモリは
+    別のトレース実行で計測します)
+    """
+    timings = []
+    result = None
+    for _ in range(repeat):
+        args = make_args()
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            result = func(*args)
+            timings.append(time.perf_counter() - start)
+
+    peak_mb = None
+    if measure_memory:
+        args = make_args()
+        tracemalloc.start()
+        try:
+            baseline, _ = tracemalloc.get_traced_memory()
+            with contextlib.redirect_stdout(io.StringIO()):
+                func(*args)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        peak_mb = (peak - baseline) / 1024 / 1024
+    return min(timings), peak_mb, result
+
+
+def run(scales, repeat=DEFAULT_REPEAT, seed=DEFAULT_SEED, measure_memory=True):
+    """
+    Benchmark every stage at each scale factor.
+    (各倍率で全ステージのベンチマークを実行します)
+    Returns:
+        list: One dict per (scale, stage) (倍率・ステージごとの結果)
+    """
+    results = []
+    for scale in scales:
+        start = time.perf_counter()
+        dataset = generate_dataset(scale, seed)
+        print(f"Generated {scale:,}× data in {time.perf_counter() - start:.2f}s. "
+              f"({scale:,}倍のデータを生成しました)", flush=True)
+
+        outputs = {}
+        with tempfile.TemporaryDirectory() as workdir:
+            for name, rows, func, make_args in build_stages(dataset, outputs, workdir):
+                seconds, peak_mb, outputs[name] = measure(func, make_args, repeat, measure_memory)
+                row = {"scale": scale, "stage": name, "rows": rows, "seconds": seconds, "peak_mb": peak_mb}
+                results.append(row)
+                print(format_row(row), flush=True)
+    return results
+
+
+def format_row(row):
+    memory = "      -" if row["peak_mb"] is None else f"{row['peak_mb']:7.1f}"
+    rate = row["rows"] / row["seconds"] if row["seconds"] > 0 else float("inf")
+    return (
+        f"{row['scale']:>8,}× {row['stage']:<16} {row['rows']:>12,} rows "
+        f"{row['seconds']:9.4f}s {rate:>14,.0f} rows/s {memory} MB peak"
+    )
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    Return the (scale, stage) results that regressed against the baseline.
+    (ベースラインと比べて劣化した (倍率, ステージ) の結果を返します)
+    """
+    previous = {(row["scale"], row["stage"]): row for row in baseline["results"]}
+    regressions = []
+    for row in results:
+        before = previous.get((row["scale"], row["stage"]))
+        if before is None:
+            continue
+        checks = [("seconds", NOISE_FLOOR_SECONDS), ("peak_mb", NOISE_FLOOR_MB)]
+        for metric, floor in checks:
+            old, new = before.get(metric), row.get(metric)
+            if old is None or new is None:
+                continue
+            if new > old * (1 + tolerance) and new - old > floor:
+                regressions.append({
+                    "scale": row["scale"], "stage": row["stage"], "metric": metric,
+                    "baseline": old, "current": new, "change": (new - old) / old if old else float("inf"),
+                })
+    return regressions
+
+
+def write_json(path, payload):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(payload, file, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the pipeline stages on synthetic data. (合成データでパイプラインの各ステージを計測します)"
+    )
+    parser.add_argument("--scales", type=int, nargs="+", default=DEFAULT_SCALES,
+                        help="Multiples of the real row counts, e.g. 10 1000 100000. (実データ行数の倍率)")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT,
+                        help="Timed runs per stage; the fastest is kept. (ステージごとの計測回数。最速値を採用)")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="Generator seed. (生成の乱数シード)")
+    parser.add_argument("--no-memory", action="store_true", help="Skip peak memory measurement. (ピークメモリを計測しない)")
+    parser.add_argument("--output", help="Results JSON path. Default: benchmarks/results/<timestamp>.json (結果JSONのパス)")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Baseline JSON to compare with. (比較するベースライン)")
+    parser.add_argument("--save-baseline", action="store_true", help="Save these results as the baseline. (結果をベースラインとして保存)")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="Allowed slowdown or growth before flagging, e.g. 0.25 = 25%%. (劣化とみなす許容率)")
+    args = parser.parse_args()
+
+    results = run(args.scales, args.repeat, args.seed, not args.no_memory)
+    created = datetime.now(timezone.utc)
+    payload = {
+        "created": created.isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "platform": platform.platform(),
+        "seed": args.seed,
+        "repeat": args.repeat,
+        "results": results,
+    }
+
+    output_path = args.output or os.path.join(RESULTS_DIR, f"pipeline-{created:%Y%m%dT%H%M%SZ}.json")
+    write_json(output_path, payload)
+    print(f"Results saved to {output_path}. (結果を {output_path} に保存しました)")
+
+    if args.save_baseline:
+        write_json(args.baseline, payload)
+        print(f"Baseline saved to {args.baseline}. (ベースラインを {args.baseline} に保存しました)")
+        return
+    if not os.path.exists(args.baseline):
+        print("No baseline to compare with; use --save-baseline. (比較するベースラインがありません)")
+        return
+
+    with open(args.baseline, "r", encoding="utf-8") as file:
+        regressions = compare(results, json.load(file), args.tolerance)
+    for regression in regressions:
+        print(
+            f"REGRESSION {regression['scale']:,}× {regression['stage']} {regression['metric']}: "
+            f"{regression['baseline']:.4f} → {regression['current']:.4f} ({regression['change']:+.0%}) (性能劣化)"
+        )
+    if regressions:
+        sys.exit(1)
+    print("No regressions against the baseline. (ベースラインに対する劣化はありません)")
+
+
+if __name__ == "__main__":
+    main()
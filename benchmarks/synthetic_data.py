@@ -0,0 +1,135 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+# Row counts of the real inputs; scale factors multiply these.
+# 実データの行数。スケール倍率はこの値に掛けます。
+BASE_STATION_ROWS = 291
+BASE_PASSENGER_ROWS = 130
+BASE_REVENUE_ROWS = 48
+
+DEFAULT_SEED = 0
+
+# Line prefixes and names in the processed station layout (processed 駅データの路線記号と路線名)
+LINES = {
+    "A": ("Asakusa Line", "浅草線"),
+    "C": ("Chiyoda Line", "千代田線"),
+    "E": ("Toei Ōedo Line", "都営地下鉄大江戸線"),
+    "F": ("Fukutoshin Line", "副都心線"),
+    "G": ("Ginza Line", "銀座線"),
+    "H": ("Hibiya Line", "日比谷線"),
+    "I": ("Mita Line", "三田線"),
+    "M": ("Marunouchi Line", "丸ノ内線"),
+    "Mb": ("Marunouchi Line", "丸ノ内線"),
+    "N": ("Namboku Line", "南北線"),
+    "S": ("Shinjuku Line", "新宿線"),
+    "T": ("Tōzai Line", "東西線"),
+    "Y": ("Yūrakuchō Line", "有楽町線"),
+    "Z": ("Hanzōmon Line", "半蔵門線"),
+}
+
+
+def generate_stations(row_count, seed=DEFAULT_SEED):
+    """
+    Generate station rows in the station_data_with_lines.csv layout. Station_IDs
+    and names are unique so the cleaned output loads into SQLite.
+    (station_data_with_lines.csv と同じ構成の駅データを生成します。Station_ID と駅名は
+    一意なので、クリーニング結果をそのままSQLiteに読み込めます)
+    """
+    rng = np.random.default_rng(seed)
+    prefixes = np.array(list(LINES))
+    line_ids = prefixes[rng.integers(0, len(prefixes), row_count)]
+    numbers = pd.Series(np.arange(row_count)).astype(str).str.zfill(7)
+    names = pd.Series(LINES).reindex(line_ids)
+    return pd.DataFrame({
+        "Station_ID": line_ids + numbers,
+        "English_Name": "Station " + numbers,
+        "Japanese_Name": "駅" + numbers,
+        "Line_IDs": line_ids,
+        "Line_Names_En": [name[0] for name in names],
+        "Line_Names_Jp": [name[1] for name in names],
+    })
+
+
+def generate_passengers(stations, row_count, seed=DEFAULT_SEED):
+    """
+    Generate ranking rows in the passenger_stats.csv layout, one per distinct
+    station name, with thousands-separated ridership text.
+    (passenger_stats.csv と同じ構成のランキング行を、駅名ごとに1行、桁区切りの乗客数で生成します)
+    """
+    rng = np.random.default_rng(seed + 1)
+    if row_count > len(stations):
+        raise ValueError("More passenger rows than stations requested. (乗客行数が駅数を超えています)")
+    picks = rng.permutation(len(stations))[:row_count]
+    daily = rng.integers(1_000, 600_000, row_count)
+    return pd.DataFrame({
+        "Station": stations["English_Name"].to_numpy()[picks],
+        "Daily Passenger Avg": pd.Series(daily).map("{:,}".format),
+        "Year-Over-Year Change": rng.normal(5.0, 8.0, row_count).round(1),
+    })
+
+
+def generate_revenue(row_count, seed=DEFAULT_SEED):
+    """
+    Generate monthly revenue rows in the revenue_data.csv layout, covering
+    consecutive fiscal years from 2000.
+    (revenue_data.csv と同じ構成の月次収入データを、2000年度から連続する会計年度で生成します)
+    """
+    rng = np.random.default_rng(seed + 2)
+    months = np.arange(row_count)
+    commuter = rng.integers(5_000, 15_000, row_count)
+    non_commuter = rng.integers(8_000, 20_000, row_count)
+    yoy = rng.normal(5.0, 10.0, (row_count, 3)).round(1)
+    return pd.DataFrame({
+        "Fiscal Year": 2000 + months // 12,
+        "Fiscal Month": months % 12 + 1,
+        "Commuter Revenue": commuter,
+        "Commuter YoY (%)": yoy[:, 0],
+        "Non-Commuter Revenue": non_commuter,
+        "Non-Commuter YoY (%)": yoy[:, 1],
+        "Total Revenue": commuter + non_commuter,
+        "Total YoY (%)": yoy[:, 2],
+    })
+
+
+def generate_dataset(scale, seed=DEFAULT_SEED):
+    """
+    Generate stations, passengers and revenue at `scale` times the real row counts.
+    The same scale and seed always produce identical data.
+    (実データの scale 倍の行数で駅・乗客・収入データを生成します。
+    同じ scale と seed からは常に同一のデータが生成されます)
+    """
+    stations = generate_stations(BASE_STATION_ROWS * scale, seed)
+    return {
+        "stations": stations,
+        "passengers": generate_passengers(stations, BASE_PASSENGER_ROWS * scale, seed),
+        "revenue": generate_revenue(BASE_REVENUE_ROWS * scale, seed),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Write synthetic processed inputs at a scale factor. (倍率を指定して合成の processed 入力を書き出します)"
+    )
+    parser.add_argument("--scale", type=int, default=10, help="Multiple of the real row counts. (実データ行数の倍率)")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="Random seed. (乱数シード)")
+    parser.add_argument("--output-dir", required=True, help="Directory for the CSV files. (CSVの出力先)")
+    args = parser.parse_args()
+
+    dataset = generate_dataset(args.scale, args.seed)
+    os.makedirs(args.output_dir, exist_ok=True)
+    file_names = {
+        "stations": "station_data_with_lines.csv",
+        "passengers": "passenger_stats.csv",
+        "revenue": "revenue_data.csv",
+    }
+    for name, data in dataset.items():
+        path = os.path.join(args.output_dir, file_names[name])
+        data.to_csv(path, index=False)
+        print(f"Wrote {len(data):,} rows to {path}. ({path} に{len(data):,}行を書き出しました)")
+
+
+if __name__ == "__main__":
+    main()
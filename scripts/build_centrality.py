@@ -0,0 +1,263 @@
+import argparse
+import heapq
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import instrumented, span
+from station_graph import STATIONS_JSON_PATH, TRANSITION_RIDE, load_station_graph
+
+# Paths for output files (出力ファイルのパス)
+CENTRALITY_CSV_PATH = "./data/processed/station_centrality.csv"
+DB_PATH = "./tokyo_metro.db"
+
+# Sources per task handed to a worker process (ワーカープロセスに渡すタスクあたりの始点数)
+SOURCES_PER_TASK = 32
+
+# Relative tolerance for treating two path costs as equal; edge weights are
+# float sums, so equal-length routes can differ in the last bits.
+# 2つの経路コストを同一とみなす相対許容誤差。辺の重みは浮動小数点の和のため、
+# 同じ長さの経路でも末尾の桁が異なることがあります。
+COST_TOLERANCE = 1e-9
+
+CENTRALITY_COLUMNS = [
+    "Station_ID",
+    "Betweenness",
+    "Closeness",
+    "Degree",
+    "Transfer_Degree",
+    "Hub_Rank",
+]
+
+# Worker-process copy of the graph arrays, set by init_worker.
+# ワーカープロセス内のグラフ配列。init_worker で設定します。
+_worker_graph = None
+
+
+def centrality_weights(graph):
+    """
+    Return per-edge weights in minutes: rides by distance at the estimated
+    train speed, walking and ground transfers by the fixed transfer time, so
+    structural hubs are ranked on the same routes passengers would take.
+    (辺ごとの重み（分）を返します。乗車区間は距離と推定速度から、徒歩・地上の乗換は
+    固定の乗換時間から求めるため、乗客が実際に選ぶ経路に基づいてハブを評価できます)
+    """
+    return graph.duration_min.tolist()
+
+
+def single_source_dependencies(source, indptr, indices, weights, n):
+    """
+    Run Brandes' weighted single-source step: a Dijkstra search that counts
+    shortest paths, then a reverse sweep accumulating each station's dependency.
+    (Brandes 法の重み付き単一始点処理: 最短経路数を数えるダイクストラ探索の後、
+    逆順に各駅の依存度を集計します)
+    Returns:
+        tuple: (dependency list, number of reachable stations, sum of distances)
+    """
+    inf = float("inf")
+    cost = [inf] * n
+    paths = [0] * n
+    predecessors = [[] for _ in range(n)]
+    settled = [False] * n
+    order = []
+
+    cost[source] = 0.0
+    paths[source] = 1
+    heap = [(0.0, source)]
+    while heap:
+        current_cost, u = heapq.heappop(heap)
+        if settled[u]:
+            continue
+        settled[u] = True
+        order.append(u)
+        for e in range(indptr[u], indptr[u + 1]):
+            v = indices[e]
+            if settled[v]:
+                continue
+            candidate = current_cost + weights[e]
+            tolerance = COST_TOLERANCE * max(1.0, candidate)
+            if candidate < cost[v] - tolerance:
+                cost[v] = candidate
+                paths[v] = paths[u]
+                predecessors[v] = [u]
+                heapq.heappush(heap, (candidate, v))
+            elif candidate <= cost[v] + tolerance:
+                paths[v] += paths[u]
+                predecessors[v].append(u)
+
+    dependency = [0.0] * n
+    for w in reversed(order):
+        coefficient = (1.0 + dependency[w]) / paths[w]
+        for v in predecessors[w]:
+            dependency[v] += paths[v] * coefficient
+    dependency[source] = 0.0
+
+    return dependency, len(order), sum(cost[v] for v in order)
+
+
+def accumulate_sources(sources, indptr, indices, weights, n):
+    """
+    Sum the dependencies for a batch of sources and record each source's
+    closeness inputs.
+    (複数の始点について依存度を合計し、各始点の近接中心性の元データを記録します)
+    Returns:
+        tuple: (betweenness array, {source: (reachable, total cost)})
+    """
+    betweenness = np.zeros(n)
+    reach = {}
+    for source in sources:
+        dependency, reachable, total = single_source_dependencies(source, indptr, indices, weights, n)
+        betweenness += dependency
+        reach[source] = (reachable, total)
+    return betweenness, reach
+
+
+def init_worker(indptr, indices, weights):
+    global _worker_graph
+    _worker_graph = (indptr, indices, weights, len(indptr) - 1)
+
+
+def run_worker_batch(sources):
+    return accumulate_sources(sources, *_worker_graph)
+
+
+def compute_centrality(graph, workers=None):
+    """
+    Compute betweenness, closeness, degree and transfer degree for every station.
+    Single-source searches are split across a process pool; with one worker
+    they run in this process.
+    (全駅の媒介中心性・近接中心性・次数・乗換次数を計算します。単一始点の探索は
+    プロセスプールに分割して実行し、ワーカーが1つの場合はこのプロセスで実行します)
+
+    Betweenness is normalized by (n - 1)(n - 2), the number of ordered pairs
+    that exclude the station. Closeness uses the Wasserman-Faust form, which
+    stays comparable when some stations are unreachable.
+    (媒介中心性はその駅を除く順序付きペア数 (n - 1)(n - 2) で正規化します。近接中心性は
+    到達不能な駅があっても比較できる Wasserman-Faust 形式を使います)
+    Returns:
+        pd.DataFrame: One row per station in CENTRALITY_COLUMNS order (駅ごとに1行)
+    """
+    n = graph.station_count
+    indptr, indices = graph.indptr.tolist(), graph.indices.tolist()
+    weights = centrality_weights(graph)
+    workers = workers or os.cpu_count() or 1
+
+    if workers <= 1 or n <= SOURCES_PER_TASK:
+        betweenness, reach = accumulate_sources(range(n), indptr, indices, weights, n)
+    else:
+        batches = [list(range(start, min(start + SOURCES_PER_TASK, n))) for start in range(0, n, SOURCES_PER_TASK)]
+        betweenness, reach = np.zeros(n), {}
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                                 initargs=(indptr, indices, weights)) as executor:
+            for partial, partial_reach in executor.map(run_worker_batch, batches):
+                betweenness += partial
+                reach.update(partial_reach)
+
+    scale = (n - 1) * (n - 2) if n > 2 else 1
+    closeness = np.zeros(n)
+    for source, (reachable, total) in reach.items():
+        if reachable > 1 and total > 0:
+            closeness[source] = (reachable - 1) / total * (reachable - 1) / (n - 1)
+
+    degree = np.diff(graph.indptr)
+    is_transfer = graph.type_ids != TRANSITION_RIDE
+    transfer_degree = np.bincount(
+        np.repeat(np.arange(n), degree)[is_transfer], minlength=n
+    )
+
+    centrality = pd.DataFrame({
+        "Station_ID": graph.station_ids,
+        "Betweenness": (betweenness / scale).round(6),
+        "Closeness": closeness.round(6),
+        "Degree": degree.astype(np.int64),
+        "Transfer_Degree": transfer_degree.astype(np.int64),
+    })
+    centrality["Hub_Rank"] = (
+        centrality["Betweenness"].rank(method="min", ascending=False).astype(np.int64)
+    )
+    return centrality[CENTRALITY_COLUMNS]
+
+
+def write_centrality_table(conn, centrality):
+    """
+    Replace the StationCentrality table contents in one transaction.
+    (StationCentralityテーブルの内容を1トランザクションで置き換えます)
+    """
+    with conn:
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS StationCentrality (
+                Station_ID TEXT PRIMARY KEY,
+                Betweenness REAL NOT NULL,
+                Closeness REAL NOT NULL,
+                Degree INTEGER NOT NULL,
+                Transfer_Degree INTEGER NOT NULL,
+                Hub_Rank INTEGER NOT NULL
+            );
+            """
+        )
+        conn.execute("DELETE FROM StationCentrality;")
+        conn.executemany(
+            "INSERT INTO StationCentrality VALUES (?, ?, ?, ?, ?, ?);",
+            centrality.itertuples(index=False, name=None),
+        )
+
+    print(f"Loaded {len(centrality)} rows into StationCentrality. "
+          f"(StationCentralityに{len(centrality)}行を読み込みました。)")
+
+
+@instrumented("centrality")
+def main():
+    """
+    Compute station hub scores from the connection graph and load them into SQLite.
+    (接続グラフから駅のハブ指標を計算し、SQLiteに読み込みます)
+    """
+    parser = argparse.ArgumentParser(
+        description="Compute station centrality from stations.json. (stations.json から駅の中心性を計算します)"
+    )
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Worker processes. Default: CPU count. (ワーカープロセス数。既定はCPU数)")
+    args = parser.parse_args()
+
+    print("Starting centrality build. (中心性の計算を開始します。)")
+    if not Path(STATIONS_JSON_PATH).exists():
+        raise FileNotFoundError(
+            f"Input file not found: {STATIONS_JSON_PATH} (入力ファイルが見つかりません: {STATIONS_JSON_PATH})"
+        )
+
+    with span("load_graph") as step:
+        graph = load_station_graph(STATIONS_JSON_PATH)
+        step.set(stations=graph.station_count, edges=graph.edge_count)
+
+    start = time.perf_counter()
+    with span("compute", workers=args.workers) as step:
+        centrality = compute_centrality(graph, args.workers)
+        step.add_rows_out(len(centrality))
+    print(f"Computed centrality for {len(centrality)} stations in {time.perf_counter() - start:.3f}s. "
+          f"({len(centrality)}駅の中心性を計算しました)")
+
+    with span("save") as step:
+        centrality.to_csv(CENTRALITY_CSV_PATH, index=False, encoding="utf-8")
+        conn = sqlite3.connect(DB_PATH)
+        try:
+            write_centrality_table(conn, centrality)
+        finally:
+            conn.close()
+        step.add_rows_out(len(centrality))
+
+    top = centrality.nsmallest(10, "Hub_Rank")
+    print("Top structural hubs (構造上の主要ハブ):")
+    for row in top.itertuples(index=False):
+        print(f"{row.Hub_Rank:>3}. {row.Station_ID:<5} betweenness={row.Betweenness:.4f} "
+              f"closeness={row.Closeness:.4f} transfers={row.Transfer_Degree}")
+
+    print("Centrality build completed. (中心性の計算が完了しました。)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+import json
+import os
+import sqlite3
+from pathlib import Path
+
+import numpy as np
+
+from fingerprint import sha256_file
+from instrumentation import instrumented, span
+from station_graph import load_station_graph
+
+# Paths for input and output files (入力ファイルと出力ファイルのパス)
+STATIONS_JSON_PATH = "./data/raw/stations.json"
+OD_MATRIX_DIR = "./data/processed/od_matrix"
+DB_PATH = "./tokyo_metro.db"
+
+MANIFEST_FILE = "manifest.json"
+
+# Matrix files and their on-disk dtypes (行列ファイルとディスク上の型)
+MATRIX_DTYPES = {
+    "distance_km": np.float32,
+    "hops": np.int16,
+    "transfers": np.int16,
+}
+
+
+def compute_od_matrix(graph):
+    """
+    Compute the all-pairs distance, hop and transfer matrices.
+    (全駅間の距離・乗車区間数・乗換回数の行列を計算します)
+
+    Hops and transfers describe the shortest-distance route for each pair.
+    Unreachable pairs have distance inf and counts of -1.
+    (乗車区間数と乗換回数は各ペアの最短距離経路の値です。
+    到達不能なペアの距離は inf、回数は -1 です。)
+    """
+    result = graph.all_pairs(metric="distance")
+    return {name: result[name].astype(dtype) for name, dtype in MATRIX_DTYPES.items()}
+
+
+def save_od_matrix(matrices, station_ids, source_hash, output_dir=OD_MATRIX_DIR):
+    """
+    Save the matrices as .npy files plus a manifest recording the input hash.
+    (行列を .npy ファイルとして保存し、入力ハッシュを記録したマニフェストを書き出します)
+
+    The manifest is written last so an interrupted run is treated as stale.
+    (中断された実行が古いものとして扱われるよう、マニフェストは最後に書き込みます)
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    for name, matrix in matrices.items():
+        np.save(os.path.join(output_dir, f"{name}.npy"), matrix)
+
+    manifest = {
+        "source_sha256": source_hash,
+        "station_ids": list(station_ids),
+        "matrices": {name: str(np.dtype(dtype)) for name, dtype in MATRIX_DTYPES.items()},
+    }
+    with open(os.path.join(output_dir, MANIFEST_FILE), "w", encoding="utf-8") as file:
+        json.dump(manifest, file, ensure_ascii=False, indent=2)
+
+    print(f"OD matrix saved to {output_dir}. (ODマトリクスを {output_dir} に保存しました。)")
+
+
+def read_manifest(output_dir=OD_MATRIX_DIR):
+    """
+    Return the saved manifest, or None if there is none.
+    (保存済みのマニフェストを返します。存在しない場合は None)
+    """
+    manifest_path = Path(output_dir) / MANIFEST_FILE
+    if not manifest_path.exists():
+        return None
+    with open(manifest_path, "r", encoding="utf-8") as file:
+        return json.load(file)
+
+
+class ODMatrix:
+    """
+    Memory-mapped origin-destination lookup over the saved matrices.
+    (保存済み行列をメモリマップしたOD参照)
+    """
+
+    def __init__(self, output_dir=OD_MATRIX_DIR):
+        manifest = read_manifest(output_dir)
+        if manifest is None:
+            raise FileNotFoundError(
+                f"OD matrix not found in {output_dir}. Run build_od_matrix.py first. "
+                f"({output_dir} にODマトリクスがありません。先に build_od_matrix.py を実行してください。)"
+            )
+        self.station_ids = manifest["station_ids"]
+        self.index = {station_id: i for i, station_id in enumerate(self.station_ids)}
+        self.matrices = {
+            name: np.load(os.path.join(output_dir, f"{name}.npy"), mmap_mode="r")
+            for name in manifest["matrices"]
+        }
+
+    def lookup(self, origin_id, destination_id):
+        """
+        Return distance, hops and transfers for one OD pair.
+        (1組のODペアの距離・乗車区間数・乗換回数を返します)
+        """
+        i = self.index[origin_id]
+        j = self.index[destination_id]
+        return {
+            "distance_km": round(float(self.matrices["distance_km"][i, j]), 3),
+            "hops": int(self.matrices["hops"][i, j]),
+            "transfers": int(self.matrices["transfers"][i, j]),
+        }
+
+
+def write_od_table(conn, matrices, station_ids):
+    """
+    Replace the ODMatrix table contents in one transaction.
+    (ODMatrixテーブルの内容を1トランザクションで置き換えます)
+    """
+    n = len(station_ids)
+    origins, destinations = np.divmod(np.arange(n * n), n)
+    distance = matrices["distance_km"].ravel()
+    reachable = np.isfinite(distance)
+
+    rows = zip(
+        (station_ids[i] for i in origins[reachable]),
+        (station_ids[j] for j in destinations[reachable]),
+        np.round(distance[reachable].astype(np.float64), 3).tolist(),
+        matrices["hops"].ravel()[reachable].tolist(),
+        matrices["transfers"].ravel()[reachable].tolist(),
+    )
+
+    with conn:
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS ODMatrix (
+                Origin_ID TEXT NOT NULL,
+                Destination_ID TEXT NOT NULL,
+                Distance_Km REAL NOT NULL,
+                Hops INTEGER NOT NULL,
+                Transfers INTEGER NOT NULL,
+                PRIMARY KEY (Origin_ID, Destination_ID)
+            ) WITHOUT ROWID;
+            """
+        )
+        conn.execute("DELETE FROM ODMatrix;")
+        conn.executemany("INSERT INTO ODMatrix VALUES (?, ?, ?, ?, ?);", rows)
+
+    print(f"Loaded {int(reachable.sum())} rows into ODMatrix. (ODMatrixに{int(reachable.sum())}行を読み込みました。)")
+
+
+def od_table_row_count(conn):
+    """
+    Return the ODMatrix row count, or 0 if the table does not exist.
+    (ODMatrixの行数を返します。テーブルがなければ 0)
+    """
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'ODMatrix';"
+    ).fetchone()
+    if not exists:
+        return 0
+    return conn.execute("SELECT COUNT(*) FROM ODMatrix;").fetchone()[0]
+
+
+def build_od_matrix(json_path=STATIONS_JSON_PATH, output_dir=OD_MATRIX_DIR, db_path=DB_PATH, force=False):
+    """
+    Rebuild the OD matrix only if stations.json changed, then make sure the
+    SQLite table is populated.
+    (stations.json が変更された場合のみODマトリクスを再構築し、SQLiteテーブルが
+    埋まっていることを確認します)
+    Returns:
+        bool: True if the matrices were recomputed (行列を再計算した場合 True)
+    """
+    source_hash = sha256_file(json_path)
+    manifest = read_manifest(output_dir)
+    rebuilt = force or manifest is None or manifest.get("source_sha256") != source_hash
+
+    if rebuilt:
+        with span("load_graph") as step:
+            graph = load_station_graph(json_path)
+            step.set(stations=len(graph.station_ids))
+        with span("compute") as step:
+            matrices = compute_od_matrix(graph)
+            step.add_rows_out(len(graph.station_ids) ** 2)
+        with span("save"):
+            save_od_matrix(matrices, graph.station_ids, source_hash, output_dir)
+        station_ids = graph.station_ids
+    else:
+        print("OD matrix is up to date. (ODマトリクスは最新です。)")
+        od_matrix = ODMatrix(output_dir)
+        matrices = {name: np.asarray(matrix) for name, matrix in od_matrix.matrices.items()}
+        station_ids = od_matrix.station_ids
+
+    # The database is recreated by import_data_to_sqlite.py, so reload the
+    # table whenever the matrices changed or the table is empty.
+    # データベースは import_data_to_sqlite.py で再作成されるため、行列の変更時または
+    # テーブルが空の場合にテーブルを読み込み直します。
+    conn = sqlite3.connect(db_path)
+    try:
+        if rebuilt or od_table_row_count(conn) == 0:
+            with span("write_table"):
+                write_od_table(conn, matrices, station_ids)
+    finally:
+        conn.close()
+
+    return rebuilt
+
+
+@instrumented("od_matrix")
+def main():
+    """
+    Run the OD matrix stage.
+    (ODマトリクスの処理を実行します)
+    """
+    print("Starting OD matrix build. (ODマトリクスの構築を開始します。)")
+
+    if not Path(STATIONS_JSON_PATH).exists():
+        raise FileNotFoundError(
+            f"Input file not found: {STATIONS_JSON_PATH} (入力ファイルが見つかりません: {STATIONS_JSON_PATH})"
+        )
+
+    build_od_matrix()
+
+    print("OD matrix build completed. (ODマトリクスの構築が完了しました。)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,303 @@
+import argparse
+import sqlite3
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from clean_passenger_data import current_snapshot_year, snapshot_partition_column
+from instrumentation import instrumented, span
+from parquet_io import parquet_path, read_cleaned_data
+from station_graph import STATIONS_JSON_PATH, load_station_graph
+
+# Paths for input and output files (入力ファイルと出力ファイルのパス)
+DB_PATH = "./tokyo_metro.db"
+PASSENGERS_PARQUET_PATH = parquet_path("./data/cleaned/passengers_cleaned.csv")
+SEGMENT_LOAD_CSV_PATH = "./data/processed/segment_load.csv"
+
+# Ranking year of the snapshot held in the Passengers table, as labelled by
+# clean_passenger_data.py (clean_passenger_data.py が付ける Passengers テーブルのランキング年度)
+CURRENT_SNAPSHOT_YEAR = current_snapshot_year
+SNAPSHOT_PARTITION_COLUMN = snapshot_partition_column
+
+# Distance-decay parameter of the gravity model, per minute of travel time:
+# a station 20 minutes away attracts exp(-0.05 × 20) ≈ 37% of the trips it
+# would attract next door.
+# 重力モデルの距離減衰パラメータ（所要時間1分あたり）。20分先の駅は、隣接駅の場合の
+# exp(-0.05 × 20) ≈ 37% のトリップを引き付けます。
+GRAVITY_BETA = 0.05
+
+SEGMENT_LOAD_COLUMNS = [
+    "Snapshot_Year",
+    "From_Station_ID",
+    "To_Station_ID",
+    "Transition_Type",
+    "Distance_km",
+    "Duration_min",
+    "Daily_Load",
+    "Load_Share",
+    "Load_Rank",
+]
+
+
+def load_demand_snapshots(station_ids, source="sqlite"):
+    """
+    Return daily passengers per station for each ridership snapshot, as
+    {snapshot year: demand array}. The sqlite source reads the Passengers table
+    (the latest snapshot); the parquet source reads every Snapshot_Year
+    partition of the cleaned passengers dataset. A ranking row shared by several
+    Station_IDs (one per line at an interchange) is split evenly between them.
+    (乗客数のスナップショットごとに駅別の1日平均乗客数を {年度: 需要配列} で返します。
+    sqlite は Passengers テーブル（最新のスナップショット）を、parquet はクリーン済み
+    乗客データの全 Snapshot_Year パーティションを読み込みます。乗換駅で路線ごとの
+    Station_ID に共有されるランキング行は、路線数で均等に分割します)
+    """
+    if source == "sqlite":
+        conn = sqlite3.connect(DB_PATH)
+        try:
+            passengers = pd.read_sql_query(
+                "SELECT Station_ID, English_Name, Daily_Passenger_Avg FROM Passengers;", conn
+            )
+        finally:
+            conn.close()
+        passengers[SNAPSHOT_PARTITION_COLUMN] = CURRENT_SNAPSHOT_YEAR
+    else:
+        passengers = read_cleaned_data(
+            PASSENGERS_PARQUET_PATH,
+            columns=["Station_ID", "English_Name", "Daily_Passenger_Avg", SNAPSHOT_PARTITION_COLUMN],
+        )
+        passengers = passengers.rename(columns={"daily_passenger_avg": "Daily_Passenger_Avg"})
+
+    group = [SNAPSHOT_PARTITION_COLUMN, "English_Name"]
+    passengers["Share"] = (
+        passengers["Daily_Passenger_Avg"] / passengers.groupby(group)["Station_ID"].transform("size")
+    )
+    index = {station_id: i for i, station_id in enumerate(station_ids)}
+    passengers["Station_Index"] = passengers["Station_ID"].map(index)
+    passengers = passengers.dropna(subset=["Station_Index"])
+
+    snapshots = {}
+    for year, rows in passengers.groupby(SNAPSHOT_PARTITION_COLUMN, sort=True):
+        snapshots[int(year)] = np.bincount(
+            rows["Station_Index"].astype(np.int64), weights=rows["Share"], minlength=len(station_ids)
+        )
+    return snapshots
+
+
+def gravity_trips(demand, cost, beta=GRAVITY_BETA):
+    """
+    Build a production-constrained gravity OD matrix:
+    trips(i, j) = P_i × A_j exp(-β c_ij) / Σ_k A_k exp(-β c_ik).
+    The ranking counts entries plus exits, so each station produces and
+    attracts half its passengers. Every produced trip is assigned; unreachable
+    stations attract none.
+    (生成制約付き重力モデルのOD行列を作成します:
+    trips(i, j) = P_i × A_j exp(-β c_ij) / Σ_k A_k exp(-β c_ik)。
+    ランキングは乗車と降車の合計のため、各駅は乗客数の半分を発生・集中させます。
+    発生したトリップはすべて配分され、到達不能な駅には配分しません)
+    """
+    productions = demand / 2.0
+    weight = productions[np.newaxis, :] * np.exp(-beta * cost)
+    np.fill_diagonal(weight, 0.0)
+    totals = weight.sum(axis=1, keepdims=True)
+    shares = np.divide(weight, totals, out=np.zeros_like(weight), where=totals > 0)
+    return productions[:, np.newaxis] * shares
+
+
+def tree_edge_matrix(graph, predecessor):
+    """
+    Return the edge position used to reach each station in each tree, or -1
+    for sources and unreachable stations.
+    (各木で各駅に到達するのに使う辺の位置を返します。始点と到達不能な駅は -1)
+    """
+    n = graph.station_count
+    edge_keys = np.repeat(np.arange(n), np.diff(graph.indptr)) * n + graph.indices
+    order = np.argsort(edge_keys, kind="stable")
+    reached = predecessor >= 0
+    keys = predecessor.astype(np.int64) * n + np.arange(n)[np.newaxis, :]
+    positions = np.searchsorted(edge_keys[order], keys[reached])
+    edges = np.full(predecessor.shape, -1, dtype=np.int64)
+    edges[reached] = order[positions]
+    return edges
+
+
+def tree_levels(predecessor):
+    """
+    Return each station's depth in each shortest-path tree (0 at the source,
+    -1 when unreachable), found for all trees at once one level at a time.
+    (各最短経路木での駅の深さを返します（始点は0、到達不能は -1）。
+    全ての木について1階層ずつまとめて求めます)
+    """
+    n = predecessor.shape[0]
+    rows = np.arange(n)[:, np.newaxis]
+    depth = np.full(predecessor.shape, -1, dtype=np.int32)
+    np.fill_diagonal(depth, 0)
+    pending = predecessor >= 0
+    level = 0
+    while pending.any():
+        parent_depth = depth[rows, np.where(pending, predecessor, 0)]
+        reached = pending & (parent_depth == level)
+        if not reached.any():
+            break
+        level += 1
+        depth[reached] = level
+        pending &= ~reached
+    return depth
+
+
+def assign_flows(graph, trip_snapshots, predecessor, edges, depth):
+    """
+    Load OD trips onto edges along the shortest-path trees. Each tree is swept
+    from its deepest level up to the source, adding every station's subtree
+    demand to its parent, so a station's final value is the flow on the edge
+    that reaches it. All trees and snapshots are swept together.
+    (最短経路木に沿ってODトリップを辺に配分します。各木を最も深い階層から始点に向かって
+    処理し、各駅の部分木の需要を親に加算するため、駅の最終値はその駅に到達する辺の
+    流量になります。全ての木とスナップショットをまとめて処理します)
+    Returns:
+        np.ndarray: Daily load per edge and snapshot, shape (edges, snapshots)
+    """
+    n = graph.station_count
+    subtree = np.stack([trips.ravel() for trips in trip_snapshots], axis=1)
+    parent = (np.arange(n)[:, np.newaxis] * n + predecessor).ravel()
+    flat_depth = depth.ravel()
+    for level in range(int(flat_depth.max()), 0, -1):
+        at_level = np.flatnonzero(flat_depth == level)
+        np.add.at(subtree, parent[at_level], subtree[at_level])
+
+    on_tree = np.flatnonzero(edges.ravel() >= 0)
+    tree_edges = edges.ravel()[on_tree]
+    return np.stack([
+        np.bincount(tree_edges, weights=subtree[on_tree, k], minlength=graph.edge_count)
+        for k in range(subtree.shape[1])
+    ], axis=1)
+
+
+def compute_segment_load(graph, snapshots, beta=GRAVITY_BETA):
+    """
+    Route gravity-model demand over fastest paths and return the daily load
+    per directed segment and snapshot.
+    (重力モデルの需要を最短時間経路で配分し、方向別区間・スナップショットごとの
+    1日あたりの負荷を返します)
+    Returns:
+        pd.DataFrame: One row per edge and snapshot in SEGMENT_LOAD_COLUMNS order (辺とスナップショットごとに1行)
+    """
+    trees = graph.all_pairs(metric="duration")
+    predecessor, cost = trees["predecessor"], trees["cost"]
+    edges = tree_edge_matrix(graph, predecessor)
+    depth = tree_levels(predecessor)
+
+    years = sorted(snapshots)
+    trips = [gravity_trips(snapshots[year], cost, beta) for year in years]
+    load = assign_flows(graph, trips, predecessor, edges, depth)
+
+    sources = np.repeat(np.arange(graph.station_count), np.diff(graph.indptr))
+    station_ids = np.array(graph.station_ids)
+    frames = []
+    for k, year in enumerate(years):
+        total_trips = trips[k].sum()
+        frame = pd.DataFrame({
+            "Snapshot_Year": year,
+            "From_Station_ID": station_ids[sources],
+            "To_Station_ID": station_ids[graph.indices],
+            "Transition_Type": [graph.transition_types.get(int(t), str(t)) for t in graph.type_ids],
+            "Distance_km": graph.distance_km.round(3),
+            "Duration_min": graph.duration_min.round(2),
+            "Daily_Load": load[:, k].round(1),
+            "Load_Share": (load[:, k] / total_trips if total_trips > 0 else np.zeros(graph.edge_count)).round(6),
+        })
+        frame["Load_Rank"] = frame["Daily_Load"].rank(method="min", ascending=False).astype(np.int64)
+        frames.append(frame)
+    return pd.concat(frames, ignore_index=True)[SEGMENT_LOAD_COLUMNS]
+
+
+def write_segment_load_table(conn, segment_load):
+    """
+    Replace the SegmentLoad table contents in one transaction.
+    (SegmentLoadテーブルの内容を1トランザクションで置き換えます)
+    """
+    with conn:
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS SegmentLoad (
+                Snapshot_Year INTEGER NOT NULL,
+                From_Station_ID TEXT NOT NULL,
+                To_Station_ID TEXT NOT NULL,
+                Transition_Type TEXT NOT NULL,
+                Distance_km REAL NOT NULL,
+                Duration_min REAL NOT NULL,
+                Daily_Load REAL NOT NULL,
+                Load_Share REAL NOT NULL,
+                Load_Rank INTEGER NOT NULL,
+                PRIMARY KEY (Snapshot_Year, From_Station_ID, To_Station_ID)
+            );
+            """
+        )
+        conn.execute("DELETE FROM SegmentLoad;")
+        conn.executemany(
+            f"INSERT INTO SegmentLoad VALUES ({', '.join('?' for _ in SEGMENT_LOAD_COLUMNS)});",
+            segment_load.itertuples(index=False, name=None),
+        )
+
+    print(f"Loaded {len(segment_load)} rows into SegmentLoad. "
+          f"(SegmentLoadに{len(segment_load)}行を読み込みました。)")
+
+
+@instrumented("segment_load")
+def main():
+    """
+    Assign gravity-model OD demand to the network and load per-segment flows into SQLite.
+    (重力モデルのOD需要をネットワークに配分し、区間ごとの流量をSQLiteに読み込みます)
+    """
+    parser = argparse.ArgumentParser(
+        description="Assign passenger flows to network segments. (乗客の流れを区間に配分します)"
+    )
+    parser.add_argument("--source", choices=["sqlite", "parquet"], default="sqlite",
+                        help="Ridership source; parquet assigns every snapshot year. "
+                             "(乗客数の読み込み元。parquet は全スナップショット年度を配分)")
+    parser.add_argument("--beta", type=float, default=GRAVITY_BETA,
+                        help="Gravity-model decay per minute. (重力モデルの1分あたりの減衰)")
+    args = parser.parse_args()
+
+    print("Starting flow assignment. (乗客の流れの配分を開始します。)")
+    demand_path = DB_PATH if args.source == "sqlite" else PASSENGERS_PARQUET_PATH
+    for path in [STATIONS_JSON_PATH, demand_path]:
+        if not Path(path).exists():
+            raise FileNotFoundError(f"Input file not found: {path} (入力ファイルが見つかりません: {path})")
+
+    with span("load_inputs", source=args.source) as step:
+        graph = load_station_graph(STATIONS_JSON_PATH)
+        snapshots = load_demand_snapshots(graph.station_ids, args.source)
+        step.set(stations=graph.station_count, edges=graph.edge_count, snapshots=len(snapshots))
+    if not snapshots:
+        raise ValueError("No ridership rows matched the station graph. (駅グラフに一致する乗客数の行がありません)")
+
+    start = time.perf_counter()
+    with span("assign", beta=args.beta) as step:
+        segment_load = compute_segment_load(graph, snapshots, args.beta)
+        step.add_rows_out(len(segment_load))
+    print(f"Assigned {len(snapshots)} snapshot(s) over {graph.edge_count} segments in "
+          f"{time.perf_counter() - start:.2f}s. "
+          f"({len(snapshots)}件のスナップショットを{graph.edge_count}区間に配分しました)")
+
+    with span("save") as step:
+        segment_load.to_csv(SEGMENT_LOAD_CSV_PATH, index=False, encoding="utf-8")
+        conn = sqlite3.connect(DB_PATH)
+        try:
+            write_segment_load_table(conn, segment_load)
+        finally:
+            conn.close()
+        step.add_rows_out(len(segment_load))
+
+    latest = segment_load[segment_load["Snapshot_Year"] == max(snapshots)]
+    print(f"Busiest segments, {max(snapshots)} (最も混雑する区間):")
+    for row in latest.nsmallest(10, "Load_Rank").itertuples(index=False):
+        print(f"{row.Load_Rank:>3}. {row.From_Station_ID:>4} → {row.To_Station_ID:<4} {row.Transition_Type:<6} "
+              f"load={row.Daily_Load:>10,.0f}/day")
+
+    print("Flow assignment completed. (乗客の流れの配分が完了しました。)")
+
+
+if __name__ == "__main__":
+    main()
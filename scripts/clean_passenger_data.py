@@ -1,57 +1,214 @@
 import pandas as pd
+import argparse
 import os
 
+from instrumentation import current_span, instrumented, span
+from parquet_io import (OUTPUT_FORMATS, ParquetPartitionWriter, parquet_path, write_parquet_partition,
+                        writes_csv, writes_parquet)
+from station_resolver import StationNameResolver, load_station_resolver
+
 # Paths for input and output files
 input_passenger_path = './data/processed/passenger_stats.csv'  # Updated to use 'processed' folder
 input_stations_path = './data/processed/station_data_with_lines.csv'  # Updated to use 'processed' folder
 output_passenger_path = './data/cleaned/passengers_cleaned.csv'
+output_passenger_parquet_path = parquet_path(output_passenger_path)
+
+# Parquet output keeps one partition per ranking snapshot year; the published
+# ranking page covers the latest complete fiscal year.
+# Parquet出力はランキングのスナップショット年度ごとに1パーティションを保持する。
+# 公開中のランキングページは直近の完了した会計年度を対象とする
+snapshot_partition_column = 'Snapshot_Year'
+current_snapshot_year = 2024
+
+# Rows per chunk in streaming mode (ストリーミングモードでのチャンクあたりの行数)
+stream_chunk_size = 100_000
+
+# Column names used in the cleaned output (クリーン済み出力で使う列名)
+passenger_column_names = {
+    'Station': 'English_Name',
+    'Daily Passenger Avg': 'daily_passenger_avg',
+    'Year-Over-Year Change': 'year_over_year_change'
+}
+
+def coerce_passenger_numbers(passenger_data):
+    """
+    Convert ridership columns to real numbers and validate them.
+    (乗客数の列を数値型に変換し、検証する)
+
+    daily_passenger_avg arrives as thousands-separated text such as "500,694" and is
+    stored as int64; year_over_year_change is stored as float64.
+    (daily_passenger_avg は "500,694" のような桁区切りの文字列で届くため int64 に、
+    year_over_year_change は float64 に変換する)
+    """
+    daily = pd.to_numeric(
+        passenger_data['daily_passenger_avg'].astype(str).str.replace(',', '', regex=False).str.strip(),
+        errors='coerce'
+    )
+    yoy = pd.to_numeric(
+        passenger_data['year_over_year_change'].astype(str).str.replace('%', '', regex=False).str.strip(),
+        errors='coerce'
+    )
+
+    # Reject values that are missing, non-numeric, fractional or negative
+    # (欠損・非数値・小数・負の値を拒否する)
+    invalid = daily.isnull() | yoy.isnull() | (daily < 0) | (daily % 1 != 0)
+    if invalid.any():
+        print("Invalid passenger values found: (不正な乗客数の値が見つかりました):")
+        print(passenger_data.loc[invalid, ['English_Name', 'daily_passenger_avg', 'year_over_year_change']])
+        raise ValueError(
+            "daily_passenger_avg must be a non-negative integer and year_over_year_change a number. "
+            "(daily_passenger_avg は0以上の整数、year_over_year_change は数値である必要があります)"
+        )
 
-def clean_passenger_data(passenger_data, station_data):
+    passenger_data['daily_passenger_avg'] = daily.astype('int64')
+    passenger_data['year_over_year_change'] = yoy.astype('float64')
+    return passenger_data
+
+def clean_passenger_data(passenger_data, station_data, resolver=None):
     """
     Clean the passenger data and map it to Station_IDs from station data.
     (乗客データをクリーンアップし、駅データのStation_IDにマッピングする)
+
+    Names are resolved with StationNameResolver, so spelling variants, macrons and
+    combined names such as "KokkaiGijidomae・TameikeSanno" still find their stations.
+    A name served by several lines yields one row per Station_ID.
+    (駅名は StationNameResolver で解決するため、表記揺れ・長音記号・
+    "KokkaiGijidomae・TameikeSanno" のような併記名も駅に対応付けられる。
+    複数路線の駅名は Station_ID ごとに1行になる)
     """
-    # Normalize column names (列名を正規化する)
-    passenger_data.rename(columns={
-        'Station': 'English_Name',
-        'Daily Passenger Avg': 'daily_passenger_avg',
-        'Year-Over-Year Change': 'year_over_year_change'
-    }, inplace=True)
+    if resolver is None:
+        resolver = StationNameResolver.from_station_data(station_data)
 
-    # Merge passenger data with stations data to map Station_ID
-    # (駅データとマージしてStation_IDをマッピングする)
-    merged_data = pd.merge(passenger_data, station_data[['Station_ID', 'English_Name']],
-                           on='English_Name', how='left')
+    cleaned_data, unmatched_names = clean_passenger_chunk(passenger_data, resolver)
 
     # Check for unmatched stations (一致しない駅のチェック)
-    unmatched = merged_data[merged_data['Station_ID'].isnull()]
-    if not unmatched.empty:
+    if unmatched_names:
         print("Unmatched stations found: (一致しない駅が見つかりました):")
-        print(unmatched[['English_Name']])
-
-    # Drop unmatched rows or handle them as needed (一致しない行を削除または処理)
-    cleaned_data = merged_data.dropna(subset=['Station_ID'])
+        print(unmatched_names)
 
     return cleaned_data
 
-def save_cleaned_data(cleaned_data):
+def clean_passenger_chunk(chunk, resolver):
     """
-    Save the cleaned passenger data to a CSV file.
-    (クリーンアップされた乗客データをCSVファイルに保存する)
+    Clean one chunk of passenger rows against a prebuilt station resolver.
+    Returns the cleaned rows and the names that had no match.
+    (作成済みの駅リゾルバを使って乗客データの1チャンクをクリーンアップする。
+    クリーン済みの行と一致しなかった駅名を返す)
     """
-    cleaned_data.to_csv(output_passenger_path, index=False, encoding='utf-8')
+    # Normalize column names (列名を正規化する)
+    chunk = chunk.rename(columns=passenger_column_names)
+
+    # Convert ridership values to typed numbers (乗客数の値を数値型に変換する)
+    chunk = coerce_passenger_numbers(chunk)
+
+    chunk['Station_ID'] = resolver.resolve_series(chunk['English_Name'])
+    matched = chunk['Station_ID'].notna()
+    unmatched_names = chunk.loc[~matched, 'English_Name'].tolist()
+
+    # Drop unmatched rows and expand multi-line stations (一致しない行を削除し、複数路線の駅を展開する)
+    cleaned_chunk = chunk[matched].explode('Station_ID')
+    return cleaned_chunk, unmatched_names
+
+def clean_passenger_data_streaming(passenger_paths, stations_path, output_path, chunk_size=stream_chunk_size,
+                                   output_format='csv', snapshot_year=current_snapshot_year):
+    """
+    Stream passenger CSVs in chunks and write the cleaned rows incrementally.
+    Memory use is bounded by the chunk size and the station resolver, not by the
+    length of the passenger history.
+    (乗客CSVをチャンク単位で読み込み、クリーン済みの行を逐次書き出す。
+    メモリ使用量は乗客履歴の長さではなく、チャンクサイズと駅リゾルバで決まる)
+    Returns:
+        int: Number of cleaned rows written (書き出したクリーン済みの行数)
+    """
+    resolver = load_station_resolver(stations_path)
+    stage = current_span()
+
+    rows_written = 0
+    unmatched_count = 0
+    unmatched_samples = []
+    tmp_path = f"{output_path}.tmp"
+    parquet_writer = None
+    if writes_parquet(output_format):
+        parquet_writer = ParquetPartitionWriter(parquet_path(output_path), snapshot_partition_column, snapshot_year)
+    with open(tmp_path, 'w', encoding='utf-8', newline='') as output_file:
+        for passenger_path in passenger_paths:
+            for chunk in pd.read_csv(passenger_path, chunksize=chunk_size):
+                cleaned_chunk, unmatched_names = clean_passenger_chunk(chunk, resolver)
+                if stage is not None:
+                    stage.add_rows_in(len(chunk))
+                    stage.add_rows_out(len(cleaned_chunk))
+                if writes_csv(output_format):
+                    cleaned_chunk.to_csv(output_file, index=False, header=output_file.tell() == 0)
+                if parquet_writer is not None:
+                    parquet_writer.write(cleaned_chunk)
+                rows_written += len(cleaned_chunk)
+                unmatched_count += len(unmatched_names)
+                unmatched_samples.extend(unmatched_names[:max(0, 20 - len(unmatched_samples))])
+    if parquet_writer is not None:
+        parquet_writer.close()
+    if writes_csv(output_format):
+        os.replace(tmp_path, output_path)
+    else:
+        os.remove(tmp_path)
+
+    if unmatched_count:
+        print(f"Unmatched stations found: {unmatched_count} rows (一致しない駅が見つかりました: {unmatched_count} 行)")
+        print(f"First unmatched names (最初の不一致駅名): {unmatched_samples}")
+    print(f"Passenger data cleaned and saved: {rows_written} rows. (乗客データがクリーンアップされ保存されました: {rows_written} 行)")
+    return rows_written
+
+def save_cleaned_data(cleaned_data, output_format='csv', snapshot_year=current_snapshot_year):
+    """
+    Save the cleaned passenger data to CSV, to the snapshot year's Parquet
+    partition, or both.
+    (クリーンアップされた乗客データをCSV・スナップショット年度のParquetパーティション・
+    またはその両方に保存する)
+    """
+    if writes_csv(output_format):
+        cleaned_data.to_csv(output_passenger_path, index=False, encoding='utf-8')
+    if writes_parquet(output_format):
+        write_parquet_partition(cleaned_data, output_passenger_parquet_path, snapshot_partition_column, snapshot_year)
     print("Passenger data cleaned and saved. (乗客データがクリーンアップされ保存されました)")
 
+@instrumented('clean_passenger')
 def main():
+    parser = argparse.ArgumentParser(description='Clean passenger data. (乗客データをクリーンアップする)')
+    parser.add_argument('--stream', action='store_true',
+                        help='Read passenger CSVs in chunks with bounded memory. (メモリを抑えてチャンク単位で読み込む)')
+    parser.add_argument('--chunk-size', type=int, default=stream_chunk_size,
+                        help='Rows per chunk in streaming mode. (ストリーミングモードのチャンク行数)')
+    parser.add_argument('--input', nargs='+', default=[input_passenger_path],
+                        help='Passenger CSVs to clean in streaming mode. (ストリーミングモードで処理する乗客CSV)')
+    parser.add_argument('--format', choices=OUTPUT_FORMATS, default='csv',
+                        help='Output format; Parquet is partitioned by snapshot year. (出力形式。Parquetはスナップショット年度で分割)')
+    parser.add_argument('--snapshot-year', type=int, default=current_snapshot_year,
+                        help='Ranking year the input describes, used as the Parquet partition. (入力のランキング年度)')
+    args = parser.parse_args()
+
+    if args.stream:
+        with span('clean_stream', chunk_size=args.chunk_size, format=args.format):
+            clean_passenger_data_streaming(args.input, input_stations_path, output_passenger_path, args.chunk_size,
+                                           args.format, args.snapshot_year)
+        return
+
     # Load datasets (データセットを読み込む)
-    passenger_data = pd.read_csv(input_passenger_path)
-    station_data = pd.read_csv(input_stations_path)
+    with span('read') as step:
+        passenger_data = pd.read_csv(input_passenger_path)
+        station_data = pd.read_csv(input_stations_path)
+        step.add_rows_out(len(passenger_data))
+    with span('load_resolver'):
+        resolver = load_station_resolver(input_stations_path)
 
     # Clean the data (データをクリーンアップする)
-    cleaned_data = clean_passenger_data(passenger_data, station_data)
+    with span('clean') as step:
+        step.add_rows_in(len(passenger_data))
+        cleaned_data = clean_passenger_data(passenger_data, station_data, resolver)
+        step.add_rows_out(len(cleaned_data))
 
     # Save the cleaned data (クリーンアップされたデータを保存する)
-    save_cleaned_data(cleaned_data)
+    with span('save', format=args.format) as step:
+        save_cleaned_data(cleaned_data, args.format, args.snapshot_year)
+        step.add_rows_out(len(cleaned_data))
 
 if __name__ == '__main__':
     main()
@@ -1,5 +1,14 @@
+import argparse
+
+import numpy as np
 import pandas as pd
 
+from instrumentation import instrumented, span
+from parquet_io import OUTPUT_FORMATS, parquet_path, write_parquet, writes_csv, writes_parquet
+
+# Parquet output is split into one directory per fiscal year (Parquet出力は会計年度ごとのディレクトリに分割)
+REVENUE_PARTITION_COLUMNS = ["Fiscal_Year"]
+
 def normalize_column_names(df):
     """
     Normalize column names by replacing spaces and special characters with underscores.
@@ -34,9 +43,12 @@ def clean_revenue_data(revenue_data):
     revenue_data["Calendar_Month"] = revenue_data["Fiscal_Month"].map(fiscal_to_calendar)
 
     # Calculate Calendar_Year based on Fiscal_Month (会計月に基づいて暦年を計算)
-    revenue_data["Calendar_Year"] = revenue_data.apply(
-        lambda row: row["Fiscal_Year"] if row["Fiscal_Month"] > 9 else row["Fiscal_Year"] - 1,
-        axis=1,
+    # Fiscal months 10-12 (January-March) fall in the fiscal year's own calendar year.
+    # 会計月10〜12（1〜3月）は会計年度と同じ暦年になります。
+    revenue_data["Calendar_Year"] = np.where(
+        revenue_data["Fiscal_Month"] > 9,
+        revenue_data["Fiscal_Year"],
+        revenue_data["Fiscal_Year"] - 1,
     )
 
     # Validate the Calendar_Year mapping (暦年マッピングを検証)
@@ -45,21 +57,39 @@ def clean_revenue_data(revenue_data):
 
     return revenue_data
 
+@instrumented("clean_revenue")
 def main():
+    parser = argparse.ArgumentParser(description="Clean revenue data. (収益データをクリーニングします)")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, default="csv",
+                        help="Output format; Parquet is partitioned by Fiscal_Year. (出力形式。ParquetはFiscal_Yearで分割)")
+    args = parser.parse_args()
+
     # Load raw revenue data (生の収益データをロード)
     revenue_path = "./data/processed/revenue_data.csv"
-    revenue_data = pd.read_csv(revenue_path)
+    with span("read") as step:
+        revenue_data = pd.read_csv(revenue_path)
+        step.add_rows_out(len(revenue_data))
     print(f"Columns in revenue_data before processing: {revenue_data.columns}")
 
     # Clean the revenue data (収益データをクリーニング)
-    cleaned_revenue = clean_revenue_data(revenue_data)
+    with span("clean") as step:
+        step.add_rows_in(len(revenue_data))
+        cleaned_revenue = clean_revenue_data(revenue_data)
+        step.add_rows_out(len(cleaned_revenue))
 
     print(f"Columns in revenue_data after processing: {cleaned_revenue.columns}")
 
     # Save the cleaned revenue data (クリーニング済みの収益データを保存)
     output_path = "./data/cleaned/revenues_cleaned.csv"
-    cleaned_revenue.to_csv(output_path, index=False)
-    print(f"Cleaned revenue data saved to {output_path}. (清潔な収益データが{output_path}に保存されました)")
+    with span("save", format=args.format) as step:
+        if writes_csv(args.format):
+            cleaned_revenue.to_csv(output_path, index=False)
+            print(f"Cleaned revenue data saved to {output_path}. (清潔な収益データが{output_path}に保存されました)")
+        if writes_parquet(args.format):
+            write_parquet(cleaned_revenue, parquet_path(output_path), partition_cols=REVENUE_PARTITION_COLUMNS)
+            print(f"Cleaned revenue data saved to {parquet_path(output_path)}. "
+                  f"(清潔な収益データが{parquet_path(output_path)}に保存されました)")
+        step.add_rows_out(len(cleaned_revenue))
 
 if __name__ == "__main__":
     main()
@@ -1,15 +1,22 @@
+import argparse
 import os
 import pandas as pd
 
+from instrumentation import instrumented, span
+from parquet_io import OUTPUT_FORMATS, parquet_path, write_parquet, writes_csv, writes_parquet
+
 # Paths for input and output files (入力ファイルと出力ファイルのパス)
 INPUT_STATION_PATH = "./data/processed/station_data_with_lines.csv"
 OUTPUT_STATION_PATH = "./data/cleaned/stations_cleaned.csv"
+OUTPUT_STATION_PARQUET_PATH = parquet_path(OUTPUT_STATION_PATH)
+OUTPUT_STATION_LINES_PATH = "./data/cleaned/station_lines_cleaned.csv"
+OUTPUT_STATION_LINES_PARQUET_PATH = parquet_path(OUTPUT_STATION_LINES_PATH)
 
 
-def normalize_station_lines(row):
+def normalize_station_lines(station_data):
     """
-    Normalize line fields for each station row.
-    (各駅行の路線フィールドを正規化します)
+    Normalize line fields for all station rows at once.
+    (全駅行の路線フィールドを一括で正規化します)
 
     Important:
     - Station_ID should remain unique.
@@ -21,16 +28,16 @@ def normalize_station_lines(row):
     - Mb03、Mb04、Mb05などの丸ノ内線分岐線の駅はMbのみに紐づけます。
     - これによりSQLiteでStation_IDの重複を防ぎます。
     """
-    station_id = str(row["Station_ID"]).strip()
+    station_ids = station_data["Station_ID"].astype(str).str.strip()
 
     # Marunouchi Branch stations should belong to Mb only.
     # 丸ノ内線分岐線の駅はMbのみに所属させます。
-    if station_id.startswith("Mb"):
-        row["Line_IDs"] = "Mb"
-        row["Line_Names_En"] = "Marunouchi Line Branch Line"
-        row["Line_Names_Jp"] = "丸ノ内線分岐線"
+    branch_mask = station_ids.str.startswith("Mb")
+    station_data.loc[branch_mask, "Line_IDs"] = "Mb"
+    station_data.loc[branch_mask, "Line_Names_En"] = "Marunouchi Line Branch Line"
+    station_data.loc[branch_mask, "Line_Names_Jp"] = "丸ノ内線分岐線"
 
-    return row
+    return station_data
 
 
 def clean_station_data(station_data):
@@ -77,7 +84,7 @@ def clean_station_data(station_data):
 
     # Normalize Marunouchi Branch stations.
     # 丸ノ内線分岐線の駅を正規化します。
-    cleaned_data = cleaned_data.apply(normalize_station_lines, axis=1)
+    cleaned_data = normalize_station_lines(cleaned_data)
 
     # Remove exact duplicate rows.
     # 完全に重複した行を削除します。
@@ -104,26 +111,63 @@ def clean_station_data(station_data):
     return cleaned_data
 
 
-def save_cleaned_data(cleaned_data):
+def build_station_lines(cleaned_data):
     """
-    Save cleaned station data to CSV.
-    (クリーン済み駅データをCSVに保存します)
+    Split each station's comma-joined Line_IDs into one (Station_ID, Line_ID) row
+    per line membership, for the StationLines bridge table.
+    (各駅のカンマ区切りのLine_IDsを路線ごとの (Station_ID, Line_ID) 行に分割し、
+    StationLines中間テーブル用のデータを作成します)
     """
-    os.makedirs(os.path.dirname(OUTPUT_STATION_PATH), exist_ok=True)
-    cleaned_data.to_csv(OUTPUT_STATION_PATH, index=False, encoding="utf-8")
-
-    print(
-        f"Station data cleaned and saved to {OUTPUT_STATION_PATH}. "
-        f"(駅データをクリーニングし、{OUTPUT_STATION_PATH} に保存しました。)"
+    station_lines = cleaned_data[["Station_ID", "Line_IDs"]].assign(
+        Line_ID=cleaned_data["Line_IDs"].str.split(",")
+    ).explode("Line_ID")
+    station_lines["Line_ID"] = station_lines["Line_ID"].str.strip()
+    station_lines = station_lines[station_lines["Line_ID"] != ""]
+    return (
+        station_lines[["Station_ID", "Line_ID"]]
+        .drop_duplicates()
+        .sort_values(["Station_ID", "Line_ID"])
+        .reset_index(drop=True)
     )
+
+
+def save_cleaned_data(cleaned_data, output_format="csv"):
+    """
+    Save cleaned station data and its station-line memberships to CSV, Parquet,
+    or both.
+    (クリーン済み駅データと駅・路線の所属関係をCSV・Parquet・またはその両方に保存します)
+    """
+    os.makedirs(os.path.dirname(OUTPUT_STATION_PATH), exist_ok=True)
+    station_lines = build_station_lines(cleaned_data)
+    output_paths = []
+    if writes_csv(output_format):
+        cleaned_data.to_csv(OUTPUT_STATION_PATH, index=False, encoding="utf-8")
+        station_lines.to_csv(OUTPUT_STATION_LINES_PATH, index=False, encoding="utf-8")
+        output_paths.extend([OUTPUT_STATION_PATH, OUTPUT_STATION_LINES_PATH])
+    if writes_parquet(output_format):
+        write_parquet(cleaned_data, OUTPUT_STATION_PARQUET_PATH)
+        write_parquet(station_lines, OUTPUT_STATION_LINES_PARQUET_PATH)
+        output_paths.extend([OUTPUT_STATION_PARQUET_PATH, OUTPUT_STATION_LINES_PARQUET_PATH])
+
+    for output_path in output_paths:
+        print(
+            f"Station data cleaned and saved to {output_path}. "
+            f"(駅データをクリーニングし、{output_path} に保存しました。)"
+        )
     print(f"Rows saved: {len(cleaned_data)} (保存行数: {len(cleaned_data)})")
 
 
+@instrumented("clean_station")
 def main():
     """
     Run station data cleaning.
     (駅データのクリーニングを実行します)
     """
+    parser = argparse.ArgumentParser(description="Clean station data. (駅データをクリーニングします)")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, default="csv",
+                        help="Output format. (出力形式)")
+    args = parser.parse_args()
+
     print("Starting station data cleaning. (駅データのクリーニングを開始します。)")
 
     # Validate input file exists
@@ -135,7 +179,9 @@ def main():
             f"Input file not found: {INPUT_STATION_PATH} (入力ファイルが見つかりません: {INPUT_STATION_PATH})"
         )
 
-    station_data = pd.read_csv(INPUT_STATION_PATH)
+    with span("read") as step:
+        station_data = pd.read_csv(INPUT_STATION_PATH)
+        step.add_rows_out(len(station_data))
 
     # Validate input data is not empty
     # (入力データが空でないことを確認)
@@ -144,8 +190,13 @@ def main():
             f"Input file is empty: {INPUT_STATION_PATH} (入力ファイルが空です: {INPUT_STATION_PATH})"
         )
 
-    cleaned_data = clean_station_data(station_data)
-    save_cleaned_data(cleaned_data)
+    with span("clean") as step:
+        step.add_rows_in(len(station_data))
+        cleaned_data = clean_station_data(station_data)
+        step.add_rows_out(len(cleaned_data))
+    with span("save", format=args.format) as step:
+        save_cleaned_data(cleaned_data, args.format)
+        step.add_rows_out(len(cleaned_data))
 
     print("Station data cleaning completed. (駅データのクリーニングが完了しました。)")
 
@@ -1,9 +1,16 @@
+import argparse
 import os
-import pandas as pd
+
+from instrumentation import instrumented, span
+from parquet_io import OUTPUT_FORMATS, parquet_path, read_cleaned_data, write_parquet, writes_csv, writes_parquet
 
 # Paths for input and output files (入力ファイルと出力ファイルのパス)
 INPUT_STATIONS_PATH = "./data/cleaned/stations_cleaned.csv"
 OUTPUT_LINES_PATH = "./data/cleaned/lines_cleaned.csv"
+OUTPUT_LINES_PARQUET_PATH = parquet_path(OUTPUT_LINES_PATH)
+
+# Station columns the Lines table is built from (路線テーブルの作成に使う駅データの列)
+LINE_SOURCE_COLUMNS = ["Line_IDs", "Line_Names_En", "Line_Names_Jp"]
 
 
 def create_lines_table(stations_data):
@@ -14,7 +21,7 @@ def create_lines_table(stations_data):
     The cleaned station data should already have one Line_ID per station row.
     (クリーン済み駅データでは、各駅行に1つのLine_IDがある前提です)
     """
-    required_columns = ["Line_IDs", "Line_Names_En", "Line_Names_Jp"]
+    required_columns = LINE_SOURCE_COLUMNS
 
     # Validate required columns before transformation.
     # 変換前に必要な列を検証します。
@@ -65,48 +72,72 @@ def create_lines_table(stations_data):
     return lines_data
 
 
-def save_lines_table(lines_data):
+def save_lines_table(lines_data, output_format="csv"):
     """
-    Save the Lines table to CSV.
-    (路線テーブルをCSVに保存します)
+    Save the Lines table to CSV, Parquet, or both.
+    (路線テーブルをCSV・Parquet・またはその両方に保存します)
     """
     os.makedirs(os.path.dirname(OUTPUT_LINES_PATH), exist_ok=True)
-    lines_data.to_csv(OUTPUT_LINES_PATH, index=False, encoding="utf-8")
-
-    print(
-        f"Lines data cleaned and saved to {OUTPUT_LINES_PATH}. "
-        f"(路線データをクリーニングし、{OUTPUT_LINES_PATH} に保存しました。)"
-    )
+    output_paths = []
+    if writes_csv(output_format):
+        lines_data.to_csv(OUTPUT_LINES_PATH, index=False, encoding="utf-8")
+        output_paths.append(OUTPUT_LINES_PATH)
+    if writes_parquet(output_format):
+        write_parquet(lines_data, OUTPUT_LINES_PARQUET_PATH)
+        output_paths.append(OUTPUT_LINES_PARQUET_PATH)
+
+    for output_path in output_paths:
+        print(
+            f"Lines data cleaned and saved to {output_path}. "
+            f"(路線データをクリーニングし、{output_path} に保存しました。)"
+        )
     print(f"Rows saved: {len(lines_data)} (保存行数: {len(lines_data)})")
 
 
+@instrumented("create_lines")
 def main():
     """
     Run line data creation.
     (路線データ作成を実行します)
     """
+    parser = argparse.ArgumentParser(description="Create the Lines table. (路線テーブルを作成します)")
+    parser.add_argument("--input", default=INPUT_STATIONS_PATH,
+                        help="Cleaned station CSV or Parquet file. (クリーン済み駅のCSVまたはParquetファイル)")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, default="csv",
+                        help="Output format. (出力形式)")
+    args = parser.parse_args()
+
     print("Starting line data creation. (路線データ作成を開始します。)")
 
     # Validate input file exists
     # (入力ファイルの存在を確認)
     from pathlib import Path
-    input_path = Path(INPUT_STATIONS_PATH)
+    input_path = Path(args.input)
     if not input_path.exists():
         raise FileNotFoundError(
-            f"Input file not found: {INPUT_STATIONS_PATH} (入力ファイルが見つかりません: {INPUT_STATIONS_PATH})"
+            f"Input file not found: {args.input} (入力ファイルが見つかりません: {args.input})"
         )
 
-    stations_data = pd.read_csv(INPUT_STATIONS_PATH)
+    # Only the line columns are read (Parquet decodes just those columns).
+    # 路線の列のみを読み込みます（Parquetではその列だけをデコードします）。
+    with span("read") as step:
+        stations_data = read_cleaned_data(args.input, columns=LINE_SOURCE_COLUMNS)
+        step.add_rows_out(len(stations_data))
 
     # Validate input data is not empty
     # (入力データが空でないことを確認)
     if stations_data.empty:
         raise ValueError(
-            f"Input file is empty: {INPUT_STATIONS_PATH} (入力ファイルが空です: {INPUT_STATIONS_PATH})"
+            f"Input file is empty: {args.input} (入力ファイルが空です: {args.input})"
         )
 
-    lines_data = create_lines_table(stations_data)
-    save_lines_table(lines_data)
+    with span("create") as step:
+        step.add_rows_in(len(stations_data))
+        lines_data = create_lines_table(stations_data)
+        step.add_rows_out(len(lines_data))
+    with span("save", format=args.format) as step:
+        save_lines_table(lines_data, args.format)
+        step.add_rows_out(len(lines_data))
 
     print("Line data creation completed. (路線データ作成が完了しました。)")
 
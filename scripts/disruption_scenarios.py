@@ -0,0 +1,527 @@
+import argparse
+import heapq
+import json
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import instrumented, span
+from station_graph import STATIONS_JSON_PATH, TRANSITION_RIDE, load_station_graph
+
+# Paths for input and output files (入力ファイルと出力ファイルのパス)
+DB_PATH = "./tokyo_metro.db"
+IMPACT_CSV_PATH = "./data/processed/disruption_impact.csv"
+
+# Scenarios per task handed to a worker process (ワーカープロセスに渡すタスクあたりのシナリオ数)
+SCENARIOS_PER_TASK = 16
+
+# Route cost changes smaller than this (minutes) are treated as rounding noise.
+# これより小さい（分）経路コストの変化は丸め誤差として扱います。
+DELAY_TOLERANCE_MINUTES = 1e-6
+
+IMPACT_COLUMNS = [
+    "Scenario",
+    "Closed_Stations",
+    "Closed_Segments",
+    "Penalized_Segments",
+    "Trees_Repaired",
+    "Paths_Recomputed",
+    "Pairs_Longer",
+    "Pairs_Disconnected",
+    "Affected_Trips",
+    "Extra_Trip_Minutes",
+    "Avg_Extra_Minutes",
+    "Max_Extra_Minutes",
+    "Unserved_Trips",
+    "Impact_Rank",
+]
+
+# Worker-process engine, set by init_worker (ワーカープロセス内のエンジン。init_worker で設定)
+_worker_engine = None
+
+
+def shortest_path_tree(source, indptr, indices, weights, n):
+    """
+    Run a single-source Dijkstra search over CSR arrays. Edges with an infinite
+    weight are closed.
+    (CSR配列上で単一始点のダイクストラ探索を実行します。重みが無限大の辺は閉鎖とみなします)
+    Returns:
+        tuple: (cost list, predecessor list) with -1 for no predecessor
+    """
+    inf = float("inf")
+    cost = [inf] * n
+    predecessor = [-1] * n
+    settled = [False] * n
+    cost[source] = 0.0
+    heap = [(0.0, source)]
+    while heap:
+        current_cost, u = heapq.heappop(heap)
+        if settled[u]:
+            continue
+        settled[u] = True
+        for e in range(indptr[u], indptr[u + 1]):
+            candidate = current_cost + weights[e]
+            v = indices[e]
+            if candidate < cost[v]:
+                cost[v] = candidate
+                predecessor[v] = u
+                heapq.heappush(heap, (candidate, v))
+    return cost, predecessor
+
+
+def load_station_demand(db_path, station_ids):
+    """
+    Return daily passengers per station index from the Passengers table. A
+    ranking row shared by several Station_IDs (one per line at an interchange)
+    is split evenly between them so the station is not counted once per line.
+    (Passengers テーブルから駅インデックスごとの1日平均乗客数を返します。乗換駅で
+    路線ごとの Station_ID に共有されるランキング行は、路線数で均等に分割して二重計上を防ぎます)
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        rows = conn.execute(
+            """
+            SELECT Station_ID,
+                   CAST(Daily_Passenger_Avg AS REAL) / COUNT(*) OVER (PARTITION BY English_Name)
+            FROM Passengers;
+            """
+        ).fetchall()
+    finally:
+        conn.close()
+
+    index = {station_id: i for i, station_id in enumerate(station_ids)}
+    demand = np.zeros(len(station_ids))
+    for station_id, passengers in rows:
+        if station_id in index:
+            demand[index[station_id]] += passengers
+    return demand
+
+
+def trip_matrix(demand):
+    """
+    Spread station demand over origin-destination pairs in proportion to the
+    product of both stations' passengers: trips(s, t) = d_s × d_t / Σd.
+    (駅の需要を、両駅の乗客数の積に比例して OD ペアに配分します: trips(s, t) = d_s × d_t / Σd)
+    """
+    total = demand.sum()
+    if total <= 0:
+        return np.zeros((len(demand), len(demand)))
+    trips = np.outer(demand, demand) / total
+    np.fill_diagonal(trips, 0.0)
+    return trips
+
+
+class DisruptionEngine:
+    """
+    Evaluate closures and penalties against baseline shortest-path trees. Only
+    the part of each tree below a changed edge is recomputed; every other
+    station keeps its baseline cost.
+    (閉鎖・ペナルティのシナリオを基準の最短経路木と比較して評価します。各木のうち
+    変更された辺より下の部分のみを再計算し、それ以外の駅は基準のコストを使います)
+
+    Scenarios are dicts with any of:
+    (シナリオは次のキーを持つ dict です)
+        name: label for the impact table; derived from the closures and penalties
+            when omitted (影響表でのラベル。省略時は閉鎖・ペナルティから生成)
+        closed_stations: ["G09", ...] (閉鎖駅)
+        closed_segments: [["G09", "G10"], ...], closed in both directions (両方向で閉鎖する区間)
+        penalties: [["G09", "G10", 10.0], ...], extra minutes in both directions (両方向の追加所要時間（分）)
+    """
+
+    def __init__(self, station_ids, indptr, indices, weights, trips, base_cost=None, base_predecessor=None):
+        self.station_ids = list(station_ids)
+        self.index = {station_id: i for i, station_id in enumerate(self.station_ids)}
+        self.n = len(self.station_ids)
+        self.indptr = list(indptr)
+        self.indices = list(indices)
+        self.weights = list(weights)
+        self.edge_sources = np.repeat(np.arange(self.n), np.diff(self.indptr))
+        self.edge_targets = np.asarray(self.indices)
+        self.trips = trips
+        if base_cost is None:
+            trees = [shortest_path_tree(s, self.indptr, self.indices, self.weights, self.n) for s in range(self.n)]
+            base_cost = np.array([cost for cost, _ in trees])
+            base_predecessor = np.array([predecessor for _, predecessor in trees], dtype=np.int32)
+        self.base_cost = base_cost
+        self.base_predecessor = base_predecessor
+        # Stations of each tree in settle order, so a parent always precedes its children.
+        # 各木の駅を確定順に並べたもの。親は必ず子より前に来ます。
+        self.base_order = np.argsort(base_cost, axis=1, kind="stable").tolist()
+
+        # Incoming edges in CSR form, for repairing a station from outside its subtree.
+        # 部分木の外側から駅を修復するための、CSR形式の入辺。
+        by_target = np.argsort(self.edge_targets, kind="stable")
+        self.in_indptr = np.concatenate([[0], np.cumsum(np.bincount(self.edge_targets, minlength=self.n))]).tolist()
+        self.in_sources = self.edge_sources[by_target].tolist()
+        self.in_edges = by_target.tolist()
+
+    @classmethod
+    def from_graph(cls, graph, demand):
+        """
+        Build an engine over a StationGraph, weighting edges by estimated minutes.
+        (StationGraph からエンジンを作成します。辺の重みは推定所要時間（分）です)
+        """
+        return cls(graph.station_ids, graph.indptr.tolist(), graph.indices.tolist(),
+                   graph.duration_min.tolist(), trip_matrix(demand))
+
+    def state(self):
+        """Return the constructor arguments, for rebuilding in a worker process. (ワーカー再構築用の引数)"""
+        return (self.station_ids, self.indptr, self.indices, self.weights, self.trips,
+                self.base_cost, self.base_predecessor)
+
+    def resolve(self, station_id):
+        if station_id not in self.index:
+            raise KeyError(f"Unknown station ID: {station_id} (不明な駅ID: {station_id})")
+        return self.index[station_id]
+
+    def segment_edges(self, origin_id, destination_id):
+        """
+        Return the edge positions between two stations in both directions.
+        (2駅間の両方向の辺の位置を返します)
+        """
+        u, v = self.resolve(origin_id), self.resolve(destination_id)
+        edges = np.flatnonzero(
+            ((self.edge_sources == u) & (self.edge_targets == v))
+            | ((self.edge_sources == v) & (self.edge_targets == u))
+        )
+        if len(edges) == 0:
+            raise ValueError(
+                f"No segment between {origin_id} and {destination_id} "
+                f"({origin_id} と {destination_id} の間に区間がありません)"
+            )
+        return edges
+
+    def scenario_weights(self, scenario):
+        """
+        Apply a scenario to the edge weights.
+        (シナリオを辺の重みに適用します)
+        Returns:
+            tuple: (weights list, changed edge positions, closed station indexes)
+        """
+        weights = np.asarray(self.weights, dtype=np.float64).copy()
+        closed = np.array(sorted({self.resolve(s) for s in scenario.get("closed_stations", [])}), dtype=np.int64)
+        if len(closed):
+            weights[np.isin(self.edge_sources, closed) | np.isin(self.edge_targets, closed)] = np.inf
+        for origin_id, destination_id in scenario.get("closed_segments", []):
+            weights[self.segment_edges(origin_id, destination_id)] = np.inf
+        for origin_id, destination_id, minutes in scenario.get("penalties", []):
+            if minutes < 0:
+                raise ValueError(
+                    f"Penalties must be non-negative: {origin_id}-{destination_id} {minutes} "
+                    f"(ペナルティは0以上である必要があります)"
+                )
+            weights[self.segment_edges(origin_id, destination_id)] += minutes
+        changed = np.flatnonzero(weights != np.asarray(self.weights))
+        return weights.tolist(), changed, closed
+
+    def affected_sources(self, changed_edges):
+        """
+        Return the sources whose baseline tree uses any changed edge. Weights only
+        go up, so every other tree is still a shortest-path tree.
+        (基準の木が変更された辺を使っている始点を返します。重みは増加のみのため、
+        それ以外の木は最短経路木のままです)
+        """
+        if len(changed_edges) == 0:
+            return np.array([], dtype=np.int64)
+        uses_edge = (
+            self.base_predecessor[:, self.edge_targets[changed_edges]] == self.edge_sources[changed_edges]
+        )
+        return np.flatnonzero(uses_edge.any(axis=1))
+
+    def repair_tree(self, source, weights, cut_roots):
+        """
+        Recompute the costs of the stations below the cut edges of one tree.
+        Stations outside that subtree keep their baseline cost, which is still
+        optimal because weights only increase. Each cut station is seeded from
+        its cheapest incoming edge from outside the subtree, then a Dijkstra
+        search runs inside the subtree only.
+        (1つの木で切断された辺より下の駅のコストを再計算します。重みは増加のみのため、
+        部分木の外側の駅は基準のコストのままで最適です。切断された各駅を部分木の外側からの
+        最安の入辺で初期化し、部分木の内側だけでダイクストラ探索を行います)
+        Returns:
+            tuple: (cost list, number of stations recomputed)
+        """
+        n = self.n
+        predecessor = self.base_predecessor[source].tolist()
+        is_root = [False] * n
+        for root in cut_roots:
+            is_root[root] = True
+        in_subtree = [False] * n
+        subtree = []
+        for v in self.base_order[source]:
+            p = predecessor[v]
+            if is_root[v] or (p >= 0 and in_subtree[p]):
+                in_subtree[v] = True
+                subtree.append(v)
+
+        inf = float("inf")
+        cost = self.base_cost[source].tolist()
+        for v in subtree:
+            cost[v] = inf
+        in_indptr, in_sources, in_edges = self.in_indptr, self.in_sources, self.in_edges
+        heap = []
+        for v in subtree:
+            best = inf
+            for k in range(in_indptr[v], in_indptr[v + 1]):
+                u = in_sources[k]
+                if not in_subtree[u]:
+                    candidate = cost[u] + weights[in_edges[k]]
+                    if candidate < best:
+                        best = candidate
+            if best < inf:
+                cost[v] = best
+                heap.append((best, v))
+        heapq.heapify(heap)
+
+        indptr, indices = self.indptr, self.indices
+        while heap:
+            current_cost, u = heapq.heappop(heap)
+            if current_cost > cost[u]:
+                continue
+            for e in range(indptr[u], indptr[u + 1]):
+                v = indices[e]
+                if in_subtree[v]:
+                    candidate = current_cost + weights[e]
+                    if candidate < cost[v]:
+                        cost[v] = candidate
+                        heapq.heappush(heap, (candidate, v))
+        return cost, len(subtree)
+
+    def scenario_costs(self, scenario):
+        """
+        Return the all-pairs cost matrix under a scenario, the number of trees
+        repaired and the number of (source, station) costs recomputed.
+        (シナリオ適用後の全駅間コスト行列、修復した木の数、再計算した (始点, 駅) の数を返します)
+        """
+        weights, changed, closed = self.scenario_weights(scenario)
+        cost = self.base_cost.copy()
+        sources = np.setdiff1d(self.affected_sources(changed), closed)
+        recomputed = 0
+        if len(sources):
+            edge_u, edge_v = self.edge_sources[changed], self.edge_targets[changed]
+            cut = self.base_predecessor[np.ix_(sources, edge_v)] == edge_u
+            for row, source in enumerate(sources):
+                cost[source], count = self.repair_tree(int(source), weights, edge_v[cut[row]].tolist())
+                recomputed += count
+        cost[closed, :] = np.inf
+        cost[:, closed] = np.inf
+        return cost, len(sources), recomputed
+
+    def evaluate(self, scenario):
+        """
+        Compare a scenario with the baseline and summarize the impact in trips
+        and minutes.
+        (シナリオを基準と比較し、影響をトリップ数と分で集計します)
+        """
+        cost, trees, recomputed = self.scenario_costs(scenario)
+        base = self.base_cost
+        reachable = np.isfinite(base)
+        disconnected = reachable & ~np.isfinite(cost)
+        delay = np.where(reachable & ~disconnected, cost - base, 0.0)
+        longer = delay > DELAY_TOLERANCE_MINUTES
+
+        affected_trips = float(self.trips[longer].sum())
+        extra_minutes = float((self.trips * delay)[longer].sum())
+        return {
+            "Scenario": scenario_name(scenario),
+            "Closed_Stations": ", ".join(scenario.get("closed_stations", [])),
+            "Closed_Segments": ", ".join(f"{a}-{b}" for a, b in scenario.get("closed_segments", [])),
+            "Penalized_Segments": ", ".join(f"{a}-{b}+{m:g}" for a, b, m in scenario.get("penalties", [])),
+            "Trees_Repaired": int(trees),
+            "Paths_Recomputed": int(recomputed),
+            "Pairs_Longer": int(longer.sum()),
+            "Pairs_Disconnected": int(disconnected.sum()),
+            "Affected_Trips": round(affected_trips, 1),
+            "Extra_Trip_Minutes": round(extra_minutes, 1),
+            "Avg_Extra_Minutes": round(extra_minutes / affected_trips, 2) if affected_trips > 0 else 0.0,
+            "Max_Extra_Minutes": round(float(delay.max()), 2) if longer.any() else 0.0,
+            "Unserved_Trips": round(float(self.trips[disconnected].sum()), 1),
+        }
+
+    def evaluate_many(self, scenarios, workers=None):
+        """
+        Evaluate scenarios across a process pool and rank them by impact:
+        unserved trips first, then extra trip-minutes.
+        (シナリオをプロセスプールで評価し、影響の大きさで順位付けします。
+        未輸送トリップ数、次に追加トリップ分の順で比較します)
+        Returns:
+            pd.DataFrame: One row per scenario in IMPACT_COLUMNS order (シナリオごとに1行)
+        """
+        workers = workers or os.cpu_count() or 1
+        if workers <= 1 or len(scenarios) <= SCENARIOS_PER_TASK:
+            rows = [self.evaluate(scenario) for scenario in scenarios]
+        else:
+            batches = [scenarios[i:i + SCENARIOS_PER_TASK] for i in range(0, len(scenarios), SCENARIOS_PER_TASK)]
+            with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                                     initargs=self.state()) as executor:
+                rows = [row for batch in executor.map(evaluate_batch, batches) for row in batch]
+
+        impact = pd.DataFrame(rows, columns=IMPACT_COLUMNS[:-1])
+        order = impact.sort_values(["Unserved_Trips", "Extra_Trip_Minutes"], ascending=False, kind="stable").index
+        impact.loc[order, "Impact_Rank"] = np.arange(1, len(impact) + 1)
+        impact["Impact_Rank"] = impact["Impact_Rank"].astype(np.int64)
+        return impact
+
+
+def init_worker(*state):
+    global _worker_engine
+    _worker_engine = DisruptionEngine(*state)
+
+
+def evaluate_batch(scenarios):
+    return [_worker_engine.evaluate(scenario) for scenario in scenarios]
+
+
+def single_closure_scenarios(graph):
+    """
+    Return one scenario per ride segment and one per station: the default
+    batch for finding the most critical links.
+    (乗車区間ごと・駅ごとに1つずつの閉鎖シナリオを返します。最も重要な区間を探す既定の一括評価です)
+    """
+    scenarios = []
+    sources = np.repeat(np.arange(graph.station_count), np.diff(graph.indptr))
+    seen = set()
+    for u, v, type_id in zip(sources, graph.indices, graph.type_ids):
+        pair = (min(u, v), max(u, v))
+        if type_id != TRANSITION_RIDE or pair in seen:
+            continue
+        seen.add(pair)
+        a, b = graph.station_ids[pair[0]], graph.station_ids[pair[1]]
+        scenarios.append({"name": f"segment {a}-{b}", "closed_segments": [[a, b]]})
+    for station_id in graph.station_ids:
+        scenarios.append({"name": f"station {station_id}", "closed_stations": [station_id]})
+    return scenarios
+
+
+def scenario_name(scenario):
+    """
+    Return a scenario's name, or one built from its closures and penalties.
+    (シナリオ名を返します。名前がなければ閉鎖・ペナルティから生成します)
+    """
+    if scenario.get("name"):
+        return scenario["name"]
+    parts = [f"station {station_id}" for station_id in scenario.get("closed_stations", [])]
+    parts += [f"segment {a}-{b}" for a, b in scenario.get("closed_segments", [])]
+    parts += [f"penalty {a}-{b}+{m:g}" for a, b, m in scenario.get("penalties", [])]
+    return ", ".join(parts) or "baseline"
+
+
+def load_scenarios(path):
+    """
+    Load a JSON list of scenarios, naming unnamed ones from their contents.
+    Names are the DisruptionImpact primary key, so duplicates are rejected
+    before any scenario is evaluated.
+    (シナリオのJSONリストを読み込み、名前のないものは内容から名前を付けます。名前は
+    DisruptionImpact の主キーのため、評価を始める前に重複を拒否します)
+    """
+    with open(path, "r", encoding="utf-8") as file:
+        scenarios = json.load(file)
+    if not isinstance(scenarios, list):
+        raise ValueError(f"Scenario file must contain a JSON list: {path} (シナリオファイルはJSONリストである必要があります)")
+
+    scenarios = [{**scenario, "name": scenario_name(scenario)} for scenario in scenarios]
+    names = [scenario["name"] for scenario in scenarios]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        raise ValueError(f"Duplicate scenario names in {path}: {duplicates} (シナリオ名が重複しています: {duplicates})")
+    return scenarios
+
+
+def write_impact_table(conn, impact):
+    """
+    Replace the DisruptionImpact table contents in one transaction.
+    (DisruptionImpactテーブルの内容を1トランザクションで置き換えます)
+    """
+    with conn:
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS DisruptionImpact (
+                Scenario TEXT PRIMARY KEY,
+                Closed_Stations TEXT NOT NULL,
+                Closed_Segments TEXT NOT NULL,
+                Penalized_Segments TEXT NOT NULL,
+                Trees_Repaired INTEGER NOT NULL,
+                Paths_Recomputed INTEGER NOT NULL,
+                Pairs_Longer INTEGER NOT NULL,
+                Pairs_Disconnected INTEGER NOT NULL,
+                Affected_Trips REAL NOT NULL,
+                Extra_Trip_Minutes REAL NOT NULL,
+                Avg_Extra_Minutes REAL NOT NULL,
+                Max_Extra_Minutes REAL NOT NULL,
+                Unserved_Trips REAL NOT NULL,
+                Impact_Rank INTEGER NOT NULL
+            );
+            """
+        )
+        conn.execute("DELETE FROM DisruptionImpact;")
+        conn.executemany(
+            f"INSERT INTO DisruptionImpact VALUES ({', '.join('?' for _ in IMPACT_COLUMNS)});",
+            impact[IMPACT_COLUMNS].itertuples(index=False, name=None),
+        )
+
+    print(f"Loaded {len(impact)} rows into DisruptionImpact. "
+          f"(DisruptionImpactに{len(impact)}行を読み込みました。)")
+
+
+@instrumented("disruption")
+def main():
+    """
+    Evaluate disruption scenarios and load the passenger-weighted impact into SQLite.
+    (運休シナリオを評価し、乗客数で重み付けした影響をSQLiteに読み込みます)
+    """
+    parser = argparse.ArgumentParser(
+        description="Evaluate station and segment closures. (駅・区間の閉鎖シナリオを評価します)"
+    )
+    parser.add_argument("--scenarios",
+                        help="JSON list of scenarios. Default: every single segment and station closure. "
+                             "(シナリオのJSONリスト。既定は全区間・全駅の単独閉鎖)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Worker processes. Default: CPU count. (ワーカープロセス数。既定はCPU数)")
+    args = parser.parse_args()
+
+    print("Starting disruption analysis. (運休影響の分析を開始します。)")
+    for path in [STATIONS_JSON_PATH, DB_PATH]:
+        if not Path(path).exists():
+            raise FileNotFoundError(f"Input file not found: {path} (入力ファイルが見つかりません: {path})")
+
+    with span("baseline") as step:
+        graph = load_station_graph(STATIONS_JSON_PATH)
+        engine = DisruptionEngine.from_graph(graph, load_station_demand(DB_PATH, graph.station_ids))
+        step.set(stations=graph.station_count)
+
+    scenarios = load_scenarios(args.scenarios) if args.scenarios else single_closure_scenarios(graph)
+    start = time.perf_counter()
+    with span("evaluate", workers=args.workers) as step:
+        step.add_rows_in(len(scenarios))
+        impact = engine.evaluate_many(scenarios, args.workers)
+        step.add_rows_out(len(impact))
+    paths = int(impact["Paths_Recomputed"].sum())
+    total = len(impact) * graph.station_count ** 2
+    print(f"Evaluated {len(impact)} scenarios in {time.perf_counter() - start:.2f}s, recomputing "
+          f"{paths:,} of {total:,} shortest paths ({paths / total:.1%}). "
+          f"({len(impact)}件のシナリオを評価しました。再計算した最短経路: {paths:,} / {total:,})")
+
+    with span("save") as step:
+        impact.to_csv(IMPACT_CSV_PATH, index=False, encoding="utf-8")
+        conn = sqlite3.connect(DB_PATH)
+        try:
+            write_impact_table(conn, impact)
+        finally:
+            conn.close()
+        step.add_rows_out(len(impact))
+
+    print("Most disruptive scenarios (影響の大きいシナリオ):")
+    for row in impact.nsmallest(10, "Impact_Rank").itertuples(index=False):
+        print(f"{row.Impact_Rank:>3}. {row.Scenario:<22} unserved={row.Unserved_Trips:>10,.0f} "
+              f"extra_min={row.Extra_Trip_Minutes:>12,.0f} longer_pairs={row.Pairs_Longer}")
+
+    print("Disruption analysis completed. (運休影響の分析が完了しました。)")
+
+
+if __name__ == "__main__":
+    main()
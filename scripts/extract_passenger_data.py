@@ -1,21 +1,54 @@
-import requests
 from bs4 import BeautifulSoup
 import pandas as pd
+import argparse
+import hashlib
 import os
 
+from http_cache import CachedFetcher
+from snapshot_store import ingest_snapshot
+
 # === Constants ===
 URL = "https://www.tokyometro.jp/lang_en/corporate/enterprise/transportation/ranking/index.html"
 OUTPUT_FILE = "data/processed/passenger_stats.csv"
+# Body hashes of the pages each output file was parsed from (各出力ファイルの元ページ本文のハッシュ)
+SOURCE_HASH_DIR = "data/cache/source_hashes"
 
 # === Functions ===
-def fetch_page_content(url):
-    """Fetch the HTML content from the Tokyo Metro website."""
-    response = requests.get(url)
-    if response.status_code == 200:
-        print("Page fetched successfully (ページ取得成功).")
-        return response.content
+def fetch_page(url, fetcher=None):
+    """
+    Fetch a page through the on-disk HTTP cache with a conditional GET.
+    (ディスク上のHTTPキャッシュを通して条件付きGETでページを取得します)
+    """
+    fetcher = fetcher or CachedFetcher()
+    result = fetcher.fetch(url)
+    if result.not_modified:
+        print("Page not modified, using cached copy (ページ未更新、キャッシュを使用).")
     else:
-        raise Exception(f"Failed to fetch page, status code: {response.status_code}")
+        print("Page fetched successfully (ページ取得成功).")
+    return result
+
+def fetch_page_content(url, fetcher=None):
+    """Fetch the HTML content from the Tokyo Metro website."""
+    return fetch_page(url, fetcher).content
+
+def source_hash_path(output_file):
+    """Return where the body hash for output_file is kept. (出力ファイルの元ハッシュの保存先を返します)"""
+    key = hashlib.sha256(os.path.abspath(output_file).encode("utf-8")).hexdigest()[:16]
+    stem = os.path.splitext(os.path.basename(output_file))[0]
+    return os.path.join(SOURCE_HASH_DIR, f"{stem}-{key}.source_sha256")
+
+def read_source_hash(path):
+    """Return the body hash the current output was parsed from, or None."""
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as file:
+        return file.read().strip()
+
+def write_source_hash(body_sha256, path):
+    """Record the body hash the output was parsed from."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as file:
+        file.write(body_sha256)
 
 def parse_passenger_data(html_content):
     """Parse the passenger data table."""
@@ -43,10 +76,47 @@ def save_to_csv(df, filepath):
     df.to_csv(filepath, index=False)
     print(f"Data saved to {filepath}.")
 
+def extract_passenger_data(url=URL, output_file=OUTPUT_FILE, fetcher=None, force=False):
+    """
+    Fetch the ranking page and parse it, skipping the parse when the page body is
+    the same one the existing output was built from.
+    (ランキングページを取得して解析します。既存の出力と同じ本文であれば解析を省略します)
+    Returns:
+        bool: True if the output was rewritten (出力を書き直した場合 True)
+    """
+    result = fetch_page(url, fetcher)
+    hash_file = source_hash_path(output_file)
+    if not force and os.path.exists(output_file) and read_source_hash(hash_file) == result.body_sha256:
+        print("Page content unchanged, skipping parse. (ページ内容に変更がないため解析をスキップします)")
+        return False
+
+    passenger_data = parse_passenger_data(result.content)
+    save_to_csv(passenger_data, output_file)
+    write_source_hash(result.body_sha256, hash_file)
+    return True
+
 # === Main Execution ===
-if __name__ == "__main__":
+def main():
+    parser = argparse.ArgumentParser(description="Extract passenger ranking data. (乗客ランキングデータを抽出します)")
+    parser.add_argument("--url", default=URL, help="Ranking page URL. (ランキングページのURL)")
+    parser.add_argument("--force", action="store_true",
+                        help="Parse even if the page body is unchanged. (本文が変わっていなくても解析します)")
+    parser.add_argument("--no-snapshot", action="store_true",
+                        help="Do not record the sources in the snapshot store. (スナップショットに記録しません)")
+    args = parser.parse_args()
+
     print("Starting data extraction... (データ抽出を開始します...)")
-    html_content = fetch_page_content(URL)
-    passenger_data = parse_passenger_data(html_content)
-    save_to_csv(passenger_data, OUTPUT_FILE)
+    extract_passenger_data(args.url, OUTPUT_FILE, force=args.force)
     print("Data extraction completed. (データ抽出が完了しました。)")
+
+    # Record this scrape so the database can be rebuilt as of it later; unchanged
+    # sources add no objects and no manifest.
+    # 後でこの時点のデータベースを再構築できるよう取得結果を記録します。ソースに変更が
+    # なければオブジェクトもマニフェストも追加されません。
+    if not args.no_snapshot:
+        manifest, _ = ingest_snapshot(label="extract-passenger")
+        if manifest is not None:
+            print(f"Recorded snapshot {manifest['id']}. (スナップショットを記録しました)")
+
+if __name__ == "__main__":
+    main()
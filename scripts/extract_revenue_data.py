@@ -1,11 +1,18 @@
 import pdfplumber
 import pandas as pd
+import argparse
+import json
 import os
 import re
+from concurrent.futures import ProcessPoolExecutor
+
+from fingerprint import sha256_file
+from instrumentation import current_span, instrumented, span
 
 # Directories
 PDF_DIR = "data/raw"  # PDFファイルが保存されているフォルダ
 CSV_OUTPUT = "data/processed/revenue_data.csv"  # 出力されるCSVファイル
+PAGE_CACHE_DIR = "data/cache/revenue_pages"  # ページテキストのキャッシュフォルダ
 
 # Ensure output directory exists (出力フォルダを確認)
 os.makedirs(os.path.dirname(CSV_OUTPUT), exist_ok=True)
@@ -106,6 +113,24 @@ def parse_revenue_line(line, start_year):
         print(f"Skipping malformed line: {line} - {e}")
         return None
 
+def parse_page_text(text, start_year):
+    """
+    Parse every monthly revenue line in the text of one PDF page.
+    PDF1ページ分のテキストから月次収入の行をすべて解析します。
+    Args:
+        text (str): Extracted page text (抽出されたページテキスト)
+        start_year (int): Starting calendar year of the fiscal period (会計年度の開始年)
+    Returns:
+        list: Parsed revenue rows (解析された収入データ行)
+    """
+    rows = []
+    for line in text.split("\n"):
+        if "月" in line or "Quarter" in line or "FY" in line:
+            parsed_data = parse_revenue_line(line, start_year)
+            if parsed_data:
+                rows.append(parsed_data)
+    return rows
+
 def extract_revenue_data_with_pdfplumber(pdf_dir):
     """
     Extract revenue data from PDFs using pdfplumber.
@@ -133,25 +158,142 @@ def extract_revenue_data_with_pdfplumber(pdf_dir):
                         print(f"No readable text found on page {page_num + 1} of {pdf_file}. (ページに読めるテキストがありません)")
                         continue
 
-                    lines = text.split("\n")
-                    for line in lines:
-                        print(f"Processing line: {line} (行を処理中)")
-                        if "月" in line or "Quarter" in line or "FY" in line:
-                            parsed_data = parse_revenue_line(line, start_year)
-                            if parsed_data:
-                                data.append(parsed_data)
+                    data.extend(parse_page_text(text, start_year))
+
+    return pd.DataFrame(data)
+
+def extract_page_text(pdf_path, page_index):
+    """
+    Extract the text of a single PDF page. Runs inside a worker process.
+    PDFの1ページ分のテキストを抽出します（ワーカープロセス内で実行）。
+    Args:
+        pdf_path (str): Path to the PDF file (PDFファイルのパス)
+        page_index (int): 0-based page index (0始まりのページ番号)
+    Returns:
+        str: Page text, or None if the page has no readable text (テキストがない場合はNone)
+    """
+    with pdfplumber.open(pdf_path) as pdf:
+        return pdf.pages[page_index].extract_text()
+
+def load_cached_pages(cache_dir, content_hash):
+    """
+    Load cached page texts for a PDF content hash.
+    PDFのコンテンツハッシュに対応するキャッシュ済みページテキストを読み込みます。
+    Returns:
+        list: Page texts, or None on a cache miss (キャッシュがない場合はNone)
+    """
+    cache_path = os.path.join(cache_dir, f"{content_hash}.json")
+    if not os.path.exists(cache_path):
+        return None
+    try:
+        with open(cache_path, "r", encoding="utf-8") as cache_file:
+            return json.load(cache_file)["pages"]
+    except (ValueError, KeyError):
+        print(f"Ignoring corrupt cache entry: {cache_path} (破損したキャッシュを無視します)")
+        return None
+
+def save_cached_pages(cache_dir, content_hash, pdf_file, pages):
+    """
+    Save page texts for a PDF content hash. The write is atomic so an interrupted
+    run never leaves a partial cache entry behind.
+    PDFのコンテンツハッシュに対応するページテキストを保存します（アトミックに書き込み）。
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    cache_path = os.path.join(cache_dir, f"{content_hash}.json")
+    tmp_path = f"{cache_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as cache_file:
+        json.dump({"file_name": pdf_file, "pages": pages}, cache_file, ensure_ascii=False)
+    os.replace(tmp_path, cache_path)
+
+def extract_revenue_data_parallel(pdf_dir, cache_dir=PAGE_CACHE_DIR, max_workers=None):
+    """
+    Extract revenue data from PDFs with a process pool and an on-disk page cache.
+    プロセスプールとディスク上のページキャッシュを使ってPDFから収入データを抽出します。
+
+    Page text is cached under the SHA-256 hash of each PDF's content, so unchanged
+    PDFs are not reopened on a rerun. Pages of changed or new PDFs are extracted
+    concurrently, one task per page.
+    (ページテキストは各PDFの内容のSHA-256ハッシュでキャッシュされるため、変更のないPDFは
+    再実行時に開かれません。変更・追加されたPDFのページは1ページ1タスクで並列抽出します。)
+    Args:
+        pdf_dir (str): Directory containing PDF files (PDFファイルが保存されているフォルダ)
+        cache_dir (str): Directory for cached page text (ページテキストのキャッシュフォルダ)
+        max_workers (int): Worker process count, defaults to the CPU count (ワーカー数、既定はCPU数)
+    Returns:
+        pd.DataFrame: Extracted revenue data (抽出された収入データ)
+    """
+    pdf_jobs = []
+    for pdf_file in sorted(os.listdir(pdf_dir)):
+        if not pdf_file.endswith(".pdf"):
+            continue
+        start_year = extract_fiscal_year(pdf_file)
+        if start_year is None:
+            print(f"Skipping {pdf_file} due to missing year. (年が見つからないためスキップします)")
+            continue
+        pdf_path = os.path.join(pdf_dir, pdf_file)
+        content_hash = sha256_file(pdf_path)
+        pdf_jobs.append((pdf_file, pdf_path, start_year, content_hash, load_cached_pages(cache_dir, content_hash)))
+
+    uncached = [job for job in pdf_jobs if job[4] is None]
+    page_texts = {job[0]: job[4] for job in pdf_jobs if job[4] is not None}
+    stage = current_span()
+    if stage is not None:
+        stage.set(pdfs=len(pdf_jobs), cache_hits=len(pdf_jobs) - len(uncached), cache_misses=len(uncached))
+    print(f"PDF page cache: {len(pdf_jobs) - len(uncached)} hit, {len(uncached)} miss. "
+          f"(ページキャッシュ: ヒット {len(pdf_jobs) - len(uncached)} 件、ミス {len(uncached)} 件)")
+
+    if uncached:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = {}
+            for pdf_file, pdf_path, start_year, content_hash, _ in uncached:
+                with pdfplumber.open(pdf_path) as pdf:
+                    page_count = len(pdf.pages)
+                print(f"Processing {pdf_file} (Starting Year: {start_year}, {page_count} pages)... "
+                      f"(処理中: {pdf_file} 開始年度: {start_year}、{page_count} ページ)")
+                futures[pdf_file] = [
+                    executor.submit(extract_page_text, pdf_path, page_index)
+                    for page_index in range(page_count)
+                ]
+
+            for pdf_file, pdf_path, start_year, content_hash, _ in uncached:
+                pages = [future.result() for future in futures[pdf_file]]
+                save_cached_pages(cache_dir, content_hash, pdf_file, pages)
+                page_texts[pdf_file] = pages
+
+    data = []
+    for pdf_file, pdf_path, start_year, content_hash, _ in pdf_jobs:
+        for page_num, text in enumerate(page_texts[pdf_file]):
+            if text is None:
+                print(f"No readable text found on page {page_num + 1} of {pdf_file}. (ページに読めるテキストがありません)")
+                continue
+            data.extend(parse_page_text(text, start_year))
 
     return pd.DataFrame(data)
 
+@instrumented("extract_revenue")
 def main():
     """
     Main function to extract and save revenue data.
     収入データを抽出して保存するメイン関数。
     """
+    parser = argparse.ArgumentParser(description="Extract monthly revenue data from PDFs. (PDFから月次収入データを抽出します)")
+    parser.add_argument("--serial", action="store_true",
+                        help="Extract in a single process without the page cache. (ページキャッシュを使わず単一プロセスで抽出)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Worker process count for parallel extraction. (並列抽出のワーカープロセス数)")
+    args = parser.parse_args()
+
     print("Starting extraction of revenue data... (収入データの抽出を開始します...)")
-    revenue_data = extract_revenue_data_with_pdfplumber(PDF_DIR)
+    with span("extract", mode="serial" if args.serial else "parallel") as step:
+        if args.serial:
+            revenue_data = extract_revenue_data_with_pdfplumber(PDF_DIR)
+        else:
+            revenue_data = extract_revenue_data_parallel(PDF_DIR, PAGE_CACHE_DIR, args.workers)
+        step.add_rows_out(len(revenue_data))
     if not revenue_data.empty:
-        revenue_data.to_csv(CSV_OUTPUT, index=False, encoding="utf-8")
+        with span("save") as step:
+            revenue_data.to_csv(CSV_OUTPUT, index=False, encoding="utf-8")
+            step.add_rows_out(len(revenue_data))
         print(f"Revenue data successfully saved to {CSV_OUTPUT}. (収入データが正常に保存されました: {CSV_OUTPUT})")
     else:
         print("No data extracted. Check PDF structure or parsing logic. (データが抽出されませんでした。PDFの構造または解析ロジックを確認してください。)")
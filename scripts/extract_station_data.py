@@ -2,11 +2,44 @@ import json
 import csv
 import os
 
+from instrumentation import instrumented, span
+
 def load_json(file_path):
     """Load JSON data from a file. (ファイルからJSONデータを読み込む)"""
     with open(file_path, 'r', encoding='utf-8') as file:
         return json.load(file)
 
+def build_line_prefix_index(lines):
+    """
+    Index line details by line ID, with the longest ID length, so each station
+    can be matched by its own ID prefix instead of scanning every line.
+    (路線IDで路線情報を索引化し、最長のID長を返す。全路線を走査せずに駅IDの接頭辞で照合できる)
+    Returns:
+        tuple: ({line_id: line details}, longest line ID length) (路線索引, 最長の路線ID長)
+    """
+    index = {
+        line_id: {
+            "line_id": line_id,
+            "line_name_en": line_info.get("name_en", ""),
+            "line_name_jp": line_info.get("name_jp", "")
+        }
+        for line_id, line_info in lines.items()
+    }
+    return index, max((len(line_id) for line_id in index), default=0)
+
+def match_station_line(station_id, line_index, max_prefix_length):
+    """
+    Return the line whose ID is the longest prefix of station_id, or None.
+    Longest match keeps branch stations such as Mb03 on Mb rather than M.
+    (station_id の最長の接頭辞に一致する路線を返す。なければ None。
+    最長一致により Mb03 などの分岐線の駅は M ではなく Mb に割り当てられる)
+    """
+    for length in range(min(max_prefix_length, len(station_id)), 0, -1):
+        line = line_index.get(station_id[:length])
+        if line is not None:
+            return line
+    return None
+
 def extract_station_data(json_data, output_path):
     """
     Extract station data with line details into a CSV file.
@@ -17,18 +50,14 @@ def extract_station_data(json_data, output_path):
     """
     stations = json_data.get('stations', {})  # Stations data (駅データ)
     lines = json_data.get('lines', {})        # Lines data (路線データ)
-    
-    # Create a mapping of station IDs to line details (駅IDと路線情報のマッピングを作成)
+
+    # Map each station ID to its line by longest ID prefix (駅IDの最長接頭辞で路線を対応付ける)
+    line_index, max_prefix_length = build_line_prefix_index(lines)
     station_to_lines = {}
-    for line_id, line_info in lines.items():
-        # No longer checking for `stations` list under `lines`
-        for station_id in stations.keys():  # Match by station IDs in the global list
-            if station_id.startswith(line_id):
-                station_to_lines.setdefault(station_id, []).append({
-                    "line_id": line_id,
-                    "line_name_en": line_info.get("name_en", ""),
-                    "line_name_jp": line_info.get("name_jp", "")
-                })
+    for station_id in stations:
+        line = match_station_line(station_id, line_index, max_prefix_length)
+        if line is not None:
+            station_to_lines[station_id] = [line]
 
     with open(output_path, 'w', newline='', encoding='utf-8') as csvfile:
         fieldnames = ['Station_ID', 'English_Name', 'Japanese_Name', 
@@ -53,6 +82,7 @@ def extract_station_data(json_data, output_path):
             })
     print("Station data extraction completed successfully. (駅データの抽出が正常に完了しました。)")
 
+@instrumented("extract_station")
 def main():
     """
     Main function to extract station data with line details.
@@ -66,9 +96,14 @@ def main():
         return
     
     try:
-        json_data = load_json(json_path)
+        with span("load_json"):
+            json_data = load_json(json_path)
         print("JSON data successfully loaded. (JSONデータの読み込みに成功しました。)")
-        extract_station_data(json_data, output_csv_path)
+        with span("extract") as step:
+            station_count = len(json_data.get('stations', {}))
+            step.add_rows_in(station_count)
+            extract_station_data(json_data, output_csv_path)
+            step.add_rows_out(station_count)
     except KeyError as e:
         print(f"KeyError: {e} (キーエラー: {e})")
     except Exception as e:
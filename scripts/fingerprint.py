@@ -0,0 +1,19 @@
+import hashlib
+
+# Read size for streaming file hashes (ファイルハッシュ計算時の読み込みサイズ)
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def sha256_file(file_path, chunk_size=HASH_CHUNK_SIZE):
+    """
+    Return the SHA-256 hex digest of a file's content.
+    (ファイル内容のSHA-256ハッシュ値を返します)
+
+    The file is read in chunks so large PDFs or CSVs are never held in memory.
+    (大きなPDFやCSVをメモリに保持しないよう、チャンク単位で読み込みます)
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        for chunk in iter(lambda: file.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
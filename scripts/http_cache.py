@@ -0,0 +1,164 @@
+import hashlib
+import json
+import os
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# On-disk response cache (ディスク上のレスポンスキャッシュ)
+HTTP_CACHE_DIR = "./data/cache/http"
+
+# Session defaults (セッションの既定値)
+REQUEST_TIMEOUT = (5, 30)  # (connect, read) seconds
+RETRY_TOTAL = 3
+RETRY_BACKOFF = 0.5
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+POOL_SIZE = 10
+USER_AGENT = "tokyo-metro-data-pipeline/1.0"
+
+
+def create_session(retries=RETRY_TOTAL, backoff=RETRY_BACKOFF, pool_size=POOL_SIZE):
+    """
+    Create a pooled requests.Session that retries transient failures with backoff.
+    (一時的な失敗をバックオフ付きで再試行する、接続プール付きの requests.Session を作成します)
+    """
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff,
+        status_forcelist=RETRY_STATUS_CODES,
+        allowed_methods=frozenset(["GET", "HEAD"]),
+        respect_retry_after_header=True,
+    )
+    adapter = HTTPAdapter(max_retries=retry, pool_connections=pool_size, pool_maxsize=pool_size)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers["User-Agent"] = USER_AGENT
+    return session
+
+
+def cache_paths(cache_dir, url):
+    """
+    Return the (metadata, body) cache file paths for a URL.
+    (URLに対応する (メタデータ, 本文) のキャッシュファイルパスを返します)
+    """
+    key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+    return (
+        os.path.join(cache_dir, f"{key}.json"),
+        os.path.join(cache_dir, f"{key}.body"),
+    )
+
+
+def read_cache_entry(cache_dir, url):
+    """
+    Return (metadata, body) for a cached URL, or (None, None) on a miss.
+    (キャッシュ済みURLの (メタデータ, 本文) を返します。ない場合は (None, None))
+    """
+    meta_path, body_path = cache_paths(cache_dir, url)
+    if not (os.path.exists(meta_path) and os.path.exists(body_path)):
+        return None, None
+    try:
+        with open(meta_path, "r", encoding="utf-8") as meta_file:
+            meta = json.load(meta_file)
+    except ValueError:
+        return None, None
+    with open(body_path, "rb") as body_file:
+        return meta, body_file.read()
+
+
+def write_cache_entry(cache_dir, url, content, headers):
+    """
+    Store a 200 response body with its validators and return the body's SHA-256.
+    (200レスポンスの本文と検証用ヘッダーを保存し、本文のSHA-256を返します)
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    meta_path, body_path = cache_paths(cache_dir, url)
+    body_sha256 = hashlib.sha256(content).hexdigest()
+    meta = {
+        "url": url,
+        "etag": headers.get("ETag"),
+        "last_modified": headers.get("Last-Modified"),
+        "body_sha256": body_sha256,
+        "fetched_at": time.time(),
+    }
+    # Body first, then metadata, each replaced atomically.
+    # 本文、メタデータの順にそれぞれアトミックに置き換えます。
+    for path, mode, payload in ((body_path, "wb", content),
+                                (meta_path, "w", json.dumps(meta, indent=2))):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, mode, **({} if "b" in mode else {"encoding": "utf-8"})) as file:
+            file.write(payload)
+        os.replace(tmp_path, path)
+    return body_sha256
+
+
+def conditional_headers(meta):
+    """
+    Build If-None-Match / If-Modified-Since headers from cache metadata.
+    (キャッシュのメタデータから If-None-Match / If-Modified-Since ヘッダーを作成します)
+    """
+    headers = {}
+    if meta:
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+    return headers
+
+
+class FetchResult:
+    """
+    Body and cache metadata for one fetch.
+    (1回の取得で得た本文とキャッシュ情報)
+
+    not_modified is True when the server answered 304 and the cached body was used.
+    body_sha256 identifies the body so callers can skip work on unchanged content.
+    (サーバーが304を返しキャッシュ済み本文を使った場合 not_modified は True です。
+    body_sha256 で本文を識別でき、内容が変わらない場合に処理を省略できます。)
+    """
+
+    def __init__(self, url, content, body_sha256, status_code, not_modified):
+        self.url = url
+        self.content = content
+        self.body_sha256 = body_sha256
+        self.status_code = status_code
+        self.not_modified = not_modified
+
+
+class CachedFetcher:
+    """
+    HTTP GET with a persistent on-disk cache and conditional requests.
+    (永続的なディスクキャッシュと条件付きリクエストを使う HTTP GET)
+
+    The ETag and Last-Modified of each cached response are sent back as
+    If-None-Match / If-Modified-Since, so an unchanged page costs a 304 with no body.
+    (キャッシュ済みレスポンスの ETag と Last-Modified を If-None-Match /
+    If-Modified-Since として送信するため、変更のないページは本文なしの304で済みます。)
+    """
+
+    def __init__(self, cache_dir=HTTP_CACHE_DIR, session=None, timeout=REQUEST_TIMEOUT):
+        self.cache_dir = cache_dir
+        self.session = session or create_session()
+        self.timeout = timeout
+
+    def fetch(self, url):
+        """
+        GET a URL, revalidating any cached copy with a conditional request.
+        (URLを取得します。キャッシュがあれば条件付きリクエストで再検証します)
+        Returns:
+            FetchResult: Body and cache metadata (本文とキャッシュ情報)
+        """
+        meta, cached_body = read_cache_entry(self.cache_dir, url)
+        headers = conditional_headers(meta)
+
+        response = self.session.get(url, headers=headers, timeout=self.timeout)
+
+        if response.status_code == 304 and meta:
+            return FetchResult(url, cached_body, meta["body_sha256"], 304, True)
+        if response.status_code != 200:
+            raise Exception(f"Failed to fetch page, status code: {response.status_code}")
+
+        body_sha256 = write_cache_entry(self.cache_dir, url, response.content, response.headers)
+        return FetchResult(url, response.content, body_sha256, 200, False)
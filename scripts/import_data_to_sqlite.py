@@ -1,8 +1,16 @@
+import argparse
+import csv
+import re
 import sqlite3
+import time
 from pathlib import Path
 
 import pandas as pd
 
+from instrumentation import instrumented, span
+from parquet_io import parquet_path, partition_values, read_cleaned_data
+from validate_cleaned_data import ensure_valid, format_report, validate_cleaned_tables
+
 # Schema and database file validation
 # (スキーマとデータベースファイルの検証)
 
@@ -12,15 +20,120 @@ SCHEMA_PATH = "./sql/create_schema.sql"
 TABLE_LOADS = [
     ("Lines", "./data/cleaned/lines_cleaned.csv"),
     ("Stations", "./data/cleaned/stations_cleaned.csv"),
+    ("StationLines", "./data/cleaned/station_lines_cleaned.csv"),
     ("Passengers", "./data/cleaned/passengers_cleaned.csv"),
     ("Revenue", "./data/cleaned/revenues_cleaned.csv"),
 ]
 
+# The same tables read from the cleaned Parquet outputs (--source parquet).
+# Passengers is partitioned by snapshot year; only the latest snapshot is loaded.
+# 同じテーブルをクリーン済みParquet出力から読み込む場合（--source parquet）。
+# Passengers はスナップショット年度で分割されており、最新のスナップショットのみを読み込みます。
+PARQUET_TABLE_LOADS = [(table_name, parquet_path(csv_path)) for table_name, csv_path in TABLE_LOADS]
+SNAPSHOT_PARTITION_COLUMN = "Snapshot_Year"
+
+# Business keys used to diff each CSV against its table in incremental mode.
+# 増分モードでCSVとテーブルを比較するための業務キー。
+TABLE_KEYS = {
+    "Lines": ["Line_ID"],
+    "Stations": ["Station_ID"],
+    "StationLines": ["Station_ID", "Line_ID"],
+    "Passengers": ["Station_ID"],
+    "Revenue": ["Fiscal_Year", "Fiscal_Month"],
+}
+
+# Rows per executemany batch in bulk mode (バルクモードでのexecutemany 1回あたりの行数)
+BULK_CHUNK_SIZE = 50_000
+
+# Connection settings applied for the duration of a bulk load.
+# バルクロード中に適用する接続設定。
+BULK_LOAD_PRAGMAS = [
+    "PRAGMA journal_mode = WAL;",
+    "PRAGMA synchronous = OFF;",
+    "PRAGMA cache_size = -262144;",  # 256 MiB
+    "PRAGMA temp_store = MEMORY;",
+]
+
+# Name of the object created by a schema statement (スキーマ文が作成するオブジェクト名)
+SCHEMA_OBJECT_NAME = re.compile(r"CREATE\s+(?:UNIQUE\s+)?(TABLE|INDEX|TRIGGER)\s+(\w+)", re.IGNORECASE)
+
+# Summary tables rebuilt for the groups listed in each dirty table. Each entry is
+# (summary table, dirty table, group columns, SELECT producing the group rows).
+# 各ダーティテーブルに記録されたグループについて再計算するサマリーテーブル。
+# (サマリーテーブル, ダーティテーブル, グループ列, グループ行を生成するSELECT)
+SUMMARY_REFRESHES = [
+    (
+        "LineDemandSummary",
+        "DirtyLineGroups",
+        ["Line_ID"],
+        """
+        SELECT sl.Line_ID, COUNT(DISTINCT p.Station_ID), SUM(p.Daily_Passenger_Avg)
+        FROM StationLines sl
+        JOIN Passengers p ON p.Station_ID = sl.Station_ID
+        WHERE sl.Line_ID IN (SELECT Line_ID FROM DirtyLineGroups)
+        GROUP BY sl.Line_ID
+        """,
+    ),
+    (
+        "StationRankingSummary",
+        "DirtyStationGroups",
+        ["English_Name", "Line_ID"],
+        """
+        SELECT p.English_Name, sl.Line_ID, SUM(p.Daily_Passenger_Avg)
+        FROM Passengers p
+        JOIN StationLines sl ON p.Station_ID = sl.Station_ID
+        WHERE EXISTS (
+            SELECT 1 FROM DirtyStationGroups d
+            WHERE d.English_Name IS p.English_Name AND d.Line_ID IS sl.Line_ID
+        )
+        GROUP BY p.English_Name, sl.Line_ID
+        """,
+    ),
+    (
+        "RevenueYearSummary",
+        "DirtyFiscalYears",
+        ["Fiscal_Year"],
+        """
+        SELECT Fiscal_Year, COUNT(*), SUM(Commuter_Revenue), SUM(Non_Commuter_Revenue),
+               SUM(Total_Revenue), AVG(Total_YoY_Percentage)
+        FROM Revenue
+        WHERE Fiscal_Year IN (SELECT Fiscal_Year FROM DirtyFiscalYears)
+        GROUP BY Fiscal_Year
+        """,
+    ),
+]
 
-def reset_database(db_path: str, schema_path: str) -> sqlite3.Connection:
+
+def split_schema_statements(schema_sql: str) -> tuple:
+    """
+    Split a schema script into (table statements, index and trigger statements).
+    (スキーマスクリプトを (テーブル定義文, インデックス・トリガー定義文) に分割します)
+    """
+    table_statements, index_statements = [], []
+    buffer = ""
+    for line in schema_sql.splitlines(keepends=True):
+        buffer += line
+        if sqlite3.complete_statement(buffer):
+            statement = "\n".join(
+                part for part in buffer.strip().splitlines() if not part.strip().startswith("--")
+            ).strip()
+            if statement.upper().startswith(("CREATE INDEX", "CREATE UNIQUE INDEX", "CREATE TRIGGER")):
+                index_statements.append(statement)
+            elif statement:
+                table_statements.append(statement)
+            buffer = ""
+    return table_statements, index_statements
+
+
+def reset_database(db_path: str, schema_path: str, include_indexes: bool = True) -> sqlite3.Connection:
     """
     Create a fresh SQLite database from the schema file.
     (スキーマファイルから新しいSQLiteデータベースを作成します)
+
+    With include_indexes=False, CREATE INDEX and CREATE TRIGGER statements are
+    skipped so they can be run after a bulk load (see create_deferred_objects).
+    (include_indexes=False の場合、CREATE INDEX・CREATE TRIGGER 文は実行せず、
+    バルクロード後に作成できるようにします（create_deferred_objects を参照）)
     """
     # Validate schema file exists
     # (スキーマファイルの存在を確認)
@@ -35,13 +148,20 @@ def reset_database(db_path: str, schema_path: str) -> sqlite3.Connection:
     if db_file.exists():
         db_file.unlink()
         print(f"Removed existing database: {db_path} (既存のデータベースを削除しました: {db_path})")
+    for suffix in ("-wal", "-shm"):
+        Path(f"{db_path}{suffix}").unlink(missing_ok=True)
 
     conn = sqlite3.connect(db_path)
     conn.execute("PRAGMA foreign_keys = ON;")
 
     try:
         with open(schema_path, "r", encoding="utf-8") as schema_file:
-            conn.executescript(schema_file.read())
+            schema_sql = schema_file.read()
+        if include_indexes:
+            conn.executescript(schema_sql)
+        else:
+            table_statements, _ = split_schema_statements(schema_sql)
+            conn.executescript(";\n".join(table_statements) + ";")
     except sqlite3.DatabaseError as e:
         conn.close()
         raise ValueError(
@@ -52,10 +172,188 @@ def reset_database(db_path: str, schema_path: str) -> sqlite3.Connection:
     return conn
 
 
-def load_csv_to_table(conn: sqlite3.Connection, table_name: str, csv_path: str) -> None:
+def normalize_schema_sql(sql: str) -> str:
     """
-    Load a cleaned CSV file into an existing SQLite table.
-    (クリーン済みCSVファイルを既存のSQLiteテーブルに読み込みます)
+    Normalize a CREATE statement so the text stored in sqlite_master compares
+    equal to the schema file's text: quoting, whitespace and IF NOT EXISTS are ignored.
+    (sqlite_master に保存された文とスキーマファイルの文を比較できるよう正規化します。
+    引用符・空白・IF NOT EXISTS の違いは無視します)
+    """
+    sql = re.sub(r"\s+", " ", sql.replace('"', "")).strip().rstrip(";").strip()
+    return re.sub(r"\bIF NOT EXISTS\s+", "", sql, flags=re.IGNORECASE)
+
+
+def rebuild_table(conn: sqlite3.Connection, table_name: str, statement: str) -> None:
+    """
+    Recreate a table from its new definition, copying the columns the old and new
+    definitions share. Foreign keys must be off (see open_database).
+    (新しい定義でテーブルを作り直し、新旧で共通する列のデータを移します。
+    外部キーは無効にしておく必要があります（open_database を参照）)
+    """
+    new_name = f"{table_name}__migrating"
+    conn.execute(re.sub(rf"\b{table_name}\b", new_name, statement, count=1))
+    old_columns = {row[1].lower() for row in conn.execute(f"PRAGMA table_info({table_name})")}
+    shared = [row[1] for row in conn.execute(f"PRAGMA table_info({new_name})") if row[1].lower() in old_columns]
+    if shared:
+        conn.execute(
+            f"INSERT INTO {new_name} ({', '.join(shared)}) SELECT {', '.join(shared)} FROM {table_name};"
+        )
+    conn.execute(f"DROP TABLE {table_name};")
+    conn.execute(f"ALTER TABLE {new_name} RENAME TO {table_name};")
+
+
+def migrate_schema(conn: sqlite3.Connection, schema_path: str) -> list:
+    """
+    Bring an existing database up to the schema file. Missing tables, indexes and
+    triggers are created; indexes and triggers whose definition changed are
+    recreated and those no longer in the schema are dropped. A changed table loaded
+    from a cleaned CSV (TABLE_KEYS) is recreated empty for the next sync to reload,
+    since its old rows may not meet the new constraints; other changed tables are
+    rebuilt with the columns they still share. When a TABLE_KEYS or summary table
+    changes, the summaries are emptied and every group is marked stale so the next
+    refresh fills them. Must run inside a transaction with foreign keys off.
+    (既存データベースをスキーマファイルに合わせます。不足しているテーブル・インデックス・
+    トリガーを作成し、定義が変わったインデックスとトリガーは作り直し、スキーマから消えたものは
+    削除します。クリーン済みCSVから読み込むテーブル（TABLE_KEYS）の定義が変わった場合は、
+    古い行が新しい制約を満たさない可能性があるため空で作り直して次回の同期で再読み込みし、
+    それ以外の定義が変わったテーブルは共通の列を保ったまま再構築します。TABLE_KEYSの
+    テーブルやサマリーテーブルが変わった場合は、サマリーを空にし、次回の更新で全件計算されるよう
+    全グループを古いものとして記録します。外部キーを無効にしたトランザクション内で
+    実行する必要があります)
+    Returns:
+        list: Names of the objects created or rebuilt (作成・再構築したオブジェクト名)
+    """
+    with open(schema_path, "r", encoding="utf-8") as schema_file:
+        table_statements, index_statements = split_schema_statements(schema_file.read())
+
+    schema = {}
+    for statement in table_statements + index_statements:
+        object_type, name = SCHEMA_OBJECT_NAME.match(statement).groups()
+        schema[name] = (object_type.lower(), statement)
+    existing = {
+        name: (object_type, table_name, sql)
+        for object_type, name, table_name, sql in conn.execute(
+            "SELECT type, name, tbl_name, sql FROM sqlite_master WHERE sql IS NOT NULL;"
+        )
+    }
+    changed = {
+        name for name, (_, statement) in schema.items()
+        if name in existing and normalize_schema_sql(existing[name][2]) != normalize_schema_sql(statement)
+    }
+
+    # Drop stale indexes and triggers first so no table rebuild trips over a
+    # trigger that references a removed column.
+    # 削除された列を参照するトリガーでテーブルの再構築が失敗しないよう、古いインデックスと
+    # トリガーを先に削除します。
+    for name, (object_type, table_name, _) in existing.items():
+        if object_type in ("index", "trigger") and table_name in schema and (name in changed or name not in schema):
+            conn.execute(f"DROP {object_type.upper()} {name};")
+
+    summary_tables = {table for summary, dirty, _, _ in SUMMARY_REFRESHES for table in (summary, dirty)}
+    migrated = []
+    for name, (object_type, statement) in schema.items():
+        if object_type != "table" or name not in changed:
+            continue
+        if name in summary_tables or name in TABLE_KEYS:
+            conn.execute(f"DROP TABLE {name};")
+            conn.execute(statement)
+        else:
+            rebuild_table(conn, name, statement)
+        migrated.append(name)
+
+    present = {row[0] for row in conn.execute("SELECT name FROM sqlite_master;")}
+    for name, (_, statement) in schema.items():
+        if name not in present:
+            conn.execute(statement)
+            if name not in migrated:
+                migrated.append(name)
+
+    if summary_tables.union(TABLE_KEYS).intersection(migrated):
+        # Tables recreated empty are marked again by the insert triggers as the sync reloads them.
+        # 空で作り直したテーブルは、同期での再読み込み時に挿入トリガーが再び記録します。
+        for table in summary_tables - set(migrated):
+            conn.execute(f"DELETE FROM {table};")
+        mark_all_groups_dirty(conn)
+
+    if migrated:
+        print(f"Migrated schema objects: {', '.join(migrated)} (スキーマを更新しました)")
+    return migrated
+
+
+def mark_all_groups_dirty(conn: sqlite3.Connection) -> None:
+    """
+    Record every summary group as stale so the next refresh recomputes them all.
+    (次回の更新で全件を再計算するよう、すべてのサマリーグループを古いものとして記録します)
+    """
+    conn.execute("INSERT OR IGNORE INTO DirtyLineGroups SELECT Line_ID FROM StationLines;")
+    conn.execute(
+        """
+        INSERT OR IGNORE INTO DirtyStationGroups
+        SELECT p.English_Name, sl.Line_ID
+        FROM Passengers p JOIN StationLines sl ON p.Station_ID = sl.Station_ID;
+        """
+    )
+    conn.execute("INSERT OR IGNORE INTO DirtyFiscalYears SELECT Fiscal_Year FROM Revenue;")
+
+
+def refresh_summary_tables(conn: sqlite3.Connection) -> dict:
+    """
+    Recompute the summary rows for every group recorded as stale by the schema
+    triggers, then clear the dirty tables. Groups left with no source rows are removed.
+    (スキーマのトリガーが古いものとして記録したグループのサマリー行を再計算し、
+    ダーティテーブルを空にします。元データがなくなったグループは削除されます)
+    Returns:
+        dict: Summary table → number of groups refreshed (サマリーテーブル → 更新グループ数)
+    """
+    refreshed = {}
+    for summary_table, dirty_table, group_columns, select_sql in SUMMARY_REFRESHES:
+        group_match = " AND ".join(f"d.{col} IS {summary_table}.{col}" for col in group_columns)
+        conn.execute(
+            f"DELETE FROM {summary_table} WHERE EXISTS (SELECT 1 FROM {dirty_table} d WHERE {group_match});"
+        )
+        conn.execute(f"INSERT INTO {summary_table} {select_sql};")
+        refreshed[summary_table] = conn.execute(f"DELETE FROM {dirty_table};").rowcount
+
+    print(
+        "Refreshed summary groups: "
+        + ", ".join(f"{table} {count}" for table, count in refreshed.items())
+        + " (サマリーを更新しました)"
+    )
+    return refreshed
+
+
+def source_filters(csv_path: str):
+    """
+    Return the partition filters for a cleaned Parquet dataset: the latest
+    snapshot for snapshot-partitioned data, otherwise no filter.
+    (クリーン済みParquetデータセットのパーティションフィルターを返します。スナップショット
+    年度で分割されたデータは最新のスナップショットのみ、それ以外はフィルターなし)
+    """
+    if not csv_path.endswith(".parquet") or not Path(csv_path).is_dir():
+        return None
+    snapshots = partition_values(csv_path, SNAPSHOT_PARTITION_COLUMN)
+    if not snapshots:
+        return None
+    return [(SNAPSHOT_PARTITION_COLUMN, "==", int(snapshots[-1]))]
+
+
+def read_table_source(conn: sqlite3.Connection, table_name: str, csv_path: str) -> pd.DataFrame:
+    """
+    Read the columns of a table from its cleaned CSV or Parquet source. Parquet
+    sources decode only those columns and the partitions selected by source_filters.
+    (クリーン済みのCSVまたはParquetからテーブルの列を読み込みます。Parquetでは
+    その列と source_filters で選んだパーティションのみをデコードします)
+    """
+    table_columns = [row[1] for row in conn.execute(f"PRAGMA table_info({table_name})")]
+    return read_cleaned_data(csv_path, columns=table_columns, filters=source_filters(csv_path))
+
+
+def load_csv_to_table(conn: sqlite3.Connection, table_name: str, csv_path: str) -> int:
+    """
+    Load a cleaned CSV file (or Parquet dataset) into an existing SQLite table.
+    (クリーン済みCSVファイル（またはParquetデータセット）を既存のSQLiteテーブルに読み込みます)
+    Returns:
+        int: Number of rows loaded (読み込んだ行数)
     """
     # Validate CSV file exists
     # (CSVファイルの存在を確認)
@@ -63,7 +361,7 @@ def load_csv_to_table(conn: sqlite3.Connection, table_name: str, csv_path: str)
     if not csv_file_path.exists():
         raise FileNotFoundError(f"CSV file not found: {csv_path} (CSVファイルが見つかりません: {csv_path})")
 
-    df = pd.read_csv(csv_path)
+    df = read_table_source(conn, table_name, csv_path)
 
     # Validate DataFrame is not empty
     # (DataFrameが空でないことを確認)
@@ -74,9 +372,11 @@ def load_csv_to_table(conn: sqlite3.Connection, table_name: str, csv_path: str)
 
     # Get expected columns from database schema
     # (データベーススキーマから予期される列を取得)
+    # SQLite column names are case-insensitive, so compare them case-folded.
+    # SQLiteの列名は大文字小文字を区別しないため、小文字化して比較します。
     cursor = conn.execute(f"PRAGMA table_info({table_name})")
-    expected_columns = {row[1] for row in cursor.fetchall()}
-    csv_columns = set(df.columns)
+    expected_columns = {row[1].lower() for row in cursor.fetchall()}
+    csv_columns = {col.lower() for col in df.columns}
 
     # Validate CSV columns match table schema
     # (CSV列がテーブルスキーマと一致することを確認)
@@ -92,6 +392,290 @@ def load_csv_to_table(conn: sqlite3.Connection, table_name: str, csv_path: str)
     df.to_sql(table_name, conn, if_exists="append", index=False)
 
     print(f"Loaded {len(df)} rows into {table_name}. ({table_name}に{len(df)}行を読み込みました。)")
+    return len(df)
+
+
+def load_table_columns(conn: sqlite3.Connection) -> dict:
+    """
+    Return {table name: [column names]} for every table in one query.
+    (1回のクエリで全テーブルの {テーブル名: [列名]} を返します)
+    """
+    columns = {}
+    rows = conn.execute(
+        """
+        SELECT m.name, p.name
+        FROM sqlite_master AS m
+        JOIN pragma_table_info(m.name) AS p
+        WHERE m.type = 'table'
+        ORDER BY m.name, p.cid;
+        """
+    )
+    for table_name, column_name in rows:
+        columns.setdefault(table_name, []).append(column_name)
+    return columns
+
+
+def bulk_load_csv_to_table(conn: sqlite3.Connection, table_name: str, csv_path: str,
+                           table_columns: list, chunk_size: int = BULK_CHUNK_SIZE) -> int:
+    """
+    Stream a cleaned CSV into a table in executemany batches without building a
+    DataFrame. Must run inside an open transaction. Empty fields load as NULL and
+    SQLite's column affinity converts numeric text.
+    (DataFrameを作らずに、クリーン済みCSVをexecutemanyのバッチでテーブルに流し込みます。
+    開いているトランザクション内で実行する必要があります。空欄はNULLとして読み込み、
+    数値文字列はSQLiteの列型アフィニティで変換されます)
+    Returns:
+        int: Number of rows loaded (読み込んだ行数)
+    """
+    csv_file_path = Path(csv_path)
+    if not csv_file_path.exists():
+        raise FileNotFoundError(f"CSV file not found: {csv_path} (CSVファイルが見つかりません: {csv_path})")
+
+    with open(csv_path, "r", encoding="utf-8", newline="") as csv_file:
+        reader = csv.reader(csv_file)
+        header = next(reader, None)
+        if header is None:
+            raise ValueError(
+                f"Input CSV file is empty: {csv_path} (入力CSVファイルが空です: {csv_path})"
+            )
+
+        positions = {col.lower(): i for i, col in enumerate(header)}
+        missing_columns = {col for col in table_columns if col.lower() not in positions}
+        if missing_columns:
+            raise ValueError(
+                f"CSV file missing columns for {table_name}: {missing_columns} "
+                f"({table_name}のCSVファイルに不足している列: {missing_columns})"
+            )
+
+        picks = [positions[col.lower()] for col in table_columns]
+        insert_sql = (
+            f"INSERT INTO {table_name} ({', '.join(table_columns)}) "
+            f"VALUES ({', '.join('?' for _ in table_columns)});"
+        )
+
+        total = 0
+        batch = []
+        for record in reader:
+            batch.append(tuple(record[i] if record[i] != "" else None for i in picks))
+            if len(batch) >= chunk_size:
+                conn.executemany(insert_sql, batch)
+                total += len(batch)
+                batch = []
+        if batch:
+            conn.executemany(insert_sql, batch)
+            total += len(batch)
+
+    if total == 0:
+        raise ValueError(
+            f"Input CSV file is empty: {csv_path} (入力CSVファイルが空です: {csv_path})"
+        )
+    return total
+
+
+def create_deferred_objects(conn: sqlite3.Connection, schema_path: str) -> tuple:
+    """
+    Run the schema's CREATE INDEX and CREATE TRIGGER statements after the data is
+    loaded, so no index is maintained and no trigger fires per loaded row.
+    (データ読み込み後にスキーマの CREATE INDEX・CREATE TRIGGER 文を実行します。
+    読み込む行ごとのインデックス更新やトリガーの発火を避けます)
+    Returns:
+        tuple: (indexes created, triggers created) (作成したインデックス数, トリガー数)
+    """
+    with open(schema_path, "r", encoding="utf-8") as schema_file:
+        _, deferred_statements = split_schema_statements(schema_file.read())
+    for statement in deferred_statements:
+        conn.execute(statement)
+    trigger_count = sum(statement.upper().startswith("CREATE TRIGGER") for statement in deferred_statements)
+    return len(deferred_statements) - trigger_count, trigger_count
+
+
+def bulk_rebuild_database(db_path: str, schema_path: str) -> sqlite3.Connection:
+    """
+    Rebuild the database with the bulk-load fast path: tuned PRAGMAs, one
+    transaction, streamed executemany batches, indexes and triggers created last,
+    and one full summary rebuild.
+    (高速バルクロードでデータベースを再構築します: PRAGMA調整、単一トランザクション、
+    executemanyによるストリーミング、インデックスとトリガーは最後に作成し、サマリーは
+    一度に全件再構築)
+    """
+    conn = reset_database(db_path, schema_path, include_indexes=False)
+    conn.isolation_level = None
+    for pragma in BULK_LOAD_PRAGMAS:
+        conn.execute(pragma)
+
+    table_columns = load_table_columns(conn)
+    conn.execute("BEGIN;")
+    try:
+        conn.execute("PRAGMA defer_foreign_keys = ON;")
+        for table_name, csv_path in TABLE_LOADS:
+            start = time.perf_counter()
+            with span(f"load_{table_name}", mode="bulk") as step:
+                row_count = bulk_load_csv_to_table(conn, table_name, csv_path, table_columns[table_name])
+                step.add_rows_out(row_count)
+            elapsed = time.perf_counter() - start
+            rate = row_count / elapsed if elapsed > 0 else float("inf")
+            print(
+                f"Loaded {row_count} rows into {table_name} in {elapsed:.3f}s ({rate:,.0f} rows/sec). "
+                f"({table_name}に{row_count}行を読み込みました: {elapsed:.3f}秒、毎秒{rate:,.0f}行)"
+            )
+
+        start = time.perf_counter()
+        with span("create_indexes") as step:
+            index_count, trigger_count = create_deferred_objects(conn, schema_path)
+            step.set(indexes=index_count, triggers=trigger_count)
+        if index_count or trigger_count:
+            print(f"Created {index_count} indexes and {trigger_count} triggers in {time.perf_counter() - start:.3f}s. "
+                  f"(インデックスを{index_count}個、トリガーを{trigger_count}個作成しました)")
+        # The triggers did not see the loaded rows, so rebuild every summary group.
+        # トリガーは読み込んだ行を検知していないため、全サマリーグループを再構築します。
+        with span("refresh_summaries"):
+            mark_all_groups_dirty(conn)
+            refresh_summary_tables(conn)
+        conn.execute("COMMIT;")
+    except Exception:
+        conn.execute("ROLLBACK;")
+        conn.close()
+        raise
+
+    # Restore durable writes for anything that uses this connection afterwards.
+    # 以降の書き込みのために耐久性のある同期設定に戻します。
+    conn.execute("PRAGMA synchronous = NORMAL;")
+    return conn
+
+
+def open_database(db_path: str, schema_path: str) -> sqlite3.Connection:
+    """
+    Open the existing SQLite database, creating it from the schema only if it is missing.
+    (既存のSQLiteデータベースを開きます。存在しない場合のみスキーマから作成します)
+    """
+    if not Path(db_path).exists():
+        conn = reset_database(db_path, schema_path)
+        # Transactions are managed explicitly by sync_tables.
+        # トランザクションは sync_tables で明示的に管理します。
+        conn.isolation_level = None
+        return conn
+
+    conn = sqlite3.connect(db_path)
+    conn.isolation_level = None
+    # Foreign keys stay off while migrate_schema rebuilds tables; the pragma
+    # cannot change inside a transaction.
+    # migrate_schema がテーブルを再構築する間は外部キーを無効にします（トランザクション内では変更できません）。
+    conn.execute("BEGIN IMMEDIATE;")
+    try:
+        migrate_schema(conn, schema_path)
+        conn.execute("COMMIT;")
+    except Exception:
+        conn.execute("ROLLBACK;")
+        conn.close()
+        raise
+    conn.execute("PRAGMA foreign_keys = ON;")
+    return conn
+
+
+def sync_csv_to_table(conn: sqlite3.Connection, table_name: str, csv_path: str) -> dict:
+    """
+    Diff a cleaned CSV against an existing table by business key and apply only
+    the inserts, updates and deletes. Must run inside an open transaction.
+    (クリーン済みCSVと既存テーブルを業務キーで比較し、追加・更新・削除のみを適用します。
+    開いているトランザクション内で実行する必要があります)
+
+    The CSV is staged in a temporary copy of the table so both sides are compared
+    with the same column affinities.
+    (両者を同じ列型アフィニティで比較するため、CSVはテーブルと同じ定義の一時テーブルに
+    ステージングします)
+    """
+    csv_file_path = Path(csv_path)
+    if not csv_file_path.exists():
+        raise FileNotFoundError(f"CSV file not found: {csv_path} (CSVファイルが見つかりません: {csv_path})")
+
+    df = read_table_source(conn, table_name, csv_path)
+    if df.empty:
+        raise ValueError(
+            f"Input CSV file is empty: {csv_path} (入力CSVファイルが空です: {csv_path})"
+        )
+
+    table_columns = [row[1] for row in conn.execute(f"PRAGMA table_info({table_name})")]
+    csv_columns = {col.lower(): col for col in df.columns}
+    missing_columns = {col for col in table_columns if col.lower() not in csv_columns}
+    if missing_columns:
+        raise ValueError(
+            f"CSV file missing columns for {table_name}: {missing_columns} "
+            f"({table_name}のCSVファイルに不足している列: {missing_columns})"
+        )
+
+    keys = TABLE_KEYS[table_name]
+    values = [col for col in table_columns if col not in keys]
+    stage = f"temp.stage_{table_name}"
+    staged = df[[csv_columns[col.lower()] for col in table_columns]].astype(object)
+    staged = staged.where(staged.notna(), None)
+
+    conn.execute(f"DROP TABLE IF EXISTS {stage};")
+    conn.execute(f"CREATE TABLE {stage} AS SELECT * FROM main.{table_name} WHERE 0;")
+    placeholders = ", ".join("?" for _ in table_columns)
+    conn.executemany(f"INSERT INTO {stage} VALUES ({placeholders});", staged.itertuples(index=False, name=None))
+
+    duplicates = conn.execute(
+        f"SELECT COUNT(*) FROM (SELECT 1 FROM {stage} GROUP BY {', '.join(keys)} HAVING COUNT(*) > 1);"
+    ).fetchone()[0]
+    if duplicates:
+        raise ValueError(
+            f"Duplicate {keys} values in {csv_path}. ({csv_path} に重複する {keys} があります)"
+        )
+
+    key_tuple = f"({', '.join(keys)})"
+    key_match = " AND ".join(f"s.{key} = t.{key}" for key in keys)
+    changed = " OR ".join(f"s.{col} IS NOT t.{col}" for col in values) or "0"
+
+    deleted = conn.execute(
+        f"DELETE FROM main.{table_name} WHERE {key_tuple} NOT IN (SELECT {', '.join(keys)} FROM {stage});"
+    ).rowcount
+    updated = conn.execute(
+        f"""
+        UPDATE main.{table_name} AS t
+        SET ({', '.join(values)}) = (SELECT {', '.join(values)} FROM {stage} AS s WHERE {key_match})
+        WHERE EXISTS (SELECT 1 FROM {stage} AS s WHERE {key_match} AND ({changed}));
+        """
+    ).rowcount if values else 0
+    inserted = conn.execute(
+        f"""
+        INSERT INTO main.{table_name} ({', '.join(table_columns)})
+        SELECT {', '.join(table_columns)} FROM {stage} AS s
+        WHERE NOT EXISTS (SELECT 1 FROM main.{table_name} AS t WHERE {key_match});
+        """
+    ).rowcount
+    conn.execute(f"DROP TABLE {stage};")
+
+    print(
+        f"Synced {table_name}: {inserted} inserted, {updated} updated, {deleted} deleted. "
+        f"({table_name}を同期しました: 追加 {inserted}、更新 {updated}、削除 {deleted})"
+    )
+    return {"inserted": inserted, "updated": updated, "deleted": deleted}
+
+
+def sync_tables(conn: sqlite3.Connection, table_loads: list = TABLE_LOADS) -> dict:
+    """
+    Sync every cleaned CSV into its table in one transaction. Foreign keys are
+    checked at commit, so tables can be synced in any order. Summary tables are
+    refreshed for the affected groups in the same transaction.
+    (すべてのクリーン済みCSVを1トランザクションでテーブルに同期します。外部キーは
+    コミット時に検証されるため、テーブルの同期順序は問いません。サマリーテーブルは
+    同じトランザクション内で影響を受けたグループのみ更新します)
+    """
+    results = {}
+    conn.execute("BEGIN IMMEDIATE;")
+    try:
+        conn.execute("PRAGMA defer_foreign_keys = ON;")
+        for table_name, csv_path in table_loads:
+            with span(f"sync_{table_name}") as step:
+                results[table_name] = sync_csv_to_table(conn, table_name, csv_path)
+                step.set(**results[table_name])
+        with span("refresh_summaries") as step:
+            step.set(**refresh_summary_tables(conn))
+        conn.execute("COMMIT;")
+    except Exception:
+        conn.execute("ROLLBACK;")
+        raise
+    return results
 
 
 def validate_row_counts(conn: sqlite3.Connection) -> None:
@@ -106,20 +690,58 @@ def validate_row_counts(conn: sqlite3.Connection) -> None:
         print(f"- {table_name}: {row_count} rows")
 
 
+@instrumented("import_sqlite")
 def main() -> None:
     """
-    Rebuild the SQLite database from cleaned CSV outputs.
-    (クリーン済みCSV出力からSQLiteデータベースを再構築します)
+    Rebuild the SQLite database from cleaned CSV outputs, or with --incremental,
+    apply only the changed rows to the existing database.
+    (クリーン済みCSV出力からSQLiteデータベースを再構築します。--incremental 指定時は
+    既存データベースに変更行のみを適用します)
     """
-    conn = reset_database(DB_PATH, SCHEMA_PATH)
+    parser = argparse.ArgumentParser(description="Load cleaned CSVs into SQLite. (クリーン済みCSVをSQLiteに読み込みます)")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--incremental", action="store_true",
+                      help="Upsert changed rows instead of rebuilding the database. (再構築せず変更行のみを反映)")
+    mode.add_argument("--bulk", action="store_true",
+                      help="Rebuild with the streaming bulk-load fast path. (ストリーミングの高速バルクロードで再構築)")
+    parser.add_argument("--source", choices=["csv", "parquet"], default="csv",
+                        help="Read the cleaned CSVs or the cleaned Parquet outputs. (クリーン済みCSVまたはParquetを読み込む)")
+    parser.add_argument("--skip-validation", action="store_true",
+                        help="Skip the schema check of the cleaned inputs before loading. (読み込み前のスキーマ検証を省略)")
+    args = parser.parse_args()
+    if args.bulk and args.source == "parquet":
+        parser.error("--bulk streams CSV files; use the default or --incremental mode with --source parquet.")
+    table_loads = PARQUET_TABLE_LOADS if args.source == "parquet" else TABLE_LOADS
+
+    # Check every cleaned input against the schema before the database is touched.
+    # データベースに触れる前に、全てのクリーン済み入力をスキーマで検証します。
+    if not args.skip_validation:
+        with span("validate") as step:
+            report = validate_cleaned_tables(table_loads, SCHEMA_PATH, source_filters, TABLE_KEYS)
+            step.set(violations=len(report["violations"]))
+        print(format_report(report)[0])
+        ensure_valid(report)
 
-    for table_name, csv_path in TABLE_LOADS:
-        load_csv_to_table(conn, table_name, csv_path)
+    if args.incremental:
+        conn = open_database(DB_PATH, SCHEMA_PATH)
+        sync_tables(conn, table_loads)
+    elif args.bulk:
+        conn = bulk_rebuild_database(DB_PATH, SCHEMA_PATH)
+    else:
+        conn = reset_database(DB_PATH, SCHEMA_PATH)
+        for table_name, csv_path in table_loads:
+            with span(f"load_{table_name}", source=args.source) as step:
+                step.add_rows_out(load_csv_to_table(conn, table_name, csv_path))
+        with conn, span("refresh_summaries"):
+            refresh_summary_tables(conn)
 
     validate_row_counts(conn)
 
     conn.close()
-    print("\nSQLite database rebuilt successfully. (SQLiteデータベースの再構築が完了しました。)")
+    if args.incremental:
+        print("\nSQLite database synced incrementally. (SQLiteデータベースの増分同期が完了しました。)")
+    else:
+        print("\nSQLite database rebuilt successfully. (SQLiteデータベースの再構築が完了しました。)")
 
 
 if __name__ == "__main__":
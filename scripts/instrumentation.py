@@ -0,0 +1,249 @@
+import cProfile
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from functools import wraps
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Environment switches, so the pipeline runner can turn instrumentation on for
+# every stage subprocess without changing their command lines.
+# パイプラインランナーが各ステージのコマンドラインを変えずに計測を有効にできるよう、
+# 環境変数で切り替えます。
+LOG_LEVEL_ENV = "TOKYO_METRO_LOG_LEVEL"      # DEBUG, INFO, WARNING (default), ...
+LOG_FORMAT_ENV = "TOKYO_METRO_LOG_FORMAT"    # "text" (default) or "json"
+REPORT_DIR_ENV = "TOKYO_METRO_REPORT_DIR"    # Write <name>.json run reports here
+PROFILE_DIR_ENV = "TOKYO_METRO_PROFILE_DIR"  # Write <name>.prof cProfile dumps here
+
+LOGGER_NAME = "tokyo_metro"
+DEFAULT_LOG_LEVEL = "WARNING"
+
+
+def peak_rss_mb():
+    """
+    Return this process's peak resident set size in MiB, or None if unavailable.
+    (このプロセスの最大常駐メモリ (MiB) を返します。取得できない場合は None)
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS and KiB on Linux (macOS はバイト、Linux は KiB)
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with span fields as top-level keys. (1行1オブジェクトのJSON形式)"""
+
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            **getattr(record, "fields", {}),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Human-readable lines with key=value fields. (key=value 形式の読みやすい行)"""
+
+    def format(self, record):
+        fields = " ".join(f"{key}={value}" for key, value in getattr(record, "fields", {}).items())
+        line = f"{record.levelname:<7} {record.name}: {record.getMessage()}"
+        return f"{line} {fields}" if fields else line
+
+
+def configure_logging(level=None, log_format=None):
+    """
+    Configure the shared logger once. Logs go to stderr so they never mix with a
+    script's regular stdout output.
+    (共有ロガーを一度だけ設定します。通常の標準出力と混ざらないよう、ログは標準エラーに出力します)
+    """
+    logger = logging.getLogger(LOGGER_NAME)
+    if getattr(logger, "_configured", False):
+        return logger
+    level = (level or os.environ.get(LOG_LEVEL_ENV) or DEFAULT_LOG_LEVEL).upper()
+    log_format = log_format or os.environ.get(LOG_FORMAT_ENV, "text")
+
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(JsonFormatter() if log_format == "json" else TextFormatter())
+    logger.addHandler(handler)
+    logger.setLevel(level)
+    logger.propagate = False
+    logger._configured = True
+    return logger
+
+
+def get_logger(name=None):
+    """Return the shared logger or one of its children. (共有ロガーまたはその子ロガーを返します)"""
+    return logging.getLogger(f"{LOGGER_NAME}.{name}" if name else LOGGER_NAME)
+
+
+def log(level, message, **fields):
+    """
+    Log a message with structured fields on the shared logger.
+    (構造化フィールド付きのメッセージを共有ロガーに出力します)
+    """
+    get_logger().log(level, message, extra={"fields": fields})
+
+
+class Span:
+    """
+    A timed step with row counters and nested sub-steps.
+    (行数カウンターと入れ子のサブステップを持つ計測区間)
+    """
+
+    def __init__(self, name, fields):
+        self.name = name
+        self.fields = dict(fields)
+        self.rows_in = None
+        self.rows_out = None
+        self.children = []
+        self.status = "ok"
+        self.wall_start = time.perf_counter()
+        self.cpu_start = time.process_time()
+        self.seconds = None
+        self.cpu_seconds = None
+        self.peak_rss_mb = None
+
+    def add_rows_in(self, count):
+        self.rows_in = (self.rows_in or 0) + int(count)
+
+    def add_rows_out(self, count):
+        self.rows_out = (self.rows_out or 0) + int(count)
+
+    def set(self, **fields):
+        self.fields.update(fields)
+
+    def finish(self, error=None):
+        self.seconds = round(time.perf_counter() - self.wall_start, 6)
+        self.cpu_seconds = round(time.process_time() - self.cpu_start, 6)
+        self.peak_rss_mb = peak_rss_mb()
+        if error is not None:
+            self.status = f"error: {type(error).__name__}"
+
+    def to_dict(self):
+        entry = {
+            "name": self.name,
+            "status": self.status,
+            "seconds": self.seconds,
+            "cpu_seconds": self.cpu_seconds,
+            "peak_rss_mb": self.peak_rss_mb,
+        }
+        if self.rows_in is not None:
+            entry["rows_in"] = self.rows_in
+        if self.rows_out is not None:
+            entry["rows_out"] = self.rows_out
+        if self.fields:
+            entry["fields"] = self.fields
+        if self.children:
+            entry["children"] = [child.to_dict() for child in self.children]
+        return entry
+
+
+_state = threading.local()
+_root_spans = []
+
+
+def current_span():
+    stack = getattr(_state, "stack", None)
+    return stack[-1] if stack else None
+
+
+@contextmanager
+def span(name, **fields):
+    """
+    Time a stage or sub-step. Spans nest, and each one is logged at INFO when it
+    ends with its duration, CPU time, row counts and peak RSS.
+    (ステージやサブステップを計測します。区間は入れ子にでき、終了時に所要時間・CPU時間・
+    行数・最大常駐メモリを INFO レベルで出力します)
+    """
+    stack = getattr(_state, "stack", None)
+    if stack is None:
+        stack = _state.stack = []
+    current = Span(name, fields)
+    (stack[-1].children if stack else _root_spans).append(current)
+    stack.append(current)
+    log(logging.DEBUG, "span start", span=name, **fields)
+    try:
+        yield current
+    except BaseException as error:
+        current.finish(error)
+        raise
+    else:
+        current.finish()
+    finally:
+        stack.pop()
+        summary = {key: value for key, value in current.to_dict().items() if key not in ("name", "children", "fields")}
+        log(logging.INFO if current.status == "ok" else logging.ERROR, "span end", span=name, **summary, **current.fields)
+
+
+def build_report(name, started, status):
+    """
+    Build the machine-readable run report for this process.
+    (このプロセスの機械可読な実行レポートを作成します)
+    """
+    return {
+        "name": name,
+        "argv": sys.argv,
+        "started": started.isoformat(timespec="seconds"),
+        "finished": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "status": status,
+        "peak_rss_mb": peak_rss_mb(),
+        "spans": [root.to_dict() for root in _root_spans],
+    }
+
+
+def write_json_atomic(path, payload):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        json.dump(payload, file, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def instrumented(name):
+    """
+    Decorate a script's main() so it runs inside a root span, writes a run report
+    when TOKYO_METRO_REPORT_DIR is set, and runs under cProfile when
+    TOKYO_METRO_PROFILE_DIR is set.
+    (スクリプトの main() を装飾し、ルート区間内で実行します。TOKYO_METRO_REPORT_DIR が
+    設定されていれば実行レポートを、TOKYO_METRO_PROFILE_DIR が設定されていれば
+    cProfile のダンプを書き出します)
+    """
+    def decorator(main):
+        @wraps(main)
+        def wrapper(*args, **kwargs):
+            configure_logging()
+            started = datetime.now(timezone.utc)
+            profile_dir = os.environ.get(PROFILE_DIR_ENV)
+            profiler = cProfile.Profile() if profile_dir else None
+            status = "ok"
+            try:
+                with span(name):
+                    if profiler is None:
+                        return main(*args, **kwargs)
+                    return profiler.runcall(main, *args, **kwargs)
+            except BaseException as error:
+                status = f"error: {type(error).__name__}"
+                raise
+            finally:
+                if profiler is not None:
+                    os.makedirs(profile_dir, exist_ok=True)
+                    profiler.dump_stats(os.path.join(profile_dir, f"{name}.prof"))
+                report_dir = os.environ.get(REPORT_DIR_ENV)
+                if report_dir:
+                    write_json_atomic(os.path.join(report_dir, f"{name}.json"), build_report(name, started, status))
+        return wrapper
+    return decorator
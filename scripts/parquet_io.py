@@ -0,0 +1,158 @@
+import os
+import shutil
+
+import pandas as pd
+
+# Compression codec for cleaned Parquet outputs (クリーン済みParquet出力の圧縮方式)
+PARQUET_COMPRESSION = "zstd"
+
+# Output formats accepted by the cleaning scripts' --format option
+# クリーニングスクリプトの --format オプションで指定できる出力形式
+OUTPUT_FORMATS = ("csv", "parquet", "both")
+
+
+def parquet_path(csv_path):
+    """Return the Parquet counterpart of a cleaned CSV path. (クリーン済みCSVに対応するParquetのパス)"""
+    return os.path.splitext(csv_path)[0] + ".parquet"
+
+
+def writes_csv(output_format):
+    return output_format in ("csv", "both")
+
+
+def writes_parquet(output_format):
+    return output_format in ("parquet", "both")
+
+
+def write_parquet(data, path, partition_cols=None):
+    """
+    Write a DataFrame as compressed Parquet, replacing any previous output.
+    With partition_cols, path is a Hive-style directory (e.g. Fiscal_Year=2023/).
+    (DataFrameを圧縮Parquetとして書き出し、既存の出力を置き換えます。
+    partition_cols を指定すると path は Hive 形式のディレクトリ（例: Fiscal_Year=2023/）になります)
+
+    Output is written next to the target and swapped in at the end, so readers
+    never see a half-written dataset.
+    (出力は隣の一時パスに書き込んでから最後に置き換えるため、書きかけのデータセットが
+    読まれることはありません。)
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    remove_path(tmp_path)
+    data.to_parquet(tmp_path, engine="pyarrow", compression=PARQUET_COMPRESSION,
+                    index=False, partition_cols=partition_cols)
+    replace_path(tmp_path, path)
+
+
+def partition_file(path, column, value):
+    """Return the data file for one Hive partition of a dataset. (データセットの1パーティションのデータファイル)"""
+    return os.path.join(path, f"{column}={value}", "part-0.parquet")
+
+
+def write_parquet_partition(data, path, column, value):
+    """
+    Replace a single partition of a dataset, leaving the other partitions untouched.
+    The partition key is stored in the directory name, not in the file.
+    (データセットの1パーティションのみを置き換え、他のパーティションはそのまま残します。
+    パーティションキーはファイルではなくディレクトリ名に保存されます)
+    """
+    write_parquet(data.drop(columns=[column], errors="ignore"), partition_file(path, column, value))
+
+
+class ParquetPartitionWriter:
+    """
+    Append DataFrame chunks to one partition file, for streaming outputs.
+    The file is swapped in only when the writer is closed.
+    (ストリーミング出力用に、DataFrameのチャンクを1つのパーティションファイルへ追記します。
+    ファイルは close 時に初めて置き換えられます)
+    """
+
+    def __init__(self, path, column, value):
+        self.path = partition_file(path, column, value)
+        self.tmp_path = f"{self.path}.tmp"
+        self.writer = None
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+    def write(self, chunk):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if self.writer is None:
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            self.writer = pq.ParquetWriter(self.tmp_path, table.schema, compression=PARQUET_COMPRESSION)
+        else:
+            table = pa.Table.from_pandas(chunk, schema=self.writer.schema, preserve_index=False)
+        self.writer.write_table(table)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            os.replace(self.tmp_path, self.path)
+
+
+def remove_path(path):
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    elif os.path.exists(path):
+        os.remove(path)
+
+
+def replace_path(tmp_path, path):
+    # A directory cannot be replaced in one rename, so move the old one aside first.
+    # ディレクトリは1回のリネームで置き換えられないため、先に旧出力を退避します。
+    old_path = f"{path}.old"
+    remove_path(old_path)
+    if os.path.exists(path):
+        os.replace(path, old_path)
+    os.replace(tmp_path, path)
+    remove_path(old_path)
+
+
+def parquet_columns(path):
+    """
+    Return the column names of a Parquet file or partitioned dataset without
+    reading any data. Partition keys are included.
+    (データを読まずに Parquet ファイルまたはパーティション分割データセットの列名を返します。
+    パーティションキーも含みます)
+    """
+    import pyarrow.dataset as ds
+
+    return ds.dataset(path, format="parquet", partitioning="hive").schema.names
+
+
+def partition_values(path, column):
+    """
+    Return the sorted values of a Hive partition key, read from directory names.
+    (ディレクトリ名から Hive パーティションキーの値をソートして返します)
+    """
+    prefix = f"{column}="
+    values = [name[len(prefix):] for name in os.listdir(path) if name.startswith(prefix)]
+    return sorted(values, key=lambda value: (len(value), value))
+
+
+def read_cleaned_data(path, columns=None, filters=None):
+    """
+    Read a cleaned CSV or Parquet dataset, keeping only the requested columns
+    (matched case-insensitively). For Parquet, filters on partition keys prune
+    whole directories and only the selected columns are decoded.
+    (クリーン済みのCSVまたはParquetデータセットを読み込み、指定された列のみを残します
+    （大文字小文字は区別しません）。Parquetではパーティションキーのフィルターで
+    ディレクトリ単位に読み飛ばし、選択した列のみをデコードします)
+    """
+    wanted = {col.lower() for col in columns} if columns is not None else None
+
+    if not path.endswith(".parquet"):
+        usecols = (lambda col: col.lower() in wanted) if wanted is not None else None
+        return pd.read_csv(path, usecols=usecols)
+
+    selected = None
+    if wanted is not None:
+        selected = [col for col in parquet_columns(path) if col.lower() in wanted]
+    data = pd.read_parquet(path, engine="pyarrow", columns=selected, filters=filters)
+
+    # Partition keys come back as categoricals; restore their value type.
+    # パーティションキーはカテゴリ型で返るため、元の値の型に戻します。
+    for col in data.columns:
+        if isinstance(data[col].dtype, pd.CategoricalDtype):
+            data[col] = data[col].astype(data[col].cat.categories.dtype)
+    return data
@@ -0,0 +1,374 @@
+import argparse
+import json
+import os
+import queue
+import sqlite3
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+# Database and server defaults (データベースとサーバーの既定値)
+DB_PATH = "./tokyo_metro.db"
+HOST = "127.0.0.1"
+PORT = 8000
+
+POOL_SIZE = 8
+POOL_TIMEOUT_SECONDS = 5
+RESULT_CACHE_SIZE = 256
+STATEMENT_CACHE_SIZE = 64
+
+# Named queries over the summary tables. Optional filters are written as
+# "(:param IS NULL OR ...)" so each query is a single prepared statement.
+# サマリーテーブルに対する名前付きクエリ。任意のフィルターは "(:param IS NULL OR ...)" と
+# 記述し、各クエリを1つのプリペアドステートメントにしています。
+# line matches a Line_ID exactly; only a value that is not a Line_ID falls back to a
+# substring match on the line names, so "M" is Marunouchi alone.
+# line は Line_ID と完全一致で照合し、Line_ID でない値のみ路線名の部分一致で照合します
+# （"M" は丸ノ内線のみに一致します）。
+LINE_FILTER = (
+    "(:line IS NULL OR l.Line_ID = :line"
+    " OR (NOT EXISTS (SELECT 1 FROM Lines k WHERE k.Line_ID = :line)"
+    " AND (instr(lower(l.Line_Name_En), lower(:line)) > 0 OR instr(l.Line_Name_Jp, :line) > 0)))"
+)
+YEAR_RANGE = "(:from_year IS NULL OR Fiscal_Year >= :from_year) AND (:to_year IS NULL OR Fiscal_Year <= :to_year)"
+
+QUERIES = {
+    "line_demand": {
+        "description": "Passenger demand by line (路線別の乗客需要)",
+        "params": {"line": (str, None)},
+        "sql": f"""
+            SELECT
+                l.Line_Name_Jp || ' - ' || l.Line_Name_En AS line_name,
+                s.Station_Count AS station_count,
+                s.Total_Daily_Passengers AS total_daily_passengers,
+                ROUND(s.Total_Daily_Passengers / s.Station_Count, 0) AS avg_passengers_per_station
+            FROM LineDemandSummary s
+            JOIN Lines l ON l.Line_ID = s.Line_ID
+            WHERE {LINE_FILTER}
+            ORDER BY total_daily_passengers DESC;
+        """,
+    },
+    "top_stations": {
+        "description": "Top stations by passenger demand (乗客需要の多い駅)",
+        "params": {"limit": (int, 10), "line": (str, None)},
+        "sql": f"""
+            SELECT
+                s.English_Name AS station_name,
+                l.Line_Name_En || ' (' || l.Line_Name_Jp || ')' AS line,
+                s.Total_Daily_Passengers AS total_daily_passengers
+            FROM StationRankingSummary s
+            JOIN Lines l ON l.Line_ID = s.Line_ID
+            WHERE {LINE_FILTER}
+            ORDER BY total_daily_passengers DESC, station_name, line
+            LIMIT :limit;
+        """,
+    },
+    "revenue_trend": {
+        "description": "System-wide revenue by fiscal year (年度別の収益推移)",
+        "params": {"from_year": (int, None), "to_year": (int, None)},
+        "sql": f"""
+            SELECT
+                Fiscal_Year AS fiscal_year,
+                Total_Revenue AS annual_total_revenue_million_yen,
+                ROUND(Avg_Total_YoY_Percentage, 1) AS avg_yoy_growth_percentage
+            FROM RevenueYearSummary
+            WHERE {YEAR_RANGE}
+            ORDER BY Fiscal_Year;
+        """,
+    },
+    "revenue_mix": {
+        "description": "Commuter vs. non-commuter revenue by fiscal year (定期・定期外の収益構成)",
+        "params": {"from_year": (int, None), "to_year": (int, None)},
+        "sql": f"""
+            SELECT
+                Fiscal_Year AS fiscal_year,
+                Commuter_Revenue AS commuter_revenue_million_yen,
+                Non_Commuter_Revenue AS non_commuter_revenue_million_yen,
+                Total_Revenue AS total_revenue_million_yen,
+                ROUND(100.0 * Commuter_Revenue / Total_Revenue, 1) AS commuter_share_percentage,
+                ROUND(100.0 * Non_Commuter_Revenue / Total_Revenue, 1) AS non_commuter_share_percentage
+            FROM RevenueYearSummary
+            WHERE {YEAR_RANGE}
+            ORDER BY Fiscal_Year;
+        """,
+    },
+}
+
+# Upper bound for the top_stations limit (top_stations の件数上限)
+MAX_LIMIT = 1000
+
+
+def parse_params(query_name, raw_params):
+    """
+    Validate query-string values against a named query's parameters.
+    (クエリ文字列の値を名前付きクエリのパラメータ定義に照らして検証します)
+    Returns:
+        dict: Parameter name → typed value (パラメータ名 → 型変換済みの値)
+    """
+    spec = QUERIES[query_name]["params"]
+    unknown = sorted(set(raw_params) - set(spec))
+    if unknown:
+        raise ValueError(f"Unknown parameters for {query_name}: {unknown} ({query_name} に不明なパラメータ: {unknown})")
+
+    params = {}
+    for name, (kind, default) in spec.items():
+        values = raw_params.get(name)
+        if not values:
+            params[name] = default
+            continue
+        try:
+            params[name] = kind(values[-1])
+        except ValueError:
+            raise ValueError(f"Invalid value for {name}: {values[-1]!r} ({name} の値が不正です)") from None
+
+    if "limit" in params and not 1 <= params["limit"] <= MAX_LIMIT:
+        raise ValueError(f"limit must be between 1 and {MAX_LIMIT}. (limit は1〜{MAX_LIMIT}で指定してください)")
+    return params
+
+
+def enable_wal(db_path):
+    """
+    Switch the database to WAL journaling so readers never block on a loader
+    transaction. The setting is stored in the database file.
+    (読み取りがローダーのトランザクションで待たされないよう、データベースをWALモードに
+    切り替えます。この設定はデータベースファイルに保存されます)
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute("PRAGMA journal_mode = WAL;").fetchone()[0]
+    finally:
+        conn.close()
+
+
+class ResultCache:
+    """
+    Thread-safe LRU cache of query results.
+    (スレッドセーフなクエリ結果のLRUキャッシュ)
+    """
+
+    def __init__(self, maxsize=RESULT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+class QueryService:
+    """
+    Named queries over a pool of read-only SQLite connections with a result cache.
+    (読み取り専用SQLite接続のプールと結果キャッシュを使った名前付きクエリ)
+
+    Cached results are dropped when PRAGMA data_version reports a commit from
+    another connection, or when the database file itself is replaced by a full
+    rebuild (in which case the pool is reopened).
+    (別の接続によるコミットを PRAGMA data_version が示した場合、またはフルリビルドで
+    データベースファイル自体が置き換えられた場合にキャッシュを破棄します。後者では
+    接続プールも開き直します。)
+    """
+
+    def __init__(self, db_path=DB_PATH, pool_size=POOL_SIZE, cache_size=RESULT_CACHE_SIZE):
+        if not Path(db_path).exists():
+            raise FileNotFoundError(f"Database not found: {db_path} (データベースが見つかりません: {db_path})")
+        self.db_path = db_path
+        self.pool_size = pool_size
+        self.cache = ResultCache(cache_size)
+        self.version_lock = threading.Lock()
+        self._open_pool()
+
+    def _connect(self):
+        conn = sqlite3.connect(
+            f"{Path(self.db_path).resolve().as_uri()}?mode=ro",
+            uri=True,
+            check_same_thread=False,
+            cached_statements=STATEMENT_CACHE_SIZE,
+        )
+        conn.execute("PRAGMA query_only = ON;")
+        return conn
+
+    def _open_pool(self):
+        stat = os.stat(self.db_path)
+        self.file_identity = (stat.st_dev, stat.st_ino)
+        self.pool = queue.Queue()
+        for _ in range(self.pool_size):
+            self.pool.put(self._connect())
+        self.monitor = self._connect()
+        self.data_version = self.monitor.execute("PRAGMA data_version;").fetchone()[0]
+
+    def _close_pool(self, pool, monitor):
+        monitor.close()
+        while not pool.empty():
+            pool.get_nowait().close()
+
+    def check_version(self):
+        """
+        Clear the cache if the database changed since the last check.
+        (前回の確認以降にデータベースが変更されていればキャッシュを消去します)
+        """
+        with self.version_lock:
+            stat = os.stat(self.db_path)
+            if (stat.st_dev, stat.st_ino) != self.file_identity:
+                old_pool, old_monitor = self.pool, self.monitor
+                self._open_pool()
+                self.cache.clear()
+                self._close_pool(old_pool, old_monitor)
+                return
+            version = self.monitor.execute("PRAGMA data_version;").fetchone()[0]
+            if version != self.data_version:
+                self.data_version = version
+                self.cache.clear()
+
+    @contextmanager
+    def connection(self):
+        pool = self.pool
+        try:
+            conn = pool.get(timeout=POOL_TIMEOUT_SECONDS)
+        except queue.Empty:
+            raise TimeoutError("No database connection available. (利用可能なDB接続がありません)") from None
+        try:
+            yield conn
+        finally:
+            if pool is self.pool:
+                pool.put(conn)
+            else:
+                conn.close()
+
+    def run(self, query_name, params):
+        """
+        Run a named query, serving repeated calls from the cache.
+        (名前付きクエリを実行します。同じ呼び出しはキャッシュから返します)
+        Returns:
+            dict: Query name, parameters, columns, rows and whether it was cached
+            (クエリ名・パラメータ・列・行・キャッシュ利用の有無)
+        """
+        if query_name not in QUERIES:
+            raise KeyError(query_name)
+        self.check_version()
+
+        key = (query_name, tuple(sorted(params.items())))
+        cached = self.cache.get(key)
+        if cached is not None:
+            return {**cached, "cached": True}
+
+        with self.connection() as conn:
+            cursor = conn.execute(QUERIES[query_name]["sql"], params)
+            columns = [column[0] for column in cursor.description]
+            rows = cursor.fetchall()
+
+        result = {"query": query_name, "params": params, "columns": columns, "rows": rows}
+        self.cache.put(key, result)
+        return {**result, "cached": False}
+
+    def close(self):
+        self._close_pool(self.pool, self.monitor)
+
+
+class QueryRequestHandler(BaseHTTPRequestHandler):
+    """
+    GET /queries lists the named queries; GET /query/<name>?param=value runs one;
+    GET /health reports cache statistics.
+    (GET /queries でクエリ一覧、GET /query/<name>?param=value でクエリ実行、
+    GET /health でキャッシュ統計を返します)
+    """
+
+    service = None
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == "/health":
+            cache = self.service.cache
+            self.send_json(200, {"status": "ok", "cache_hits": cache.hits, "cache_misses": cache.misses})
+        elif url.path == "/queries":
+            self.send_json(200, {
+                name: {"description": query["description"], "params": sorted(query["params"])}
+                for name, query in QUERIES.items()
+            })
+        elif url.path.startswith("/query/"):
+            query_name = url.path[len("/query/"):]
+            if query_name not in QUERIES:
+                self.send_json(404, {"error": f"Unknown query: {query_name} (不明なクエリ: {query_name})"})
+                return
+            try:
+                params = parse_params(query_name, parse_qs(url.query))
+                self.send_json(200, self.service.run(query_name, params))
+            except ValueError as e:
+                self.send_json(400, {"error": str(e)})
+            except (TimeoutError, sqlite3.Error) as e:
+                self.send_json(503, {"error": str(e)})
+        else:
+            self.send_json(404, {"error": f"Not found: {url.path} (見つかりません: {url.path})"})
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(db_path=DB_PATH, host=HOST, port=PORT, pool_size=POOL_SIZE):
+    """
+    Serve the named queries over HTTP until interrupted.
+    (中断されるまで名前付きクエリをHTTPで提供します)
+    """
+    journal_mode = enable_wal(db_path)
+    service = QueryService(db_path, pool_size=pool_size)
+    QueryRequestHandler.service = service
+    server = ThreadingHTTPServer((host, port), QueryRequestHandler)
+    server.daemon_threads = True
+    print(f"Serving {db_path} ({journal_mode}) on http://{host}:{port} "
+          f"({db_path} を http://{host}:{port} で提供しています)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+
+
+def main():
+    """
+    Start the read-only query service.
+    (読み取り専用のクエリサービスを起動します)
+    """
+    parser = argparse.ArgumentParser(description="Serve business queries over HTTP. (ビジネスクエリをHTTPで提供します)")
+    parser.add_argument("--db", default=DB_PATH, help="SQLite database path. (SQLiteデータベースのパス)")
+    parser.add_argument("--host", default=HOST, help="Bind address. (待ち受けアドレス)")
+    parser.add_argument("--port", type=int, default=PORT, help="Port. (ポート番号)")
+    parser.add_argument("--pool-size", type=int, default=POOL_SIZE,
+                        help="Read-only connections in the pool. (プール内の読み取り専用接続数)")
+    args = parser.parse_args()
+
+    serve(args.db, args.host, args.port, args.pool_size)
+
+
+if __name__ == "__main__":
+    main()
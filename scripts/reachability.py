@@ -0,0 +1,358 @@
+import argparse
+import sqlite3
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import instrumented, span
+from station_graph import METRICS, STATIONS_JSON_PATH, TRANSITION_RIDE, load_station_graph
+
+# Paths for output files (出力ファイルのパス)
+DB_PATH = "./tokyo_metro.db"
+ISOCHRONES_CSV_PATH = "./data/processed/isochrones.csv"
+
+# Isochrone bands exported by default, per metric: km, minutes, transfers and
+# ride segments. (既定で出力する等時圏の区分。距離（km）・所要時間（分）・乗換回数・乗車区間数)
+DEFAULT_BANDS = {
+    "distance": [2.0, 5.0, 10.0, 20.0],
+    "duration": [10.0, 20.0, 30.0, 45.0, 60.0],
+    "transfers": [0.0, 1.0, 2.0],
+    "hops": [1.0, 3.0, 5.0, 10.0],
+}
+
+# Metrics counted in whole steps, answered by bitset BFS; the rest are
+# answered from a many-origin cost matrix.
+# 整数の段数で数える指標はビットセットBFSで、それ以外は多始点のコスト行列で求めます。
+STEP_METRICS = ("transfers", "hops")
+
+# Number of (metric, threshold) results kept per index (インデックスごとに保持する結果の数)
+REACH_CACHE_SIZE = 64
+
+# Slack added to km/minute thresholds so float sums on the boundary are kept.
+# 境界上の浮動小数点の和を含めるため、距離・時間の閾値に加える余裕。
+THRESHOLD_TOLERANCE = 1e-9
+
+
+class ReachabilityIndex:
+    """
+    Batched "stations reachable from X within N" queries for every origin at once.
+    (全ての始点について「X から N 以内に到達できる駅」をまとめて求める検索)
+
+    Results are packed bitsets with one row per station and one bit per origin,
+    so a BFS step is a bitwise OR over each station's incoming edges for all
+    291 origins together. Each (metric, threshold) result is cached.
+    (結果は駅ごとに1行、始点ごとに1ビットのビットセットです。BFSの1段は各駅の入辺に
+    ついてのビットOR演算で、291の始点をまとめて処理します。(指標, 閾値) ごとに結果を
+    キャッシュします。)
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+        self.n = graph.station_count
+        self.station_ids = graph.station_ids
+        self.edge_sources = np.repeat(np.arange(self.n), np.diff(graph.indptr))
+        is_ride = graph.type_ids == TRANSITION_RIDE
+        self.edge_groups = {
+            "all": self._incoming(np.ones(graph.edge_count, dtype=bool)),
+            "ride": self._incoming(is_ride),
+            "transfer": self._incoming(~is_ride),
+        }
+        # Station v is reached by origin v before any step (探索前は駅 v に始点 v のみが到達)
+        self.identity = np.packbits(np.eye(self.n, dtype=bool), axis=1)
+        self._costs = {}
+        self._cache = OrderedDict()
+
+    def _incoming(self, mask):
+        """
+        Group the selected edges by target for np.bitwise_or.reduceat.
+        (選択した辺を np.bitwise_or.reduceat 用に接続先ごとにまとめます)
+        Returns:
+            tuple: (edge positions, source of each edge, targets with edges, start of each target's run)
+        """
+        edges = np.flatnonzero(mask)
+        edges = edges[np.argsort(self.graph.indices[edges], kind="stable")]
+        targets, starts = np.unique(self.graph.indices[edges], return_index=True)
+        return edges, self.edge_sources[edges], targets, starts
+
+    def _step(self, bits, group):
+        """
+        Extend every origin's reach by one edge of a group.
+        (全ての始点の到達範囲を、グループの辺1本分だけ広げます)
+        """
+        _, sources, targets, starts = self.edge_groups[group]
+        if len(sources) == 0:
+            return bits
+        reached = bits.copy()
+        reached[targets] |= np.bitwise_or.reduceat(bits[sources], starts, axis=0)
+        return reached
+
+    def _closure(self, bits, group):
+        """
+        Follow a group's edges until no origin reaches a new station.
+        (新たな駅に到達しなくなるまでグループの辺をたどります)
+        """
+        while True:
+            reached = self._step(bits, group)
+            if np.array_equal(reached, bits):
+                return bits
+            bits = reached
+
+    def _step_bits(self, metric, steps):
+        """
+        Bitset BFS for a whole-step budget: free edges are followed to closure
+        between steps (transfers are free when counting rides, and the reverse).
+        (整数段数の予算に対するビットセットBFS。段の間では無料の辺を閉包までたどります。
+        乗車区間数では乗換が、乗換回数では乗車が無料です)
+        """
+        free, counted = ("transfer", "ride") if metric == "hops" else ("ride", "transfer")
+        bits = self._closure(self.identity, free)
+        for _ in range(steps):
+            reached = self._closure(self._step(bits, counted), free)
+            if np.array_equal(reached, bits):
+                break
+            bits = reached
+        return bits
+
+    def cost_matrix(self, metric):
+        """
+        Return the origin × station cost matrix for "distance" (km) or
+        "duration" (minutes). All origins relax their frontiers together, and
+        only origins whose costs changed in the last round are relaxed again.
+        (distance（km）または duration（分）の始点×駅のコスト行列を返します。全ての始点の
+        フロンティアをまとめて緩和し、直前の回でコストが変わった始点のみを再度緩和します)
+        """
+        if metric not in self._costs:
+            weights = self.graph.distance_km if metric == "distance" else self.graph.duration_min
+            edges, sources, targets, starts = self.edge_groups["all"]
+            edge_weights = weights[edges]
+            cost = np.full((self.n, self.n), np.inf)
+            np.fill_diagonal(cost, 0.0)
+            active = np.arange(self.n)
+            while len(active):
+                rows = cost[active]
+                best = np.minimum.reduceat(rows[:, sources] + edge_weights, starts, axis=1)
+                improved = np.minimum(rows[:, targets], best)
+                changed = (improved < rows[:, targets]).any(axis=1)
+                rows[:, targets] = improved
+                cost[active] = rows
+                active = active[changed]
+            self._costs[metric] = cost
+        return self._costs[metric]
+
+    def within_bits(self, metric, threshold):
+        """
+        Return the packed reach bitsets for a metric and threshold, computing
+        them on first use.
+        (指標と閾値に対する到達ビットセットを返します。初回のみ計算します)
+        """
+        if metric not in METRICS:
+            raise ValueError(f"Unknown metric: {metric} (不明な指標: {metric})")
+        if threshold < 0 or (metric in STEP_METRICS and float(threshold) != int(threshold)):
+            raise ValueError(
+                f"Threshold for {metric} must be a non-negative {'integer' if metric in STEP_METRICS else 'number'}: "
+                f"{threshold} ({metric} の閾値は0以上である必要があります)"
+            )
+        key = (metric, float(threshold))
+        bits = self._cache.get(key)
+        if bits is not None:
+            self._cache.move_to_end(key)
+            return bits
+
+        if metric in STEP_METRICS:
+            bits = self._step_bits(metric, int(threshold))
+        else:
+            reached = self.cost_matrix(metric) <= threshold + THRESHOLD_TOLERANCE
+            bits = np.packbits(reached.T, axis=1)
+        self._cache[key] = bits
+        if len(self._cache) > REACH_CACHE_SIZE:
+            self._cache.popitem(last=False)
+        return bits
+
+    def within(self, metric, threshold, origins=None):
+        """
+        Return a boolean matrix with one row per origin (all stations by default)
+        and one column per station.
+        (始点ごとに1行（既定は全駅）、駅ごとに1列の真偽値行列を返します)
+        """
+        bits = self.within_bits(metric, threshold)
+        reached = np.unpackbits(bits, axis=1, count=self.n).T.astype(bool)
+        if origins is None:
+            return reached
+        return reached[[self.resolve(origin) for origin in origins]]
+
+    def reachable(self, origin, metric, threshold):
+        """
+        Return the station IDs reachable from one origin, itself excluded.
+        (1つの始点から到達できる駅IDを返します。始点自身は含みません)
+        """
+        i = self.resolve(origin)
+        row = self.within(metric, threshold, [i])[0]
+        return [self.station_ids[j] for j in np.flatnonzero(row) if j != i]
+
+    def counts(self, metric, threshold):
+        """
+        Return the number of other stations each origin reaches.
+        (各始点から到達できる他の駅の数を返します)
+        """
+        return self.within(metric, threshold).sum(axis=1) - 1
+
+    def bands(self, metric, thresholds):
+        """
+        Return the smallest threshold within which each origin reaches each
+        station, or NaN beyond the largest one: the isochrone bands.
+        (各始点から各駅に到達できる最小の閾値、すなわち等時圏の区分を返します。
+        最大の閾値を超える場合は NaN)
+        """
+        band = np.full((self.n, self.n), np.nan)
+        for threshold in sorted(thresholds, reverse=True):
+            band[self.within(metric, threshold)] = threshold
+        return band
+
+    def resolve(self, station):
+        return self.graph.resolve(station)
+
+
+def isochrone_rows(index, bands_by_metric):
+    """
+    Flatten isochrone bands into one row per (metric, origin, station) pair,
+    leaving out each origin itself and stations beyond every band.
+    (等時圏の区分を (指標, 始点, 駅) ごとの行に展開します。始点自身と全区分の外側の駅は除きます)
+    """
+    station_ids = np.array(index.station_ids)
+    frames = []
+    for metric, thresholds in bands_by_metric.items():
+        band = index.bands(metric, thresholds)
+        np.fill_diagonal(band, np.nan)
+        origins, stations = np.nonzero(~np.isnan(band))
+        frames.append(pd.DataFrame({
+            "Metric": metric,
+            "Origin_ID": station_ids[origins],
+            "Station_ID": station_ids[stations],
+            "Band": band[origins, stations],
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+
+def summary_rows(index, bands_by_metric):
+    """
+    Return the number of stations each origin reaches within each band.
+    (各始点が各区分内で到達できる駅数を返します)
+    """
+    frames = []
+    for metric, thresholds in bands_by_metric.items():
+        for threshold in thresholds:
+            frames.append(pd.DataFrame({
+                "Metric": metric,
+                "Threshold": float(threshold),
+                "Origin_ID": index.station_ids,
+                "Reachable_Stations": index.counts(metric, threshold).astype(np.int64),
+            }))
+    return pd.concat(frames, ignore_index=True)
+
+
+def write_reachability_tables(conn, isochrones, summary):
+    """
+    Replace the Isochrones and ReachabilitySummary table contents in one transaction.
+    (IsochronesテーブルとReachabilitySummaryテーブルの内容を1トランザクションで置き換えます)
+    """
+    with conn:
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS Isochrones (
+                Metric TEXT NOT NULL,
+                Origin_ID TEXT NOT NULL,
+                Station_ID TEXT NOT NULL,
+                Band REAL NOT NULL,
+                PRIMARY KEY (Metric, Origin_ID, Station_ID)
+            ) WITHOUT ROWID;
+            """
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS ReachabilitySummary (
+                Metric TEXT NOT NULL,
+                Threshold REAL NOT NULL,
+                Origin_ID TEXT NOT NULL,
+                Reachable_Stations INTEGER NOT NULL,
+                PRIMARY KEY (Metric, Threshold, Origin_ID)
+            );
+            """
+        )
+        conn.execute("DELETE FROM Isochrones;")
+        conn.execute("DELETE FROM ReachabilitySummary;")
+        conn.executemany("INSERT INTO Isochrones VALUES (?, ?, ?, ?);",
+                         isochrones.itertuples(index=False, name=None))
+        conn.executemany("INSERT INTO ReachabilitySummary VALUES (?, ?, ?, ?);",
+                         summary.itertuples(index=False, name=None))
+
+    print(f"Loaded {len(isochrones)} rows into Isochrones and {len(summary)} rows into ReachabilitySummary. "
+          f"(Isochronesに{len(isochrones)}行、ReachabilitySummaryに{len(summary)}行を読み込みました。)")
+
+
+@instrumented("reachability")
+def main():
+    """
+    Compute isochrone bands for every origin and load them into SQLite, or
+    print one origin's reachable stations with --origin.
+    (全始点の等時圏を計算してSQLiteに読み込みます。--origin では1つの始点から
+    到達できる駅を表示します)
+    """
+    parser = argparse.ArgumentParser(
+        description="Stations reachable within a distance, time or transfer budget. "
+                    "(距離・時間・乗換回数の範囲内で到達できる駅)"
+    )
+    parser.add_argument("--metrics", nargs="+", choices=METRICS, default=list(DEFAULT_BANDS),
+                        help="Metrics to compute. (計算する指標)")
+    parser.add_argument("--thresholds", nargs="+", type=float,
+                        help="Bands for a single metric, replacing the defaults. (単一指標の区分。既定値を置き換えます)")
+    parser.add_argument("--origin",
+                        help="Print the stations reachable from this station instead of exporting. "
+                             "(出力せず、この駅から到達できる駅を表示します)")
+    args = parser.parse_args()
+
+    if args.thresholds and len(args.metrics) != 1:
+        raise ValueError("--thresholds needs exactly one metric. (--thresholds には指標を1つだけ指定してください)")
+    if not Path(STATIONS_JSON_PATH).exists():
+        raise FileNotFoundError(
+            f"Input file not found: {STATIONS_JSON_PATH} (入力ファイルが見つかりません: {STATIONS_JSON_PATH})"
+        )
+    bands_by_metric = {metric: args.thresholds or DEFAULT_BANDS[metric] for metric in args.metrics}
+
+    with span("load_graph") as step:
+        index = ReachabilityIndex(load_station_graph(STATIONS_JSON_PATH))
+        step.set(stations=index.n)
+
+    if args.origin:
+        for metric, thresholds in bands_by_metric.items():
+            for threshold in thresholds:
+                stations = index.reachable(args.origin, metric, threshold)
+                print(f"{args.origin} within {threshold:g} {metric}: {len(stations)} stations "
+                      f"({len(stations)}駅) {' '.join(stations)}")
+        return
+
+    print("Starting reachability build. (到達圏の計算を開始します。)")
+    start = time.perf_counter()
+    with span("compute", metrics=",".join(bands_by_metric)) as step:
+        isochrones = isochrone_rows(index, bands_by_metric)
+        summary = summary_rows(index, bands_by_metric)
+        step.add_rows_out(len(isochrones))
+    print(f"Computed {sum(len(t) for t in bands_by_metric.values())} bands for {index.n} origins in "
+          f"{time.perf_counter() - start:.3f}s. ({index.n}始点の等時圏を計算しました)")
+
+    with span("save") as step:
+        isochrones.to_csv(ISOCHRONES_CSV_PATH, index=False, encoding="utf-8")
+        conn = sqlite3.connect(DB_PATH)
+        try:
+            write_reachability_tables(conn, isochrones, summary)
+        finally:
+            conn.close()
+        step.add_rows_out(len(isochrones) + len(summary))
+
+    print("Reachability build completed. (到達圏の計算が完了しました。)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,521 @@
+import glob
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from pathlib import Path
+
+from fingerprint import sha256_file
+
+# Repository root; every stage runs with this as its working directory.
+# リポジトリのルート。各ステージはここを作業ディレクトリとして実行します。
+ROOT = Path(__file__).resolve().parent.parent
+STATE_PATH = ROOT / "data" / ".pipeline_state.json"
+SCRIPTS_DIR = ROOT / "scripts"
+REPORTS_DIR = ROOT / "data" / "reports"
+
+# Top-level names in import statements, used to find the sibling modules a stage uses
+# (import 文の先頭のモジュール名。ステージが使う同じフォルダのモジュールを探すために使います)
+IMPORT_PATTERN = re.compile(r"^[ \t]*(?:from[ \t]+(\w+)[\w.]*[ \t]+import|import[ \t]+(\w+))", re.MULTILINE)
+
+
+class Stage:
+    """
+    One pipeline step: a script plus the files it reads and writes.
+    (パイプラインの1ステップ: スクリプトと、その入力・出力ファイル)
+    """
+
+    def __init__(self, name, script, inputs, outputs, deps=(), args=()):
+        self.name = name
+        self.script = script
+        self.args = list(args)
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.deps = list(deps)
+
+
+# raw → processed → cleaned → SQLite. passenger_stats.csv is treated as a source
+# because refreshing it requires a network fetch (extract_passenger_data.py).
+# raw → processed → cleaned → SQLite。passenger_stats.csv はネットワーク取得が必要な
+# ため（extract_passenger_data.py）、ソースとして扱います。
+STAGES = [
+    Stage(
+        "extract_station",
+        "scripts/extract_station_data.py",
+        inputs=["data/raw/stations.json"],
+        outputs=["data/processed/station_data_with_lines.csv"],
+    ),
+    Stage(
+        "clean_station",
+        "scripts/clean_station_data.py",
+        inputs=["data/processed/station_data_with_lines.csv"],
+        outputs=["data/cleaned/stations_cleaned.csv", "data/cleaned/station_lines_cleaned.csv"],
+        deps=["extract_station"],
+    ),
+    Stage(
+        "create_lines",
+        "scripts/create_line_data.py",
+        inputs=["data/cleaned/stations_cleaned.csv"],
+        outputs=["data/cleaned/lines_cleaned.csv"],
+        deps=["clean_station"],
+    ),
+    Stage(
+        "clean_passenger",
+        "scripts/clean_passenger_data.py",
+        inputs=[
+            "data/processed/passenger_stats.csv",
+            "data/processed/station_data_with_lines.csv",
+            "scripts/station_resolver.py",
+        ],
+        outputs=["data/cleaned/passengers_cleaned.csv"],
+        deps=["extract_station"],
+    ),
+    Stage(
+        "extract_revenue",
+        "scripts/extract_revenue_data.py",
+        inputs=["data/raw/*.pdf"],
+        outputs=["data/processed/revenue_data.csv"],
+    ),
+    Stage(
+        "clean_revenue",
+        "scripts/clean_revenue_data.py",
+        inputs=["data/processed/revenue_data.csv"],
+        outputs=["data/cleaned/revenues_cleaned.csv"],
+        deps=["extract_revenue"],
+    ),
+    Stage(
+        "import_sqlite",
+        "scripts/import_data_to_sqlite.py",
+        inputs=[
+            "sql/create_schema.sql",
+            "scripts/validate_cleaned_data.py",
+            "data/cleaned/lines_cleaned.csv",
+            "data/cleaned/stations_cleaned.csv",
+            "data/cleaned/station_lines_cleaned.csv",
+            "data/cleaned/passengers_cleaned.csv",
+            "data/cleaned/revenues_cleaned.csv",
+        ],
+        outputs=["tokyo_metro.db"],
+        deps=["create_lines", "clean_passenger", "clean_revenue"],
+        args=["--incremental"],
+    ),
+    Stage(
+        "od_matrix",
+        "scripts/build_od_matrix.py",
+        inputs=["data/raw/stations.json", "scripts/station_graph.py"],
+        outputs=["data/processed/od_matrix/manifest.json"],
+        deps=["import_sqlite"],
+    ),
+    Stage(
+        "centrality",
+        "scripts/build_centrality.py",
+        inputs=["data/raw/stations.json", "scripts/station_graph.py"],
+        outputs=["data/processed/station_centrality.csv"],
+        deps=["import_sqlite"],
+    ),
+    Stage(
+        "disruption",
+        "scripts/disruption_scenarios.py",
+        inputs=["data/raw/stations.json", "scripts/station_graph.py"],
+        outputs=["data/processed/disruption_impact.csv"],
+        deps=["import_sqlite"],
+    ),
+    Stage(
+        "segment_load",
+        "scripts/build_segment_load.py",
+        inputs=["data/raw/stations.json", "scripts/station_graph.py"],
+        outputs=["data/processed/segment_load.csv"],
+        deps=["import_sqlite"],
+    ),
+    Stage(
+        "reachability",
+        "scripts/reachability.py",
+        inputs=["data/raw/stations.json", "scripts/station_graph.py"],
+        outputs=["data/processed/isochrones.csv"],
+        deps=["import_sqlite"],
+    ),
+]
+
+
+class FileHashCache:
+    """
+    Content hashes (and, for scripts, the module names they import) keyed by path,
+    reused while a file's size and mtime are unchanged.
+    (パスごとのコンテンツハッシュ（スクリプトの場合はインポートするモジュール名も）。
+    サイズと更新時刻が変わらない限り再利用します)
+    """
+
+    def __init__(self, entries=None):
+        self.entries = dict(entries or {})
+
+    def hash(self, relative_path):
+        stat = os.stat(ROOT / relative_path)
+        signature = [stat.st_size, stat.st_mtime_ns]
+        entry = self.entries.get(relative_path)
+        if entry and entry["signature"] == signature:
+            return entry["sha256"]
+        digest = sha256_file(ROOT / relative_path)
+        self.entries[relative_path] = {"signature": signature, "sha256": digest}
+        return digest
+
+    def imports(self, relative_path):
+        """
+        Return the top-level module names a script imports.
+        (スクリプトがインポートする先頭のモジュール名を返します)
+        """
+        self.hash(relative_path)
+        entry = self.entries[relative_path]
+        if "imports" not in entry:
+            with open(ROOT / relative_path, "r", encoding="utf-8") as file:
+                entry["imports"] = sorted({package or module for package, module in IMPORT_PATTERN.findall(file.read())})
+        return entry["imports"]
+
+
+def expand_inputs(patterns):
+    """
+    Expand glob patterns into a sorted list of root-relative paths.
+    (グロブパターンをルート相対パスのソート済みリストに展開します)
+    """
+    paths = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(str(ROOT / pattern)))
+        if not matches:
+            raise FileNotFoundError(f"Stage input not found: {pattern} (ステージの入力が見つかりません: {pattern})")
+        paths.extend(os.path.relpath(match, ROOT) for match in matches)
+    return paths
+
+
+def script_modules(script, hashes):
+    """
+    Return the script plus every module in scripts/ it imports, directly or
+    through other such modules, as sorted root-relative paths.
+    (スクリプトと、それが直接または間接的にインポートする scripts/ 内の全モジュールを、
+    ルート相対パスのソート済みリストで返します)
+    """
+    seen = set()
+    pending = [Path(script).stem]
+    while pending:
+        name = pending.pop()
+        if name in seen or not (SCRIPTS_DIR / f"{name}.py").exists():
+            continue
+        seen.add(name)
+        pending.extend(hashes.imports(f"scripts/{name}.py"))
+    return [f"scripts/{name}.py" for name in sorted(seen)]
+
+
+def stage_fingerprint(stage, hashes, dep_fingerprints):
+    """
+    Hash a stage's script, the helper modules it imports, its input files and
+    its dependency fingerprints into one digest.
+    (ステージのスクリプト・インポートする補助モジュール・入力ファイル・依存ステージの
+    フィンガープリントを1つのハッシュにまとめます)
+
+    Including the dependency fingerprints means a stage reruns after any upstream
+    change, even when it reads the upstream result through SQLite rather than a file.
+    (依存ステージのフィンガープリントを含めることで、上流の結果をファイルではなく
+    SQLite経由で読むステージも上流の変更後に再実行されます。)
+    """
+    digest = hashlib.sha256()
+    digest.update(f"args\0{' '.join(stage.args)}\n".encode("utf-8"))
+    for path in [*script_modules(stage.script, hashes), "scripts/fingerprint.py", *expand_inputs(stage.inputs)]:
+        digest.update(f"{path}\0{hashes.hash(path)}\n".encode("utf-8"))
+    for dep in stage.deps:
+        digest.update(f"stage:{dep}\0{dep_fingerprints[dep]}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def load_state():
+    if not STATE_PATH.exists():
+        return {"stages": {}, "files": {}}
+    with open(STATE_PATH, "r", encoding="utf-8") as file:
+        return json.load(file)
+
+
+def save_state(state):
+    STATE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = STATE_PATH.with_suffix(".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        json.dump(state, file, indent=2, sort_keys=True)
+    os.replace(tmp_path, STATE_PATH)
+
+
+def run_stage(stage, env=None, cwd=ROOT):
+    """
+    Run a stage script in a subprocess from the repository root, or from cwd
+    (a snapshot build directory laid out like the repository).
+    (リポジトリのルート、または cwd（リポジトリと同じ構成のスナップショットのビルド
+    ディレクトリ）からサブプロセスでステージのスクリプトを実行します)
+    """
+    import subprocess
+
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, stage.script, *stage.args],
+        cwd=cwd,
+        capture_output=True,
+        text=True,
+        encoding="utf-8",
+        env=env,
+    )
+    elapsed = time.perf_counter() - start
+    return result, elapsed
+
+
+def select_stages(names):
+    """
+    Return the requested stages plus everything upstream of them.
+    (指定されたステージとその上流のステージをすべて返します)
+    """
+    by_name = {stage.name: stage for stage in STAGES}
+    if not names:
+        return list(STAGES)
+    unknown = [name for name in names if name not in by_name]
+    if unknown:
+        raise ValueError(f"Unknown stages: {unknown} (不明なステージ: {unknown})")
+
+    selected = set()
+    pending = list(names)
+    while pending:
+        name = pending.pop()
+        if name not in selected:
+            selected.add(name)
+            pending.extend(by_name[name].deps)
+    return [stage for stage in STAGES if stage.name in selected]
+
+
+def stage_environment(report_dir=None, profile=False):
+    """
+    Return the environment for stage subprocesses, asking each stage to write its
+    run report (and cProfile dump) under report_dir.
+    (ステージのサブプロセス用の環境変数を返します。各ステージに report_dir 以下へ
+    実行レポート（と cProfile のダンプ）を書き出させます)
+    """
+    if report_dir is None:
+        return None
+    # Imported here, with logging and cProfile behind it, so status starts without them.
+    # status の起動時に logging や cProfile を読み込まないよう、ここでインポートします。
+    from instrumentation import PROFILE_DIR_ENV, REPORT_DIR_ENV
+
+    env = dict(os.environ)
+    env[REPORT_DIR_ENV] = str(report_dir)
+    if profile:
+        env[PROFILE_DIR_ENV] = str(Path(report_dir) / "profiles")
+    return env
+
+
+def write_run_report(report_dir, started, outcomes, seconds, status):
+    """
+    Combine the per-stage reports into run.json: outcome, wall time, peak RSS
+    and row counts for every stage, so runs can be compared side by side.
+    (ステージごとのレポートを run.json にまとめます。各ステージの結果・所要時間・
+    最大常駐メモリ・行数を記録し、実行同士を比較できるようにします)
+    """
+    from instrumentation import write_json_atomic
+
+    stages = []
+    for name, outcome in outcomes.items():
+        entry = {"name": name, "outcome": outcome, "seconds": seconds.get(name)}
+        stage_report = Path(report_dir) / f"{name}.json"
+        if outcome in ("ran", "failed") and stage_report.exists():
+            with open(stage_report, "r", encoding="utf-8") as file:
+                report = json.load(file)
+            entry["status"] = report["status"]
+            entry["peak_rss_mb"] = report["peak_rss_mb"]
+            entry["spans"] = report["spans"]
+        stages.append(entry)
+    path = Path(report_dir) / "run.json"
+    write_json_atomic(str(path), {
+        "started": started,
+        "status": status,
+        "seconds": round(sum(value for value in seconds.values()), 3),
+        "stages": stages,
+    })
+    return path
+
+
+def pipeline_status(stage_names=None):
+    """
+    Report each stage's state without running anything or saving the state file.
+    A stage downstream of a stale stage is stale too.
+    (何も実行せず、状態ファイルも保存せずに各ステージの状態を返します。
+    古いステージの下流のステージも古いものとして扱います)
+    Returns:
+        list: (stage, status, seconds of the last run or None) in run order
+    """
+    state = load_state()
+    hashes = FileHashCache(state.get("files"))
+    fingerprints = {}
+    statuses = []
+    remaining = select_stages(stage_names)
+    while remaining:
+        stage = next((stage for stage in remaining if all(dep in fingerprints for dep in stage.deps)), None)
+        if stage is None:
+            raise RuntimeError(f"Unresolvable stage dependencies: {[s.name for s in remaining]} (解決できない依存関係)")
+        remaining.remove(stage)
+
+        record = state["stages"].get(stage.name)
+        try:
+            fingerprint = stage_fingerprint(stage, hashes, fingerprints)
+        except FileNotFoundError:
+            fingerprint, status = None, "missing input"
+        else:
+            if record is None:
+                status = "never run"
+            elif record.get("fingerprint") != fingerprint:
+                status = "stale"
+            elif not all((ROOT / output).exists() for output in stage.outputs):
+                status = "missing output"
+            else:
+                status = "up to date"
+        fingerprints[stage.name] = fingerprint if status == "up to date" else f"pending:{fingerprint}"
+        statuses.append((stage, status, record.get("seconds") if record else None))
+    return statuses
+
+
+def run_pipeline(stage_names=None, force=False, dry_run=False, max_workers=2, report_dir=None, profile=False):
+    """
+    Run the pipeline DAG, skipping up-to-date stages and running independent
+    branches concurrently. With report_dir, every stage that runs writes a JSON
+    report there and the runner combines them into run.json.
+    (パイプラインのDAGを実行します。最新のステージはスキップし、独立した分岐は並行実行します。
+    report_dir を指定すると、実行した各ステージがJSONレポートを書き出し、run.json にまとめます)
+    Returns:
+        dict: Stage name → "ran", "skipped" or "would run" (ステージ名 → 実行結果)
+    """
+    # Imported here so `tokyo-metro status` and --help, which only read STAGES,
+    # start without them. (STAGES のみを読む status と --help の起動を速くするため、ここで読み込みます)
+    from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+    started = time.strftime("%Y-%m-%dT%H:%M:%S%z")
+    env = None if dry_run else stage_environment(report_dir, profile)
+    stage_seconds = {}
+    stages = select_stages(stage_names)
+    state = load_state()
+    hashes = FileHashCache(state.get("files"))
+    fingerprints = {}
+    outcomes = {}
+    remaining = {stage.name: stage for stage in stages}
+    running = {}
+
+    def ready_stages():
+        in_flight = {stage.name for stage, _ in running.values()}
+        return [
+            stage for stage in list(remaining.values())
+            if stage.name not in in_flight and all(dep in fingerprints for dep in stage.deps)
+        ]
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while remaining or running:
+            for stage in ready_stages():
+                fingerprint = stage_fingerprint(stage, hashes, fingerprints)
+                record = state["stages"].get(stage.name, {})
+                outputs_exist = all((ROOT / output).exists() for output in stage.outputs)
+                if not force and record.get("fingerprint") == fingerprint and outputs_exist:
+                    print(f"[{stage.name}] up to date, skipped. (最新のためスキップしました)")
+                    fingerprints[stage.name] = fingerprint
+                    outcomes[stage.name] = "skipped"
+                    del remaining[stage.name]
+                elif dry_run:
+                    print(f"[{stage.name}] would run. (実行対象です)")
+                    fingerprints[stage.name] = f"pending:{fingerprint}"
+                    outcomes[stage.name] = "would run"
+                    del remaining[stage.name]
+                else:
+                    print(f"[{stage.name}] running {stage.script}... (実行中)")
+                    running[executor.submit(run_stage, stage, env)] = (stage, fingerprint)
+
+            if not running:
+                if ready_stages():
+                    continue
+                if remaining:
+                    raise RuntimeError(f"Unresolvable stage dependencies: {sorted(remaining)} (解決できない依存関係)")
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage, fingerprint = running.pop(future)
+                result, elapsed = future.result()
+                stage_seconds[stage.name] = round(elapsed, 3)
+                output = (result.stdout + result.stderr).rstrip()
+                if output:
+                    print("\n".join(f"[{stage.name}] {line}" for line in output.splitlines()))
+                if result.returncode != 0:
+                    state["files"] = hashes.entries
+                    save_state(state)
+                    if env is not None:
+                        outcomes[stage.name] = "failed"
+                        write_run_report(report_dir, started, outcomes, stage_seconds, "failed")
+                    raise RuntimeError(
+                        f"Stage {stage.name} failed with exit code {result.returncode}. "
+                        f"(ステージ {stage.name} が終了コード {result.returncode} で失敗しました)"
+                    )
+
+                # Re-fingerprint after the run in case the stage rewrote its own inputs.
+                # ステージが自身の入力を書き換えた場合に備えて、実行後に再計算します。
+                fingerprint = stage_fingerprint(stage, hashes, fingerprints)
+                state["stages"][stage.name] = {"fingerprint": fingerprint, "seconds": round(elapsed, 3)}
+                fingerprints[stage.name] = fingerprint
+                outcomes[stage.name] = "ran"
+                del remaining[stage.name]
+                print(f"[{stage.name}] done in {elapsed:.2f}s. ({elapsed:.2f}秒で完了)")
+
+    if not dry_run:
+        state["files"] = hashes.entries
+        save_state(state)
+    if env is not None:
+        path = write_run_report(report_dir, started, outcomes, stage_seconds, "ok")
+        print(f"Run report saved to {path}. (実行レポートを {path} に保存しました)")
+    return outcomes
+
+
+def main():
+    """
+    Run the Tokyo Metro data pipeline end to end.
+    (東京メトロのデータパイプラインを最初から最後まで実行します)
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run the Tokyo Metro data pipeline. (東京メトロのデータパイプラインを実行します)")
+    parser.add_argument("stages", nargs="*",
+                        help="Stages to run, with their upstream stages. Default: all. (実行するステージ。既定は全ステージ)")
+    parser.add_argument("--force", action="store_true",
+                        help="Run stages even if they are up to date. (最新でも実行します)")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Show which stages would run without running them. (実行対象のステージを表示のみします)")
+    parser.add_argument("--jobs", type=int, default=2,
+                        help="Maximum number of stages running at once. (同時に実行するステージの最大数)")
+    parser.add_argument("--list", action="store_true",
+                        help="List stages and exit. (ステージ一覧を表示して終了します)")
+    parser.add_argument("--report", nargs="?", const="", metavar="DIR",
+                        help="Write per-stage JSON reports and run.json to DIR. Default: data/reports/<timestamp> "
+                             "(ステージごとのJSONレポートと run.json を書き出します)")
+    parser.add_argument("--profile", action="store_true",
+                        help="Run each stage under cProfile; implies --report. (各ステージを cProfile で計測します)")
+    args = parser.parse_args()
+
+    if args.list:
+        for stage in STAGES:
+            after = f" (after: {', '.join(stage.deps)})" if stage.deps else ""
+            print(f"{stage.name}: {stage.script}{after}")
+        return
+
+    report_dir = None
+    if args.report is not None or args.profile:
+        report_dir = Path(args.report).resolve() if args.report else REPORTS_DIR / time.strftime("%Y%m%dT%H%M%S")
+
+    start = time.perf_counter()
+    outcomes = run_pipeline(args.stages, force=args.force, dry_run=args.dry_run, max_workers=args.jobs,
+                            report_dir=report_dir, profile=args.profile)
+    ran = sum(1 for outcome in outcomes.values() if outcome != "skipped")
+    skipped = len(outcomes) - ran
+    verb = "would run" if args.dry_run else "ran"
+    print(
+        f"Pipeline finished in {time.perf_counter() - start:.2f}s: {ran} {verb}, "
+        f"{skipped} skipped. (パイプライン完了: 実行 {ran}、スキップ {skipped})"
+    )
+
+
+if __name__ == "__main__":
+    main()
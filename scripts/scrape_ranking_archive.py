@@ -0,0 +1,205 @@
+import argparse
+import asyncio
+import os
+import time
+from urllib.parse import urlsplit
+
+import aiohttp
+import lxml.html
+import pandas as pd
+
+from http_cache import HTTP_CACHE_DIR, USER_AGENT, conditional_headers, read_cache_entry, write_cache_entry
+
+# === Constants ===
+BASE_URL = "https://www.tokyometro.jp"
+
+# Ranking page paths per language. Archived years are served as {year}.html next
+# to the current index.html; override --base-url to point at a mirror or mock.
+# 言語ごとのランキングページのパス。過去年度は現行の index.html と同じ階層に
+# {year}.html として置かれています。ミラーやモックを使う場合は --base-url を指定します。
+RANKING_PATHS = {
+    "en": "/lang_en/corporate/enterprise/transportation/ranking/{year}.html",
+    "ja": "/corporate/enterprise/transportation/ranking/{year}.html",
+}
+
+OUTPUT_DIR = "data/processed/passenger_history"
+OUTPUT_COLUMNS = ["Station", "Daily Passenger Avg", "Year-Over-Year Change"]
+
+# Connection and politeness limits (接続数と負荷抑制の上限)
+MAX_CONNECTIONS = 8
+MAX_CONNECTIONS_PER_HOST = 4
+REQUESTS_PER_SECOND_PER_HOST = 5.0
+REQUEST_TIMEOUT_SECONDS = 30
+RETRY_TOTAL = 3
+RETRY_BACKOFF = 0.5
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+
+# === Functions ===
+class HostRateLimiter:
+    """
+    Space out request starts to at most `rate` per second for each host.
+    (ホストごとにリクエスト開始を毎秒 rate 件以下に間隔調整します)
+    """
+
+    def __init__(self, rate=REQUESTS_PER_SECOND_PER_HOST):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.next_slot = {}
+        self.locks = {}
+
+    async def wait(self, host):
+        lock = self.locks.setdefault(host, asyncio.Lock())
+        async with lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot.get(host, now))
+            self.next_slot[host] = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+def parse_ranking_table(html_content):
+    """
+    Parse the first ranking table with lxml into the passenger_stats.csv layout.
+    (最初のランキング表を lxml で解析し、passenger_stats.csv と同じ形式にします)
+    """
+    document = lxml.html.fromstring(html_content)
+    table = document.find(".//table")
+    if table is None:
+        raise ValueError("No ranking table found on page. (ページにランキング表がありません)")
+
+    data = []
+    for row in table.iter("tr"):
+        cols = [col.text_content().strip() for col in row.findall("td")]
+        if len(cols) == 5:  # Ensure the row has 5 columns
+            data.append(cols[2:5])  # Select relevant columns
+    return pd.DataFrame(data, columns=OUTPUT_COLUMNS)
+
+
+def partition_path(output_dir, year, language):
+    """Return the snapshot file for one year and language. (年度・言語ごとのスナップショットファイル)"""
+    return os.path.join(output_dir, f"year={year}", f"passenger_stats_{language}.csv")
+
+
+async def fetch(session, limiter, url, cache_dir):
+    """
+    GET a URL with per-host rate limiting, retries and a conditional request
+    against the shared on-disk HTTP cache.
+    (ホスト単位のレート制限・再試行・共有ディスクキャッシュに対する条件付きリクエストで
+    URLを取得します)
+    Returns:
+        tuple: (body, not_modified)
+    """
+    meta, cached_body = read_cache_entry(cache_dir, url)
+    headers = conditional_headers(meta)
+    host = urlsplit(url).netloc
+
+    for attempt in range(RETRY_TOTAL + 1):
+        await limiter.wait(host)
+        try:
+            async with session.get(url, headers=headers) as response:
+                if response.status == 304 and meta:
+                    return cached_body, True
+                if response.status == 200:
+                    body = await response.read()
+                    write_cache_entry(cache_dir, url, body, response.headers)
+                    return body, False
+                if response.status not in RETRY_STATUS_CODES or attempt == RETRY_TOTAL:
+                    raise Exception(f"Failed to fetch {url}, status code: {response.status}")
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            if attempt == RETRY_TOTAL:
+                raise
+        await asyncio.sleep(RETRY_BACKOFF * 2 ** attempt)
+
+
+async def scrape_page(session, limiter, base_url, year, language, output_dir, cache_dir):
+    """
+    Fetch, parse and save one year/language ranking page. Pages answered with 304
+    whose snapshot already exists are not parsed again.
+    (1年度・1言語のランキングページを取得・解析・保存します。304が返りスナップショットが
+    既にあるページは再解析しません)
+    """
+    url = base_url.rstrip("/") + RANKING_PATHS[language].format(year=year)
+    output_path = partition_path(output_dir, year, language)
+    body, not_modified = await fetch(session, limiter, url, cache_dir)
+    if not_modified and os.path.exists(output_path):
+        return year, language, "unchanged", None
+
+    # Parse off the event loop so downloads keep flowing.
+    # ダウンロードを止めないよう、解析はイベントループ外で実行します。
+    data = await asyncio.get_running_loop().run_in_executor(None, parse_ranking_table, body)
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    data.to_csv(output_path, index=False)
+    return year, language, "saved", len(data)
+
+
+async def scrape_archive(years, languages, base_url=BASE_URL, output_dir=OUTPUT_DIR, cache_dir=HTTP_CACHE_DIR,
+                         max_connections=MAX_CONNECTIONS, rate=REQUESTS_PER_SECOND_PER_HOST):
+    """
+    Scrape every year × language ranking page concurrently over one pooled session.
+    (全年度 × 全言語のランキングページを、1つの接続プールで並行して取得します)
+    Returns:
+        list: (year, language, status, rows) per page; status is "saved",
+        "unchanged" or "failed: ..." (ページごとの結果)
+    """
+    connector = aiohttp.TCPConnector(limit=max_connections, limit_per_host=MAX_CONNECTIONS_PER_HOST)
+    timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT_SECONDS)
+    limiter = HostRateLimiter(rate)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout,
+                                     headers={"User-Agent": USER_AGENT}) as session:
+        tasks = [
+            scrape_page(session, limiter, base_url, year, language, output_dir, cache_dir)
+            for year in years
+            for language in languages
+        ]
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+
+    pages = [(year, language) for year in years for language in languages]
+    return [
+        (year, language, f"failed: {result}", None) if isinstance(result, Exception) else result
+        for (year, language), result in zip(pages, results)
+    ]
+
+
+def parse_years(value):
+    """Parse "2015-2024" or "2019,2021" into a list of years. (年度指定を解析します)"""
+    years = []
+    for part in value.split(","):
+        if "-" in part:
+            start, end = part.split("-")
+            years.extend(range(int(start), int(end) + 1))
+        else:
+            years.append(int(part))
+    return years
+
+
+# === Main Execution ===
+def main():
+    parser = argparse.ArgumentParser(description="Scrape archived ranking pages. (過去のランキングページを取得します)")
+    parser.add_argument("--years", type=parse_years, default=parse_years("2015-2024"),
+                        help='Years to fetch, e.g. "2015-2024" or "2019,2021". (取得する年度)')
+    parser.add_argument("--languages", nargs="+", default=list(RANKING_PATHS), choices=list(RANKING_PATHS),
+                        help="Page languages to fetch. (取得するページの言語)")
+    parser.add_argument("--base-url", default=BASE_URL, help="Site root, e.g. a local mock server. (サイトのルートURL)")
+    parser.add_argument("--max-connections", type=int, default=MAX_CONNECTIONS,
+                        help="Connection pool size. (接続プールのサイズ)")
+    parser.add_argument("--rate", type=float, default=REQUESTS_PER_SECOND_PER_HOST,
+                        help="Requests per second per host. (ホストごとの毎秒リクエスト数)")
+    args = parser.parse_args()
+
+    print("Starting ranking archive scrape... (ランキングアーカイブの取得を開始します...)")
+    start = time.perf_counter()
+    results = asyncio.run(scrape_archive(args.years, args.languages, args.base_url,
+                                         max_connections=args.max_connections, rate=args.rate))
+    for year, language, status, rows in results:
+        suffix = f" ({rows} rows)" if rows is not None else ""
+        print(f"- {year} [{language}]: {status}{suffix}")
+    failed = sum(1 for _, _, status, _ in results if status.startswith("failed"))
+    if failed:
+        raise SystemExit(f"Ranking archive scrape failed for {failed} of {len(results)} pages. "
+                         f"({len(results)}ページ中{failed}ページの取得に失敗しました)")
+    print(f"Ranking archive scrape completed in {time.perf_counter() - start:.2f}s. "
+          f"(ランキングアーカイブの取得が完了しました)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,361 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from fingerprint import sha256_file
+from instrumentation import write_json_atomic
+from run_pipeline import ROOT, STAGES, expand_inputs, run_stage, select_stages
+
+# === Constants ===
+# Content-addressed store: objects/<sha[:2]>/<sha> holds each distinct file body once,
+# manifests/<id>.json records which body every source path had at one ingest, and
+# builds/<id>/ is a repository-shaped directory with the database rebuilt from it.
+# コンテンツアドレス方式のストア: objects/<sha[:2]>/<sha> に内容ごとに1回だけ本文を保存し、
+# manifests/<id>.json に各取り込み時点の各ソースパスの内容を記録します。builds/<id>/ は
+# そこから再構築したデータベースを持つ、リポジトリと同じ構成のディレクトリです。
+STORE_DIR = ROOT / "data" / "snapshots"
+
+# Stages rebuilt for a snapshot unless others are requested (指定がない場合に再構築するステージ)
+DEFAULT_BUILD_STAGES = ["import_sqlite"]
+
+TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+
+# === Functions ===
+def source_patterns(stages=STAGES):
+    """
+    Return the stage inputs under data/ that no stage produces: the raw files and
+    fetched pages the pipeline starts from.
+    (どのステージも生成しない data/ 以下のステージ入力、つまりパイプラインの起点となる
+    生ファイルと取得済みページを返します)
+    """
+    outputs = {output for stage in stages for output in stage.outputs}
+    patterns = []
+    for stage in stages:
+        for pattern in stage.inputs:
+            if pattern.startswith("data/") and pattern not in outputs and pattern not in patterns:
+                patterns.append(pattern)
+    return patterns
+
+
+def object_path(store_dir, sha256):
+    return Path(store_dir) / "objects" / sha256[:2] / sha256
+
+
+def store_object(store_dir, file_path):
+    """
+    Copy a file into the object store under its content hash unless an identical
+    body is already stored.
+    (同じ内容がまだ保存されていなければ、ファイルをコンテンツハッシュ名でオブジェクト
+    ストアにコピーします)
+    Returns:
+        tuple: (sha256, size, added)
+    """
+    sha256 = sha256_file(file_path)
+    target = object_path(store_dir, sha256)
+    if target.exists():
+        return sha256, target.stat().st_size, False
+
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = target.with_suffix(".tmp")
+    shutil.copyfile(file_path, tmp_path)
+    if sha256_file(tmp_path) != sha256:
+        os.remove(tmp_path)
+        raise ValueError(f"{file_path} changed while being stored. ({file_path} が保存中に変更されました)")
+    os.replace(tmp_path, target)
+    return sha256, target.stat().st_size, True
+
+
+def list_manifests(store_dir=STORE_DIR):
+    """
+    Return every manifest, oldest first.
+    (すべてのマニフェストを古い順に返します)
+    """
+    manifest_dir = Path(store_dir) / "manifests"
+    if not manifest_dir.exists():
+        return []
+    manifests = []
+    for path in manifest_dir.glob("*.json"):
+        with open(path, "r", encoding="utf-8") as file:
+            manifests.append(json.load(file))
+    return sorted(manifests, key=lambda manifest: (manifest["created_at"], manifest["id"]))
+
+
+def ingest_snapshot(label="", patterns=None, store_dir=STORE_DIR, force=False, now=None):
+    """
+    Store the current source files and record them in a new manifest.
+    (現在のソースファイルを保存し、新しいマニフェストに記録します)
+
+    Bodies already in the store are not copied again, and no manifest is written
+    when every path has the same content as in the latest one (unless force).
+    (保存済みの本文は再度コピーせず、すべてのパスの内容が最新のマニフェストと同じ場合は
+    force を指定しない限りマニフェストを書きません。)
+    Returns:
+        tuple: (manifest, bytes_added); manifest is None when nothing changed
+    """
+    files = {}
+    bytes_added = 0
+    for relative_path in expand_inputs(patterns or source_patterns()):
+        relative_path = Path(relative_path).as_posix()
+        sha256, size, added = store_object(store_dir, ROOT / relative_path)
+        files[relative_path] = {"sha256": sha256, "size": size}
+        bytes_added += size if added else 0
+
+    previous = list_manifests(store_dir)
+    if not force and previous and previous[-1]["files"] == files:
+        return None, bytes_added
+
+    created = (now or datetime.now(timezone.utc)).astimezone(timezone.utc)
+    digest = hashlib.sha256(json.dumps([label, files], sort_keys=True).encode("utf-8")).hexdigest()
+    manifest = {
+        "id": f"{created.strftime('%Y%m%dT%H%M%SZ')}-{digest[:8]}",
+        "created_at": created.strftime(TIMESTAMP_FORMAT),
+        "label": label,
+        "files": files,
+    }
+    write_json_atomic(str(Path(store_dir) / "manifests" / f"{manifest['id']}.json"), manifest)
+    return manifest, bytes_added
+
+
+def parse_as_of(value):
+    """
+    Parse an ISO date or date-time into an exclusive UTC cutoff. A date alone
+    covers the whole day, and times without an offset are taken as UTC.
+    (ISO形式の日付または日時を、その時刻を含まないUTCの締め切りに変換します。日付のみの
+    場合はその日全体を含み、オフセットのない時刻はUTCとみなします)
+    """
+    try:
+        moment = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Not a snapshot id or ISO date: {value} (スナップショットIDまたはISO日付ではありません)") from None
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    step = timedelta(days=1) if len(value) == 10 else timedelta(seconds=1)
+    return moment.astimezone(timezone.utc) + step
+
+
+def resolve_snapshot(as_of="latest", store_dir=STORE_DIR):
+    """
+    Return the manifest for a snapshot id (or unique id prefix), "latest", or the
+    last manifest ingested at or before an ISO date-time.
+    (スナップショットID（または一意なIDの先頭部分）、"latest"、またはISO日時以前に
+    取り込まれた最後のマニフェストを返します)
+    """
+    manifests = list_manifests(store_dir)
+    if not manifests:
+        raise FileNotFoundError(f"No snapshots in {store_dir} (スナップショットがありません)")
+    if as_of in (None, "latest"):
+        return manifests[-1]
+
+    matches = [manifest for manifest in manifests if manifest["id"].startswith(as_of)]
+    if len(matches) == 1:
+        return matches[0]
+    if len(matches) > 1:
+        raise ValueError(f"Ambiguous snapshot id: {as_of} (スナップショットIDが曖昧です)")
+
+    cutoff = parse_as_of(as_of)
+    earlier = [
+        manifest for manifest in manifests
+        if datetime.strptime(manifest["created_at"], TIMESTAMP_FORMAT).replace(tzinfo=timezone.utc) < cutoff
+    ]
+    if not earlier:
+        raise ValueError(f"No snapshot at or before {as_of} (その時点以前のスナップショットがありません)")
+    return earlier[-1]
+
+
+def restore_snapshot(manifest, target_dir, store_dir=STORE_DIR):
+    """
+    Write every file of a snapshot under target_dir at its recorded path.
+    (スナップショットの全ファイルを、記録されたパスで target_dir 以下に書き出します)
+    """
+    for relative_path, entry in manifest["files"].items():
+        source = object_path(store_dir, entry["sha256"])
+        if not source.exists():
+            raise FileNotFoundError(f"Missing object {entry['sha256']} for {relative_path} (オブジェクトがありません)")
+        target = Path(target_dir) / relative_path
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = target.with_name(f"{target.name}.tmp")
+        shutil.copyfile(source, tmp_path)
+        os.replace(tmp_path, target)
+
+
+def build_snapshot(manifest, stage_names=None, store_dir=STORE_DIR, force=False, verbose=True):
+    """
+    Rebuild the database as of a snapshot without fetching anything, and return its path.
+    (何も取得せずにスナップショット時点のデータベースを再構築し、そのパスを返します)
+
+    The snapshot's files are restored into a directory laid out like the repository,
+    with scripts/, sql/ and the content-keyed data/cache/ linked from the working tree,
+    and the stages run there. A finished build is reused until force is given.
+    (スナップショットのファイルをリポジトリと同じ構成のディレクトリに復元し、scripts/・sql/・
+    コンテンツをキーとする data/cache/ は作業ツリーからリンクして、そこでステージを実行します。
+    完了したビルドは force を指定するまで再利用します。)
+    """
+    build_dir = Path(store_dir) / "builds" / manifest["id"]
+    db_path = build_dir / "tokyo_metro.db"
+    if db_path.exists() and not force:
+        return db_path
+
+    work_dir = build_dir.with_name(f"{build_dir.name}.tmp")
+    for path in (work_dir, build_dir):
+        if path.exists():
+            shutil.rmtree(path)
+    restore_snapshot(manifest, work_dir, store_dir)
+    # data/cache/ is gitignored, so create it before linking (fresh clones lack it).
+    # data/cache/ は git 管理外のため、リンクする前に作成します（新規クローンには存在しません）。
+    (ROOT / "data" / "cache").mkdir(parents=True, exist_ok=True)
+    for name in ("scripts", "sql", "data/cache"):
+        (work_dir / name).parent.mkdir(parents=True, exist_ok=True)
+        (work_dir / name).symlink_to(ROOT / name, target_is_directory=True)
+
+    for stage in select_stages(stage_names or DEFAULT_BUILD_STAGES):
+        result, elapsed = run_stage(stage, cwd=work_dir)
+        if result.returncode != 0:
+            raise RuntimeError(
+                f"Stage {stage.name} failed for snapshot {manifest['id']} "
+                f"(スナップショットのステージが失敗しました):\n{result.stderr}"
+            )
+        if verbose:
+            print(f"  {stage.name:<16} {elapsed:.2f}s", file=sys.stderr)
+    os.replace(work_dir, build_dir)
+    return db_path
+
+
+def snapshot_database(as_of="latest", stage_names=None, store_dir=STORE_DIR, verbose=True):
+    """
+    Return the database path for a snapshot, building it on first use.
+    (スナップショットのデータベースのパスを返します。初回利用時に構築します)
+    """
+    return build_snapshot(resolve_snapshot(as_of, store_dir), stage_names, store_dir, verbose=verbose)
+
+
+def store_usage(store_dir=STORE_DIR):
+    """
+    Compare the bytes the manifests refer to with the bytes actually stored.
+    (マニフェストが参照するバイト数と、実際に保存されているバイト数を比較します)
+    """
+    manifests = list_manifests(store_dir)
+    referenced = {entry["sha256"] for manifest in manifests for entry in manifest["files"].values()}
+    objects = [path for path in (Path(store_dir) / "objects").glob("*/*") if not path.name.endswith(".tmp")]
+    return {
+        "manifests": len(manifests),
+        "objects": len(objects),
+        "unreferenced_objects": sum(1 for path in objects if path.name not in referenced),
+        "logical_bytes": sum(entry["size"] for manifest in manifests for entry in manifest["files"].values()),
+        "stored_bytes": sum(path.stat().st_size for path in objects),
+    }
+
+
+def collect_garbage(store_dir=STORE_DIR):
+    """
+    Delete objects no manifest refers to, leftover temporary files, and builds of
+    removed manifests.
+    (どのマニフェストからも参照されないオブジェクト、残った一時ファイル、削除された
+    マニフェストのビルドを削除します)
+    Returns:
+        int: Bytes freed from the object store (オブジェクトストアから解放したバイト数)
+    """
+    manifests = list_manifests(store_dir)
+    referenced = {entry["sha256"] for manifest in manifests for entry in manifest["files"].values()}
+    freed = 0
+    for path in (Path(store_dir) / "objects").glob("*/*"):
+        if path.name not in referenced:
+            freed += path.stat().st_size
+            path.unlink()
+    ids = {manifest["id"] for manifest in manifests}
+    for path in (Path(store_dir) / "builds").glob("*"):
+        if path.name not in ids:
+            shutil.rmtree(path)
+    return freed
+
+
+def format_bytes(size):
+    for unit in ("B", "KiB", "MiB"):
+        if size < 1024:
+            return f"{size:,.0f} {unit}" if unit == "B" else f"{size:,.1f} {unit}"
+        size /= 1024
+    return f"{size:,.1f} GiB"
+
+
+# === Main Execution ===
+def main():
+    parser = argparse.ArgumentParser(
+        description="Content-addressed snapshots of the pipeline's source files. (ソースファイルのスナップショット)"
+    )
+    parser.add_argument("--store", default=str(STORE_DIR), help="Snapshot store directory. (スナップショットの保存先)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    ingest = commands.add_parser("ingest", help="Record the current source files. (現在のソースファイルを記録)")
+    ingest.add_argument("--label", default="", help="Note stored with the manifest. (マニフェストに付けるメモ)")
+    ingest.add_argument("--force", action="store_true",
+                        help="Write a manifest even if nothing changed. (変更がなくてもマニフェストを書きます)")
+
+    commands.add_parser("list", help="List snapshots. (スナップショットの一覧)")
+
+    show = commands.add_parser("show", help="Show the files of one snapshot. (スナップショットのファイルを表示)")
+    show.add_argument("as_of", nargs="?", default="latest", help="Snapshot id, ISO date-time or latest. (ID・日時)")
+
+    restore = commands.add_parser("restore", help="Write a snapshot's files back. (スナップショットのファイルを復元)")
+    restore.add_argument("as_of", help="Snapshot id, ISO date-time or latest. (ID・日時)")
+    restore.add_argument("--to", default=str(ROOT),
+                         help="Directory to restore under; defaults to the working tree. (復元先。既定は作業ツリー)")
+
+    build = commands.add_parser("build", help="Rebuild the database as of a snapshot. (スナップショット時点のDBを再構築)")
+    build.add_argument("as_of", nargs="?", default="latest", help="Snapshot id, ISO date-time or latest. (ID・日時)")
+    build.add_argument("--stages", nargs="+", default=DEFAULT_BUILD_STAGES,
+                       help="Stages to run, with their upstream stages. (実行するステージ)")
+    build.add_argument("--force", action="store_true", help="Rebuild even if a build exists. (既存のビルドを作り直します)")
+
+    commands.add_parser("du", help="Show logical and stored size. (論理サイズと保存サイズを表示)")
+    commands.add_parser("gc", help="Delete unreferenced objects and builds. (参照されないデータを削除)")
+    args = parser.parse_args()
+
+    try:
+        if args.command == "ingest":
+            manifest, bytes_added = ingest_snapshot(args.label, store_dir=args.store, force=args.force)
+            if manifest is None:
+                print("Sources unchanged since the latest snapshot. (最新のスナップショットから変更はありません)")
+            else:
+                print(f"Recorded snapshot {manifest['id']}: {len(manifest['files'])} files, "
+                      f"{format_bytes(bytes_added)} new. (スナップショットを記録しました)")
+        elif args.command == "list":
+            for manifest in list_manifests(args.store):
+                size = sum(entry["size"] for entry in manifest["files"].values())
+                built = "built" if (Path(args.store) / "builds" / manifest["id"] / "tokyo_metro.db").exists() else ""
+                print(f"{manifest['id']}  {manifest['created_at']}  {len(manifest['files']):>3} files  "
+                      f"{format_bytes(size):>10}  {built:<5}  {manifest['label']}")
+        elif args.command == "show":
+            manifest = resolve_snapshot(args.as_of, args.store)
+            print(f"{manifest['id']} ({manifest['created_at']}) {manifest['label']}")
+            for relative_path, entry in manifest["files"].items():
+                print(f"  {entry['sha256'][:12]}  {format_bytes(entry['size']):>10}  {relative_path}")
+        elif args.command == "restore":
+            manifest = resolve_snapshot(args.as_of, args.store)
+            restore_snapshot(manifest, args.to, args.store)
+            print(f"Restored {len(manifest['files'])} files from {manifest['id']} into {args.to}. "
+                  f"(スナップショットのファイルを復元しました)")
+        elif args.command == "build":
+            manifest = resolve_snapshot(args.as_of, args.store)
+            print(f"Building {manifest['id']}... (スナップショットのDBを構築しています...)")
+            print(build_snapshot(manifest, args.stages, args.store, force=args.force))
+        elif args.command == "du":
+            usage = store_usage(args.store)
+            saved = usage["logical_bytes"] - usage["stored_bytes"]
+            print(f"{usage['manifests']} snapshots, {usage['objects']} objects "
+                  f"({usage['unreferenced_objects']} unreferenced)")
+            print(f"Logical size (論理サイズ): {format_bytes(usage['logical_bytes'])}")
+            print(f"Stored size (保存サイズ):  {format_bytes(usage['stored_bytes'])} "
+                  f"({format_bytes(max(saved, 0))} saved by deduplication)")
+        elif args.command == "gc":
+            print(f"Freed {format_bytes(collect_garbage(args.store))}. (領域を解放しました)")
+    except (FileNotFoundError, ValueError, RuntimeError) as error:
+        raise SystemExit(str(error)) from None
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,364 @@
+import heapq
+import json
+from collections import OrderedDict
+
+import numpy as np
+
+# Path to the raw station network (駅ネットワークの生データのパス)
+STATIONS_JSON_PATH = "./data/raw/stations.json"
+
+# Transition type IDs from stations.json (stations.json の乗換種別ID)
+TRANSITION_WALK = 0
+TRANSITION_RIDE = 1
+TRANSITION_GROUND = 2
+
+# Travel-time estimates used when stations.json has no duration (-1).
+# stations.json に所要時間がない (-1) 場合に使う推定値。
+RIDE_SPEED_KMH = 32.0
+STATION_DWELL_MINUTES = 0.5
+TRANSFER_MINUTES = 5.0
+
+METRICS = ("distance", "duration", "hops", "transfers")
+
+# Number of single-source trees kept per graph (グラフごとに保持する単一始点木の数)
+TREE_CACHE_SIZE = 512
+
+
+class ShortestPathTree:
+    """
+    Single-source shortest-path result over integer station indexes.
+    (整数の駅インデックス上の単一始点最短経路の結果)
+
+    cost is the optimized metric; distance_km, transfers and hops describe the
+    chosen route. predecessor is -1 for the source and unreachable stations.
+    (cost は最適化した指標、distance_km・transfers・hops は選ばれた経路の値です。
+    始点と到達不能な駅の predecessor は -1 です。)
+    """
+
+    def __init__(self, source, metric, cost, distance_km, transfers, hops, predecessor):
+        self.source = source
+        self.metric = metric
+        self.cost = cost
+        self.distance_km = distance_km
+        self.transfers = transfers
+        self.hops = hops
+        self.predecessor = predecessor
+
+    def path_to(self, target):
+        """
+        Return the station indexes from the source to target, or [] if unreachable.
+        (始点から target までの駅インデックスを返します。到達不能なら [])
+        """
+        if self.source != target and self.predecessor[target] < 0:
+            return []
+        path = [target]
+        while path[-1] != self.source:
+            path.append(int(self.predecessor[path[-1]]))
+        path.reverse()
+        return path
+
+
+class StationGraph:
+    """
+    Compact, array-backed station connection graph in CSR form.
+    (CSR形式で保持するコンパクトな配列ベースの駅接続グラフ)
+
+    Stations are numbered 0..n-1 in stations.json order. The outgoing edges of
+    station i are indptr[i]:indptr[i + 1] in indices, distance_km, duration_min
+    and type_ids.
+    (駅は stations.json の順に 0..n-1 で番号付けされます。駅 i の出辺は indices・
+    distance_km・duration_min・type_ids の indptr[i]:indptr[i + 1] の範囲です。)
+    """
+
+    def __init__(self, station_ids, names_en, names_jp, indptr, indices,
+                 distance_km, duration_min, type_ids, transition_types=None):
+        self.station_ids = list(station_ids)
+        self.names_en = list(names_en)
+        self.names_jp = list(names_jp)
+        self.index = {station_id: i for i, station_id in enumerate(self.station_ids)}
+        self.indptr = indptr
+        self.indices = indices
+        self.distance_km = distance_km
+        self.duration_min = duration_min
+        self.type_ids = type_ids
+        self.transition_types = dict(transition_types or {})
+        self.is_transfer = (type_ids != TRANSITION_RIDE).astype(np.int8)
+
+        # Plain-list mirrors for the Python search loops; indexing numpy scalars
+        # one at a time is several times slower than indexing lists.
+        # Python の探索ループ用のリスト版。numpy スカラーの逐次参照はリストより遅いため。
+        self._indptr = indptr.tolist()
+        self._indices = indices.tolist()
+        self._distance = distance_km.tolist()
+        self._transfer = self.is_transfer.tolist()
+        self._weights = {}
+        self._tree_cache = OrderedDict()
+
+    @classmethod
+    def from_json(cls, json_data):
+        """
+        Build the graph from parsed stations.json data.
+        (解析済みの stations.json データからグラフを構築します)
+        """
+        stations = json_data.get("stations", {})
+        station_ids = list(stations.keys())
+        index = {station_id: i for i, station_id in enumerate(station_ids)}
+
+        indptr = np.zeros(len(station_ids) + 1, dtype=np.int32)
+        indices, distances, durations, type_ids = [], [], [], []
+        for i, station_id in enumerate(station_ids):
+            for connection in stations[station_id].get("connections", []):
+                target_id = connection["target_id"]
+                if target_id not in index:
+                    raise ValueError(
+                        f"Connection from {station_id} to unknown station {target_id} "
+                        f"({station_id} から未知の駅 {target_id} への接続があります)"
+                    )
+                indices.append(index[target_id])
+                distances.append(float(connection.get("distance", 0.0)))
+                durations.append(float(connection.get("duration", -1)))
+                type_ids.append(int(connection.get("type_id", TRANSITION_RIDE)))
+            indptr[i + 1] = len(indices)
+
+        distance_km = np.array(distances, dtype=np.float64)
+        type_array = np.array(type_ids, dtype=np.int8)
+        return cls(
+            station_ids,
+            [stations[s].get("name_en", "") for s in station_ids],
+            [stations[s].get("name_jp", "") for s in station_ids],
+            indptr,
+            np.array(indices, dtype=np.int32),
+            distance_km,
+            estimate_durations(np.array(durations, dtype=np.float64), distance_km, type_array),
+            type_array,
+            {int(k): v for k, v in json_data.get("transition_types", {}).items()},
+        )
+
+    @property
+    def station_count(self):
+        return len(self.station_ids)
+
+    @property
+    def edge_count(self):
+        return len(self.indices)
+
+    def neighbors(self, station_index):
+        """
+        Return the target indexes of a station's outgoing edges.
+        (駅の出辺の接続先インデックスを返します)
+        """
+        return self.indices[self.indptr[station_index]:self.indptr[station_index + 1]]
+
+    def edge_weights(self, metric):
+        """
+        Return the per-edge search weight for a metric.
+        (指標ごとの辺の探索重みを返します)
+
+        Ties are broken towards fewer transfers for distance/duration/hops, and
+        towards shorter distance for transfers, by a term too small to change
+        which route wins on the primary metric.
+        (distance・duration・hops では乗換の少ない経路、transfers では距離の短い経路を
+        優先するため、主指標の順位を変えない微小な項を加えています。)
+        """
+        if metric not in METRICS:
+            raise ValueError(f"Unknown metric: {metric} (不明な指標: {metric})")
+        if metric not in self._weights:
+            if metric == "distance":
+                weights = self.distance_km + 1e-6 * self.is_transfer
+            elif metric == "duration":
+                weights = self.duration_min + 1e-6 * self.is_transfer
+            elif metric == "hops":
+                weights = (1 - self.is_transfer) + 1e-6 * self.is_transfer
+            else:
+                weights = self.is_transfer + self.distance_km / (self.distance_km.sum() + 1.0)
+            self._weights[metric] = weights.tolist()
+        return self._weights[metric]
+
+    def resolve(self, station):
+        """
+        Accept a station ID or integer index and return the integer index.
+        (駅IDまたは整数インデックスを受け取り、整数インデックスを返します)
+        """
+        if isinstance(station, (int, np.integer)):
+            if not 0 <= station < self.station_count:
+                raise IndexError(f"Station index out of range: {station} (駅インデックスが範囲外です: {station})")
+            return int(station)
+        if station not in self.index:
+            raise KeyError(f"Unknown station ID: {station} (不明な駅ID: {station})")
+        return self.index[station]
+
+    def shortest_paths(self, source, metric="distance"):
+        """
+        Run a single-source Dijkstra search and return a ShortestPathTree.
+        Results are cached per (source, metric).
+        (単一始点のダイクストラ探索を実行し ShortestPathTree を返します。
+        結果は (始点, 指標) ごとにキャッシュされます。)
+        """
+        source = self.resolve(source)
+        key = (source, metric)
+        tree = self._tree_cache.get(key)
+        if tree is not None:
+            self._tree_cache.move_to_end(key)
+            return tree
+
+        tree = self._search(source, metric, target=None)
+        self._tree_cache[key] = tree
+        if len(self._tree_cache) > TREE_CACHE_SIZE:
+            self._tree_cache.popitem(last=False)
+        return tree
+
+    def shortest_path(self, source, target, metric="distance"):
+        """
+        Return the best route between two stations as a dict, or None if unreachable.
+        The search stops as soon as the target is settled.
+        (2駅間の最適経路を dict で返します。到達不能なら None。
+        目的駅が確定した時点で探索を終了します。)
+        """
+        source = self.resolve(source)
+        target = self.resolve(target)
+        cached = self._tree_cache.get((source, metric))
+        tree = cached if cached is not None else self._search(source, metric, target=target)
+
+        path = tree.path_to(target)
+        if not path:
+            return None
+        return {
+            "station_ids": [self.station_ids[i] for i in path],
+            "cost": float(tree.cost[target]),
+            "distance_km": round(float(tree.distance_km[target]), 3),
+            "duration_min": round(self.route_duration(path), 1),
+            "transfers": int(tree.transfers[target]),
+            "hops": int(tree.hops[target]),
+        }
+
+    def all_pairs(self, metric="distance"):
+        """
+        Run one search per station and stack the results into n×n matrices.
+        Row i holds the tree rooted at station i. Trees are not cached.
+        (駅ごとに探索を実行し、結果を n×n 行列にまとめます。i 行目は駅 i を始点とする
+        木です。木はキャッシュしません。)
+        Returns:
+            dict: cost, distance_km, transfers, hops and predecessor matrices
+        """
+        trees = [self._search(source, metric) for source in range(self.station_count)]
+        return {
+            field: np.vstack([getattr(tree, field) for tree in trees])
+            for field in ("cost", "distance_km", "transfers", "hops", "predecessor")
+        }
+
+    def route_duration(self, path):
+        """
+        Return the estimated travel time in minutes along a path of station indexes.
+        (駅インデックスの経路に沿った推定所要時間（分）を返します)
+        """
+        total = 0.0
+        for u, v in zip(path, path[1:]):
+            start, end = self._indptr[u], self._indptr[u + 1]
+            total += min(
+                self.duration_min[e] for e in range(start, end) if self._indices[e] == v
+            )
+        return float(total)
+
+    def _search(self, source, metric, target=None):
+        weights = self.edge_weights(metric)
+        indptr, indices = self._indptr, self._indices
+        distance, transfer = self._distance, self._transfer
+        n = self.station_count
+
+        inf = float("inf")
+        cost = [inf] * n
+        km = [inf] * n
+        transfers = [-1] * n
+        hops = [-1] * n
+        predecessor = [-1] * n
+        settled = [False] * n
+
+        cost[source] = 0.0
+        km[source] = 0.0
+        transfers[source] = 0
+        hops[source] = 0
+        heap = [(0.0, source)]
+        while heap:
+            current_cost, u = heapq.heappop(heap)
+            if settled[u]:
+                continue
+            settled[u] = True
+            if u == target:
+                break
+            for e in range(indptr[u], indptr[u + 1]):
+                v = indices[e]
+                candidate = current_cost + weights[e]
+                if candidate < cost[v]:
+                    cost[v] = candidate
+                    km[v] = km[u] + distance[e]
+                    transfers[v] = transfers[u] + transfer[e]
+                    hops[v] = hops[u] + 1 - transfer[e]
+                    predecessor[v] = u
+                    heapq.heappush(heap, (candidate, v))
+
+        # Report the primary metric without the tie-break term.
+        # 同順位調整の項を除いた主指標の値を返します。
+        if metric == "distance":
+            cost = km
+        elif metric == "duration":
+            cost = [c - 1e-6 * t if t >= 0 else inf for c, t in zip(cost, transfers)]
+        else:
+            counts = hops if metric == "hops" else transfers
+            cost = [float(c) if c >= 0 else inf for c in counts]
+
+        return ShortestPathTree(
+            source,
+            metric,
+            np.array(cost),
+            np.array(km),
+            np.array(transfers, dtype=np.int32),
+            np.array(hops, dtype=np.int32),
+            np.array(predecessor, dtype=np.int32),
+        )
+
+
+def estimate_durations(durations, distance_km, type_ids):
+    """
+    Fill unknown (-1) edge durations with distance- and transfer-based estimates.
+    (不明な (-1) 所要時間を距離と乗換に基づく推定値で補完します)
+    """
+    ride_estimate = distance_km / RIDE_SPEED_KMH * 60.0 + STATION_DWELL_MINUTES
+    estimate = np.where(type_ids == TRANSITION_RIDE, ride_estimate, TRANSFER_MINUTES)
+    return np.where(durations >= 0, durations, estimate)
+
+
+def load_station_graph(json_path=STATIONS_JSON_PATH):
+    """
+    Load stations.json and build a StationGraph.
+    (stations.json を読み込み StationGraph を構築します)
+    """
+    with open(json_path, "r", encoding="utf-8") as file:
+        return StationGraph.from_json(json.load(file))
+
+
+def main():
+    """
+    Print a summary of the station graph and a sample route query.
+    (駅グラフの概要とサンプル経路検索の結果を表示します)
+    """
+    import time
+
+    graph = load_station_graph()
+    print(f"Station graph loaded: {graph.station_count} stations, {graph.edge_count} edges. "
+          f"(駅グラフを読み込みました: 駅 {graph.station_count}、辺 {graph.edge_count})")
+
+    for metric in ("distance", "transfers"):
+        route = graph.shortest_path("A01", "Z14", metric=metric)
+        print(f"A01 → Z14 by {metric}: {route}")
+
+    start = time.perf_counter()
+    queries = 0
+    for source in range(graph.station_count):
+        graph.shortest_path(source, (source * 7 + 3) % graph.station_count)
+        queries += 1
+    elapsed = time.perf_counter() - start
+    print(f"Point-to-point queries: {queries / elapsed:,.0f} per second. (2駅間検索: 毎秒 {queries / elapsed:,.0f} 件)")
+
+
+if __name__ == "__main__":
+    main()
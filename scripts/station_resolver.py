@@ -0,0 +1,201 @@
+import hashlib
+import json
+import os
+import pickle
+import re
+import unicodedata
+
+import pandas as pd
+
+from fingerprint import sha256_file
+
+# Cache directory for built resolvers (構築済みリゾルバのキャッシュフォルダ)
+RESOLVER_CACHE_DIR = "./data/cache/station_resolver"
+
+# Bump when the normalization or index layout changes so old caches are ignored.
+# 正規化やインデックス構造を変更したら更新し、古いキャッシュを無視させます。
+RESOLVER_CACHE_VERSION = 1
+
+# Source names that cannot be matched from stations.json alone. stations.json lists
+# Ginza Line G07 (虎ノ門) under the English name "Toranomon Hills", which collides
+# with Hibiya Line H06 (虎ノ門ヒルズ).
+# stations.json だけでは一致しない名称。stations.json では銀座線 G07（虎ノ門）の英語名が
+# "Toranomon Hills" となっており、日比谷線 H06（虎ノ門ヒルズ）と衝突します。
+STATION_ALIASES = {
+    "Toranomon": ["G07"],
+    "Toranomon Hills": ["H06"],
+}
+
+# Separator between station names that share one ranking row (1行に併記された駅名の区切り)
+COMBINED_NAME_SEPARATOR = "・"
+
+# Minimum Dice similarity of character trigrams for a fuzzy match (あいまい一致に必要な類似度)
+FUZZY_THRESHOLD = 0.6
+
+
+def normalize_name(name):
+    """
+    Normalize a station name into a lookup key.
+    (駅名を検索キーに正規化します)
+
+    Case, macrons (Ō/ō), hyphens, spaces, full-width characters and bracketed
+    suffixes such as "<Harajuku>" are ignored; Japanese characters are kept.
+    (大文字小文字、長音記号 (Ō/ō)、ハイフン、空白、全角文字、"<Harajuku>" のような
+    括弧付きの補足は無視し、日本語の文字は保持します。)
+    """
+    text = unicodedata.normalize("NFKC", str(name))
+    text = re.sub(r"<[^>]*>|\([^)]*\)", "", text)
+    text = "".join(
+        char for char in unicodedata.normalize("NFKD", text) if not unicodedata.combining(char)
+    )
+    return re.sub(r"[\W_]+", "", unicodedata.normalize("NFKC", text).lower())
+
+
+def trigrams(key):
+    padded = f"^{key}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class StationNameResolver:
+    """
+    Resolve station names from any source to Station_IDs.
+    (さまざまなソースの駅名を Station_ID に解決します)
+
+    Exact hits are O(1) dictionary lookups on normalized keys built from English
+    names, Japanese names and STATION_ALIASES. Misses fall back to a trigram index
+    and are accepted only if one key is clearly the most similar.
+    (完全一致は英語名・日本語名・STATION_ALIASES から作った正規化キーの辞書参照で O(1)
+    です。一致しない場合はトライグラム索引でのあいまい検索に切り替え、類似度が明確に
+    最も高いキーが1つだけの場合に採用します。)
+    """
+
+    def __init__(self, stations, aliases=None):
+        """
+        Args:
+            stations (iterable): (Station_ID, English_Name, Japanese_Name) tuples
+            aliases (dict): Source name → list of Station_IDs (駅名 → Station_ID のリスト)
+        """
+        self.exact = {}
+        for station_id, name_en, name_jp in stations:
+            for name in (name_en, name_jp):
+                key = normalize_name(name) if isinstance(name, str) else ""
+                if key and station_id not in self.exact.setdefault(key, []):
+                    self.exact[key].append(station_id)
+
+        # Aliases replace, rather than extend, whatever stations.json maps the key to.
+        # エイリアスは stations.json 由来の対応を拡張せず置き換えます。
+        for name, station_ids in (aliases or {}).items():
+            self.exact[normalize_name(name)] = list(station_ids)
+
+        self.exact = {key: tuple(ids) for key, ids in self.exact.items()}
+        self.ngram_index = {}
+        for key in self.exact:
+            for gram in trigrams(key):
+                self.ngram_index.setdefault(gram, set()).add(key)
+        self._memo = {}
+
+    @classmethod
+    def from_station_data(cls, station_data, aliases=STATION_ALIASES):
+        """
+        Build a resolver from a station DataFrame with Station_ID, English_Name
+        and Japanese_Name columns.
+        (Station_ID・English_Name・Japanese_Name 列を持つ駅データから構築します)
+        """
+        japanese = station_data["Japanese_Name"] if "Japanese_Name" in station_data else [None] * len(station_data)
+        return cls(zip(station_data["Station_ID"], station_data["English_Name"], japanese), aliases)
+
+    @classmethod
+    def from_json(cls, json_data, aliases=STATION_ALIASES):
+        """
+        Build a resolver from parsed stations.json data.
+        (解析済みの stations.json データから構築します)
+        """
+        stations = json_data.get("stations", {})
+        return cls(
+            ((sid, info.get("name_en", ""), info.get("name_jp", "")) for sid, info in stations.items()),
+            aliases,
+        )
+
+    def fuzzy_key(self, key):
+        """
+        Return the single best trigram match for a key, or None.
+        (キーに最も近いトライグラム一致を1つ返します。なければ None)
+        """
+        grams = trigrams(key)
+        shared = {}
+        for gram in grams:
+            for candidate in self.ngram_index.get(gram, ()):
+                shared[candidate] = shared.get(candidate, 0) + 1
+
+        scored = sorted(
+            ((2 * count / (len(grams) + len(trigrams(candidate))), candidate) for candidate, count in shared.items()),
+            reverse=True,
+        )
+        if not scored or scored[0][0] < FUZZY_THRESHOLD:
+            return None
+        if len(scored) > 1 and scored[1][0] == scored[0][0]:
+            return None
+        return scored[0][1]
+
+    def resolve(self, name):
+        """
+        Return the tuple of Station_IDs for a name; empty if it cannot be resolved.
+        Names joined with "・" resolve to the IDs of every part.
+        (駅名に対応する Station_ID のタプルを返します。解決できない場合は空。
+        "・" で併記された駅名は各駅のIDをすべて返します。)
+        """
+        if name in self._memo:
+            return self._memo[name]
+
+        station_ids = []
+        parts = str(name).split(COMBINED_NAME_SEPARATOR)
+        for part in parts:
+            key = normalize_name(part)
+            match = self.exact.get(key)
+            if match is None and key:
+                fuzzy = self.fuzzy_key(key)
+                match = self.exact[fuzzy] if fuzzy else None
+            if match is None:
+                station_ids = []
+                break
+            station_ids.extend(sid for sid in match if sid not in station_ids)
+
+        result = tuple(station_ids)
+        self._memo[name] = result
+        return result
+
+    def resolve_series(self, names):
+        """
+        Resolve a Series of names, looking up each distinct name once. Unresolved
+        names map to NaN.
+        (駅名の Series を解決します。同じ名前は1回だけ検索し、解決できない名前は NaN にします)
+        """
+        unique_names = pd.unique(names)
+        mapping = {name: (list(self.resolve(name)) or None) for name in unique_names}
+        return names.map(mapping)
+
+
+def load_station_resolver(stations_path, cache_dir=RESOLVER_CACHE_DIR, aliases=STATION_ALIASES):
+    """
+    Load a resolver for a station CSV, reusing the pickled copy from a previous
+    run when the file's content hash and the alias table are unchanged.
+    (駅CSVのリゾルバを読み込みます。ファイルのコンテンツハッシュと別名表が変わって
+    いなければ前回の実行で保存したものを再利用します)
+    """
+    content_hash = sha256_file(stations_path)
+    alias_hash = hashlib.sha256(json.dumps(aliases, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+    cache_path = os.path.join(cache_dir, f"{content_hash}-{alias_hash}-v{RESOLVER_CACHE_VERSION}.pkl")
+    if os.path.exists(cache_path):
+        try:
+            with open(cache_path, "rb") as cache_file:
+                return pickle.load(cache_file)
+        except (pickle.UnpicklingError, EOFError, AttributeError):
+            print(f"Ignoring corrupt resolver cache: {cache_path} (破損したキャッシュを無視します)")
+
+    resolver = StationNameResolver.from_station_data(pd.read_csv(stations_path), aliases)
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = f"{cache_path}.tmp"
+    with open(tmp_path, "wb") as cache_file:
+        pickle.dump(resolver, cache_file)
+    os.replace(tmp_path, cache_path)
+    return resolver
@@ -0,0 +1,215 @@
+import os
+import sys
+
+# Only the standard library is imported at startup. Stage scripts pull in
+# pandas, pyarrow, pdfplumber or BeautifulSoup at import time, so each one is
+# imported only when its subcommand runs, and status and --help never load them.
+# 起動時は標準ライブラリのみを読み込みます。各ステージのスクリプトは読み込み時に pandas・
+# pyarrow・pdfplumber・BeautifulSoup を読み込むため、そのサブコマンドの実行時にのみ
+# インポートし、status と --help では一切読み込みません。
+
+# Repository root; stage scripts use paths relative to it.
+# リポジトリのルート。ステージのスクリプトはここからの相対パスを使います。
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DB_PATH = os.path.join(ROOT, "tokyo_metro.db")
+
+PROG = "tokyo-metro"
+
+# Subcommands for scripts that are not pipeline stages: command → (module, help)
+# パイプラインのステージではないスクリプトのサブコマンド: コマンド → (モジュール, 説明)
+SCRIPT_COMMANDS = {
+    "extract-passenger": ("extract_passenger_data", "Fetch the passenger ranking page. (乗客ランキングを取得)"),
+    "scrape-archive": ("scrape_ranking_archive", "Fetch archived ranking years. (過去のランキングを取得)"),
+    "validate": ("validate_cleaned_data", "Check cleaned data against the schema. (クリーン済みデータを検証)"),
+    "serve": ("query_service", "Start the HTTP/JSON query service. (クエリサービスを起動)"),
+    "snapshot": ("snapshot_store", "Record, restore or rebuild source snapshots. (ソースのスナップショット)"),
+}
+
+# Built-in subcommands handled in this module (このモジュールで処理する組み込みサブコマンド)
+BUILTIN_COMMANDS = {
+    "run": "Run the pipeline, skipping up-to-date stages. (パイプラインを実行)",
+    "status": "Show stage and database status. (ステージとデータベースの状態を表示)",
+    "query": "Run a named query: query NAME [param=value ...] [--json] [--as-of WHEN]. (名前付きクエリを実行)",
+}
+
+
+def stage_commands():
+    """
+    Return {command: (module, help)} for every pipeline stage, named after the
+    stage with hyphens.
+    (全パイプラインステージについて {コマンド: (モジュール, 説明)} を返します。
+    コマンド名はステージ名をハイフン区切りにしたものです)
+    """
+    from run_pipeline import STAGES
+
+    commands = {}
+    for stage in STAGES:
+        module = os.path.splitext(os.path.basename(stage.script))[0]
+        after = f" (after {', '.join(stage.deps)})" if stage.deps else ""
+        commands[stage.name.replace("_", "-")] = (module, f"Stage {stage.script}{after}")
+    return commands
+
+
+def format_help(stages):
+    lines = [
+        f"usage: {PROG} COMMAND [ARGS ...]",
+        "",
+        "Tokyo Metro data pipeline. Each command's own options are shown by COMMAND --help.",
+        "(東京メトロのデータパイプライン。各コマンドのオプションは COMMAND --help で表示します)",
+        "",
+        "commands:",
+    ]
+    for title, commands in (("", BUILTIN_COMMANDS), ("stages:", stages), ("scripts:", SCRIPT_COMMANDS)):
+        if title:
+            lines.extend(["", title])
+        for name, entry in commands.items():
+            help_text = entry if isinstance(entry, str) else entry[1]
+            lines.append(f"  {name:<18} {help_text}")
+    return "\n".join(lines)
+
+
+def run_script(module_name, command, args):
+    """
+    Import a script and run its main() as if started from the repository root
+    with the given arguments.
+    (スクリプトをインポートし、リポジトリのルートから指定の引数で起動したのと同様に main() を実行します)
+    """
+    import importlib
+
+    os.chdir(ROOT)
+    sys.argv = [f"{PROG} {command}", *args]
+    return importlib.import_module(module_name).main()
+
+
+def show_status():
+    """
+    Print each stage's state and a summary of the database, without importing
+    any stage script.
+    (ステージのスクリプトを読み込まずに、各ステージの状態とデータベースの概要を表示します)
+    """
+    import sqlite3
+    import time
+
+    from run_pipeline import pipeline_status
+
+    print("Stages (ステージ):")
+    for stage, status, seconds in pipeline_status():
+        last = f"{seconds:.2f}s last run" if seconds is not None else ""
+        print(f"  {stage.name:<16} {status:<15} {last}")
+
+    if not os.path.exists(DB_PATH):
+        print(f"Database not found: {DB_PATH} (データベースが見つかりません)")
+        return
+    stat = os.stat(DB_PATH)
+    modified = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(stat.st_mtime))
+    print(f"Database (データベース): {os.path.relpath(DB_PATH, ROOT)}, "
+          f"{stat.st_size / 1024:,.0f} KiB, modified {modified}")
+    conn = sqlite3.connect(f"file:{DB_PATH}?mode=ro", uri=True)
+    try:
+        tables = [row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' ORDER BY name;"
+        )]
+        for table in tables:
+            count = conn.execute(f'SELECT COUNT(*) FROM "{table}";').fetchone()[0]
+            print(f"  {table:<24} {count:>10,} rows")
+    finally:
+        conn.close()
+
+
+def run_query(args):
+    """
+    Run one of the query service's named queries against a read-only
+    connection and print the rows; with no name, list the queries. --as-of runs
+    it against the database rebuilt from a source snapshot instead.
+    (クエリサービスの名前付きクエリを読み取り専用の接続で実行し、行を表示します。
+    名前がなければクエリの一覧を表示します。--as-of を指定するとソースのスナップショット
+    から再構築したデータベースに対して実行します)
+    """
+    import json
+    import sqlite3
+
+    from query_service import QUERIES, parse_params
+
+    as_json = "--json" in args
+    args = [arg for arg in args if arg != "--json"]
+    as_of = None
+    if "--as-of" in args:
+        index = args.index("--as-of")
+        if index + 1 >= len(args):
+            raise SystemExit("--as-of needs a snapshot id or ISO date. (--as-of にはIDまたは日付が必要です)")
+        as_of = args[index + 1]
+        args = args[:index] + args[index + 2:]
+    if not args or args[0] in ("-h", "--help"):
+        print(f"usage: {PROG} query NAME [param=value ...] [--json] [--as-of WHEN]")
+        for name, query in QUERIES.items():
+            params = ", ".join(f"{param}={default}" for param, (_, default) in query["params"].items())
+            print(f"  {name:<16} {params}")
+        return
+
+    name, pairs = args[0], args[1:]
+    if name not in QUERIES:
+        raise SystemExit(f"Unknown query: {name} (不明なクエリ: {name})")
+    raw_params = {}
+    for pair in pairs:
+        key, separator, value = pair.partition("=")
+        if not separator:
+            raise SystemExit(f"Expected param=value, got {pair!r}. (param=value の形式で指定してください)")
+        raw_params.setdefault(key, []).append(value)
+    try:
+        params = parse_params(name, raw_params)
+    except ValueError as error:
+        raise SystemExit(str(error)) from None
+
+    db_path = DB_PATH
+    if as_of is not None:
+        from snapshot_store import snapshot_database
+
+        try:
+            db_path = snapshot_database(as_of)
+        except (FileNotFoundError, ValueError, RuntimeError) as error:
+            raise SystemExit(str(error)) from None
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        cursor = conn.execute(QUERIES[name]["sql"], params)
+        columns = [column[0] for column in cursor.description]
+        rows = cursor.fetchall()
+    finally:
+        conn.close()
+
+    if as_json:
+        print(json.dumps({"query": name, "params": params, "columns": columns, "rows": rows}, ensure_ascii=False))
+        return
+    widths = [max(len(str(value)) for value in [column, *(row[i] for row in rows)]) for i, column in enumerate(columns)]
+    print("  ".join(column.ljust(width) for column, width in zip(columns, widths)))
+    for row in rows:
+        print("  ".join(str(value).ljust(width) for value, width in zip(row, widths)))
+
+
+def main(argv=None):
+    """
+    Dispatch a tokyo-metro subcommand.
+    (tokyo-metro のサブコマンドを実行します)
+    """
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if not argv or argv[0] in ("-h", "--help"):
+        print(format_help(stage_commands()))
+        return
+    command, args = argv[0], argv[1:]
+
+    if command == "status":
+        return show_status()
+    if command == "query":
+        return run_query(args)
+    if command == "run":
+        return run_script("run_pipeline", command, args)
+    if command in SCRIPT_COMMANDS:
+        return run_script(SCRIPT_COMMANDS[command][0], command, args)
+    stages = stage_commands()
+    if command in stages:
+        return run_script(stages[command][0], command, args)
+    print(format_help(stages), file=sys.stderr)
+    raise SystemExit(f"\nUnknown command: {command} (不明なコマンド: {command})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,362 @@
+import argparse
+import re
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import instrumented, span, write_json_atomic
+from parquet_io import read_cleaned_data
+
+# Default schema and cleaned inputs, the same ones import_data_to_sqlite.py loads.
+# 既定のスキーマとクリーン済み入力。import_data_to_sqlite.py が読み込むものと同じです。
+SCHEMA_PATH = "./sql/create_schema.sql"
+
+# Sample values shown per violation (違反ごとに表示するサンプル値の数)
+SAMPLE_SIZE = 5
+
+CREATE_TABLE = re.compile(r"CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?(\w+)\s*\((.*)\)", re.IGNORECASE | re.DOTALL)
+TABLE_PRIMARY_KEY = re.compile(r"PRIMARY\s+KEY\s*\(([^)]*)\)", re.IGNORECASE)
+TABLE_FOREIGN_KEY = re.compile(
+    r"FOREIGN\s+KEY\s*\(([^)]*)\)\s*REFERENCES\s+(\w+)\s*\(([^)]*)\)", re.IGNORECASE
+)
+TABLE_UNIQUE = re.compile(r"UNIQUE\s*\(([^)]*)\)", re.IGNORECASE)
+COLUMN_REFERENCES = re.compile(r"REFERENCES\s+(\w+)\s*\(([^)]*)\)", re.IGNORECASE)
+TYPEOF_CHECK = re.compile(r"CHECK\s*\(\s*typeof\s*\(\s*\w+\s*\)\s*=\s*'(\w+)'\s*\)", re.IGNORECASE)
+CONSTRAINT_KEYWORDS = ("PRIMARY", "FOREIGN", "UNIQUE", "CHECK", "CONSTRAINT")
+
+
+def split_columns(names):
+    return [name.strip().strip('"') for name in names.split(",") if name.strip()]
+
+
+def split_definitions(body):
+    """
+    Split a CREATE TABLE body at top-level commas.
+    (CREATE TABLE の本体をトップレベルのカンマで分割します)
+    """
+    parts, depth, current = [], 0, ""
+    for char in body:
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        if char == "," and depth == 0:
+            parts.append(current.strip())
+            current = ""
+        else:
+            current += char
+    if current.strip():
+        parts.append(current.strip())
+    return parts
+
+
+def column_affinity(declared_type):
+    """
+    Return SQLite's type affinity for a declared column type.
+    (宣言された列型に対する SQLite の型アフィニティを返します)
+    """
+    declared = declared_type.upper()
+    if "INT" in declared:
+        return "INTEGER"
+    if any(word in declared for word in ("CHAR", "CLOB", "TEXT")):
+        return "TEXT"
+    if any(word in declared for word in ("REAL", "FLOA", "DOUB")):
+        return "REAL"
+    return "NUMERIC" if declared else "BLOB"
+
+
+class TableSpec:
+    """
+    Constraints of one table as declared in create_schema.sql.
+    (create_schema.sql で宣言された1テーブル分の制約)
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.columns = []
+        self.affinity = {}
+        self.not_null = set()
+        self.strict_types = {}
+        self.primary_key = []
+        self.unique_keys = []
+        self.foreign_keys = []
+
+    @classmethod
+    def from_statement(cls, statement):
+        match = CREATE_TABLE.search(statement)
+        spec = cls(match.group(1))
+        for definition in split_definitions(match.group(2)):
+            upper = definition.upper()
+            if upper.startswith(CONSTRAINT_KEYWORDS):
+                primary = TABLE_PRIMARY_KEY.search(definition)
+                if upper.startswith("PRIMARY") and primary:
+                    spec.primary_key = split_columns(primary.group(1))
+                elif upper.startswith("UNIQUE"):
+                    spec.unique_keys.append(split_columns(TABLE_UNIQUE.search(definition).group(1)))
+                for columns, parent, parent_columns in TABLE_FOREIGN_KEY.findall(definition):
+                    spec.foreign_keys.append((split_columns(columns), parent, split_columns(parent_columns)))
+                continue
+
+            name, _, rest = definition.partition(" ")
+            name = name.strip('"')
+            declared_type = re.split(r"\s+(?:NOT|NULL|PRIMARY|UNIQUE|CHECK|DEFAULT|REFERENCES)\b",
+                                     rest, maxsplit=1, flags=re.IGNORECASE)[0].strip()
+            spec.columns.append(name)
+            spec.affinity[name] = column_affinity(declared_type)
+            if "NOT NULL" in upper:
+                spec.not_null.add(name)
+            if "PRIMARY KEY" in upper:
+                spec.primary_key = [name]
+            if re.search(r"\bUNIQUE\b", upper):
+                spec.unique_keys.append([name])
+            typeof = TYPEOF_CHECK.search(definition)
+            if typeof:
+                spec.strict_types[name] = typeof.group(1).lower()
+            reference = COLUMN_REFERENCES.search(definition)
+            if reference:
+                spec.foreign_keys.append(([name], reference.group(1), split_columns(reference.group(2))))
+
+        # Primary key columns can never hold NULL in the loaded data.
+        # 主キーの列は読み込むデータで NULL を持てません。
+        spec.not_null.update(spec.primary_key)
+        return spec
+
+
+def parse_schema(schema_sql):
+    """
+    Return {table name: TableSpec} for every CREATE TABLE in a schema script.
+    (スキーマスクリプト内の全 CREATE TABLE について {テーブル名: TableSpec} を返します)
+    """
+    specs = {}
+    for statement in re.split(r";\s*(?:\n|$)", re.sub(r"--[^\n]*", "", schema_sql)):
+        if CREATE_TABLE.search(statement):
+            spec = TableSpec.from_statement(statement)
+            specs[spec.name] = spec
+    return specs
+
+
+def load_schema_specs(schema_path=SCHEMA_PATH):
+    if not Path(schema_path).exists():
+        raise FileNotFoundError(f"Schema file not found: {schema_path} (スキーマファイルが見つかりません: {schema_path})")
+    with open(schema_path, "r", encoding="utf-8") as file:
+        return parse_schema(file.read())
+
+
+def violation(table, check, columns, mask, frame):
+    """
+    Describe the rows flagged by a boolean mask as one report entry, or
+    return None when no row is flagged.
+    (真偽値マスクで示された行を1件の報告にまとめます。該当行がなければ None)
+    """
+    count = int(mask.sum())
+    if count == 0:
+        return None
+    samples = frame.loc[mask, columns].drop_duplicates().head(SAMPLE_SIZE)
+    return {
+        "table": table,
+        "check": check,
+        "columns": list(columns),
+        "rows": count,
+        "samples": [
+            {column: (None if pd.isna(value) else str(value)) for column, value in row.items()}
+            for row in samples.to_dict("records")
+        ],
+    }
+
+
+def type_mask(series, affinity, strict_type):
+    """
+    Flag non-null values that would not be stored as the declared type:
+    non-numeric text in INTEGER/REAL columns and fractions in INTEGER columns.
+    (宣言された型として保存されない非NULL値を検出します。INTEGER/REAL 列の
+    数値でない文字列と、INTEGER 列の小数が対象です)
+    """
+    expected = strict_type.upper() if strict_type else affinity
+    if expected not in ("INTEGER", "REAL"):
+        return pd.Series(False, index=series.index)
+    present = series.notna()
+    numeric = series if pd.api.types.is_numeric_dtype(series) else pd.to_numeric(series, errors="coerce")
+    bad = present & numeric.isna()
+    if expected == "INTEGER" and not pd.api.types.is_integer_dtype(numeric):
+        bad |= present & numeric.notna() & (numeric % 1 != 0)
+    return bad
+
+
+def key_membership(frame, columns, parent, parent_columns):
+    """
+    Return a boolean array that is True where a row's key appears in the
+    parent's key columns. Both sides are factorized together into integer
+    codes, one hash pass per column, and composite keys are combined into one
+    code before an integer set test.
+    (行のキーが親テーブルのキー列に存在する位置が True の真偽値配列を返します。両側を列ごとに
+    1回のハッシュ処理でまとめて整数コードに変換し、複合キーは1つのコードに結合してから
+    整数の集合判定を行います)
+    """
+    child_codes = np.zeros(len(frame), dtype=np.int64)
+    parent_codes = np.zeros(len(parent), dtype=np.int64)
+    for column, parent_column in zip(columns, parent_columns):
+        codes, uniques = pd.factorize(
+            pd.concat([parent[parent_column], frame[column]], ignore_index=True).astype(object)
+        )
+        radix = len(uniques) + 1
+        parent_codes = parent_codes * radix + codes[:len(parent)]
+        child_codes = child_codes * radix + codes[len(parent):]
+    return np.isin(child_codes, parent_codes)
+
+
+def check_table(spec, frame, parents, table_keys=None):
+    """
+    Run every constraint of one table against its cleaned rows.
+    (1テーブルの全ての制約をクリーン済みの行に対して検証します)
+    Returns:
+        list: Violation entries (違反の一覧)
+    """
+    found = []
+    missing = [column for column in spec.columns if column not in frame.columns]
+    if missing:
+        return [{"table": spec.name, "check": "missing_columns", "columns": missing, "rows": len(frame), "samples": []}]
+
+    for column in spec.columns:
+        if column in spec.not_null:
+            found.append(violation(spec.name, "not_null", [column], frame[column].isna(), frame))
+        found.append(violation(spec.name, "type", [column],
+                               type_mask(frame[column], spec.affinity[column], spec.strict_types.get(column)), frame))
+
+    keys = [spec.primary_key] if spec.primary_key else []
+    if not keys and table_keys:
+        keys = [table_keys]
+    for key in keys + spec.unique_keys:
+        if key is spec.primary_key:
+            check = "primary_key"
+        elif key is table_keys:
+            check = "business_key"
+        else:
+            check = "unique"
+        found.append(violation(spec.name, check, key, frame.duplicated(subset=key, keep=False), frame))
+
+    for columns, parent, parent_columns in spec.foreign_keys:
+        if parent not in parents or any(column not in parents[parent].columns for column in parent_columns):
+            continue
+        present = frame[columns].notna().all(axis=1)
+        unmatched = present & ~key_membership(frame, columns, parents[parent], parent_columns)
+        found.append(violation(spec.name, f"foreign_key -> {parent}({', '.join(parent_columns)})",
+                               columns, unmatched, frame))
+
+    return [entry for entry in found if entry is not None]
+
+
+def read_table_frame(spec, path, filters=None):
+    """
+    Read a table's cleaned source with its columns renamed to the schema's
+    spelling (cleaned files may use another case).
+    (テーブルのクリーン済みデータを読み込み、列名をスキーマの表記に揃えます。
+    クリーン済みファイルは大文字小文字が異なる場合があります)
+    """
+    if not Path(path).exists():
+        raise FileNotFoundError(f"CSV file not found: {path} (CSVファイルが見つかりません: {path})")
+    frame = read_cleaned_data(path, columns=spec.columns, filters=filters)
+    by_lower = {column.lower(): column for column in spec.columns}
+    return frame.rename(columns={column: by_lower[column.lower()] for column in frame.columns})
+
+
+def validate_cleaned_tables(table_loads, schema_path=SCHEMA_PATH, filters_for=None, table_keys=None):
+    """
+    Check the cleaned inputs of every loaded table against the constraints in
+    the schema before anything is written to SQLite: NOT NULL, column types,
+    primary-key and UNIQUE uniqueness, and foreign-key membership against the
+    parent table's cleaned rows. All checks are vectorized hash lookups over
+    whole columns.
+    (SQLite に書き込む前に、読み込む全テーブルのクリーン済み入力をスキーマの制約で検証します:
+    NOT NULL・列の型・主キーと UNIQUE の一意性・親テーブルのクリーン済み行に対する外部キーの
+    所属。全ての検証は列全体に対するベクトル化されたハッシュ検索です)
+
+    table_keys supplies business keys for tables without a declared primary key.
+    (table_keys は主キーが宣言されていないテーブルの業務キーです)
+    Returns:
+        dict: Report with per-table row counts, violations and elapsed seconds
+    """
+    start = time.perf_counter()
+    specs = load_schema_specs(schema_path)
+    frames = {}
+    for table_name, path in table_loads:
+        if table_name not in specs:
+            raise ValueError(f"Table not in schema: {table_name} (スキーマにないテーブル: {table_name})")
+        with span(f"read_{table_name}") as step:
+            filters = filters_for(path) if filters_for else None
+            frames[table_name] = read_table_frame(specs[table_name], path, filters)
+            step.add_rows_out(len(frames[table_name]))
+
+    violations = []
+    for table_name, frame in frames.items():
+        with span(f"check_{table_name}") as step:
+            step.add_rows_in(len(frame))
+            found = check_table(specs[table_name], frame, frames, (table_keys or {}).get(table_name))
+            step.set(violations=len(found))
+            violations.extend(found)
+
+    return {
+        "schema": schema_path,
+        "tables": {table_name: len(frame) for table_name, frame in frames.items()},
+        "violations": violations,
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+
+
+def format_report(report):
+    """
+    Format a validation report as printable lines.
+    (検証レポートを表示用の行に整形します)
+    """
+    rows = sum(report["tables"].values())
+    lines = [f"Validated {rows} rows in {len(report['tables'])} tables in {report['seconds']:.3f}s. "
+             f"({len(report['tables'])}テーブル・{rows}行を検証しました)"]
+    if not report["violations"]:
+        lines.append("No constraint violations found. (制約違反はありません)")
+    for entry in report["violations"]:
+        lines.append(f"- {entry['table']}: {entry['check']} on {', '.join(entry['columns'])}: "
+                     f"{entry['rows']} rows (行), e.g. {entry['samples']}")
+    return lines
+
+
+def ensure_valid(report):
+    """
+    Raise ValueError listing every violation if the report has any.
+    (レポートに違反があれば、全ての違反を列挙した ValueError を送出します)
+    """
+    if report["violations"]:
+        raise ValueError(
+            "Cleaned data violates the schema; nothing was loaded. (クリーン済みデータがスキーマに違反しているため、"
+            "読み込みを中止しました)\n" + "\n".join(format_report(report)[1:])
+        )
+
+
+@instrumented("validate")
+def main():
+    """
+    Validate the cleaned tables against create_schema.sql and print one report.
+    (クリーン済みテーブルを create_schema.sql で検証し、1つのレポートを表示します)
+    """
+    from import_data_to_sqlite import PARQUET_TABLE_LOADS, TABLE_KEYS, TABLE_LOADS, source_filters
+
+    parser = argparse.ArgumentParser(
+        description="Validate cleaned data against the schema. (クリーン済みデータをスキーマで検証します)"
+    )
+    parser.add_argument("--source", choices=["csv", "parquet"], default="csv",
+                        help="Validate the cleaned CSVs or the cleaned Parquet outputs. (検証対象のCSVまたはParquet)")
+    parser.add_argument("--report", help="Also write the report as JSON to this path. (レポートをJSONでも書き出すパス)")
+    args = parser.parse_args()
+
+    table_loads = PARQUET_TABLE_LOADS if args.source == "parquet" else TABLE_LOADS
+    report = validate_cleaned_tables(table_loads, SCHEMA_PATH, source_filters, TABLE_KEYS)
+    for line in format_report(report):
+        print(line)
+    if args.report:
+        write_json_atomic(args.report, report)
+    if report["violations"]:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,13 @@
 -- =========================================================
 -- Tokyo Metro Data Pipeline - Business Validation Queries
 -- 東京メトロ データパイプライン - ビジネス検証クエリ
+--
+-- Queries read the summary tables kept current by import_data_to_sqlite.py
+-- (see create_schema.sql), so each is an indexed lookup rather than a full join.
+-- Line names come from Lines through its Line_ID primary key.
+-- 各クエリは import_data_to_sqlite.py が更新するサマリーテーブル（create_schema.sql 参照）を
+-- 参照するため、全件結合ではなくインデックス参照になります。
+-- 路線名は Lines の主キー Line_ID で結合して取得します。
 -- =========================================================
 
 -- クエリ1: 路線別の乗客需要ランキング
@@ -10,20 +17,16 @@
 -- Business Question: Which lines carry the highest passenger demand?
 --
 SELECT
-    s.Line_Names_Jp || ' - ' || s.Line_Names_En AS line_name,
-    COUNT(DISTINCT p.Station_ID) AS station_count,
-    SUM(CAST(REPLACE(p.Daily_Passenger_Avg, ',', '') AS INTEGER)) AS total_daily_passengers,
+    l.Line_Name_Jp || ' - ' || l.Line_Name_En AS line_name,
+    s.Station_Count AS station_count,
+    s.Total_Daily_Passengers AS total_daily_passengers,
     ROUND(
-        SUM(CAST(REPLACE(p.Daily_Passenger_Avg, ',', '') AS INTEGER)) 
-        / COUNT(DISTINCT p.Station_ID),
+        s.Total_Daily_Passengers
+        / s.Station_Count,
         0
     ) AS avg_passengers_per_station
-FROM Passengers p
-JOIN Stations s
-    ON p.Station_ID = s.Station_ID
-GROUP BY
-    s.Line_Names_Jp,
-    s.Line_Names_En
+FROM LineDemandSummary s
+JOIN Lines l ON l.Line_ID = s.Line_ID
 ORDER BY
     total_daily_passengers DESC;
 
@@ -35,16 +38,11 @@ ORDER BY
 -- Business Question: Which stations should be prioritized for operations, staffing, and passenger experience?
 --
 SELECT
-    p.English_Name AS station_name,
-    s.Line_Names_En || ' (' || s.Line_Names_Jp || ')' AS line,
-    SUM(CAST(REPLACE(p.Daily_Passenger_Avg, ',', '') AS INTEGER)) AS total_daily_passengers
-FROM Passengers p
-JOIN Stations s
-    ON p.Station_ID = s.Station_ID
-GROUP BY
-    p.English_Name,
-    s.Line_Names_En,
-    s.Line_Names_Jp
+    s.English_Name AS station_name,
+    l.Line_Name_En || ' (' || l.Line_Name_Jp || ')' AS line,
+    s.Total_Daily_Passengers AS total_daily_passengers
+FROM StationRankingSummary s
+JOIN Lines l ON l.Line_ID = s.Line_ID
 ORDER BY
     total_daily_passengers DESC
 LIMIT 10;
@@ -58,11 +56,9 @@ LIMIT 10;
 --
 SELECT
     Fiscal_Year,
-    SUM(Total_Revenue) AS annual_total_revenue_million_yen,
-    ROUND(AVG(Total_YoY_Percentage), 1) AS avg_yoy_growth_percentage
-FROM Revenue
-GROUP BY
-    Fiscal_Year
+    Total_Revenue AS annual_total_revenue_million_yen,
+    ROUND(Avg_Total_YoY_Percentage, 1) AS avg_yoy_growth_percentage
+FROM RevenueYearSummary
 ORDER BY
     Fiscal_Year;
 
@@ -75,19 +71,17 @@ ORDER BY
 --
 SELECT
     Fiscal_Year,
-    SUM(Commuter_Revenue) AS commuter_revenue_million_yen,
-    SUM(Non_Commuter_Revenue) AS non_commuter_revenue_million_yen,
-    SUM(Total_Revenue) AS total_revenue_million_yen,
+    Commuter_Revenue AS commuter_revenue_million_yen,
+    Non_Commuter_Revenue AS non_commuter_revenue_million_yen,
+    Total_Revenue AS total_revenue_million_yen,
     ROUND(
-        100.0 * SUM(Commuter_Revenue) / SUM(Total_Revenue),
+        100.0 * Commuter_Revenue / Total_Revenue,
         1
     ) AS commuter_share_percentage,
     ROUND(
-        100.0 * SUM(Non_Commuter_Revenue) / SUM(Total_Revenue),
+        100.0 * Non_Commuter_Revenue / Total_Revenue,
         1
     ) AS non_commuter_share_percentage
-FROM Revenue
-GROUP BY
-    Fiscal_Year
+FROM RevenueYearSummary
 ORDER BY
     Fiscal_Year;
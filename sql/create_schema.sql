@@ -9,24 +9,31 @@ CREATE TABLE Lines (
 CREATE TABLE Stations (
     Station_ID TEXT PRIMARY KEY,
     English_Name TEXT NOT NULL,
-    Japanese_Name TEXT NOT NULL,
-    Line_IDs TEXT NOT NULL,
-    Line_Names_En TEXT,
-    Line_Names_Jp TEXT,
-    FOREIGN KEY (Line_IDs) REFERENCES Lines (Line_ID)
+    Japanese_Name TEXT NOT NULL
 );
 
+-- Create StationLines table (one row per station-line membership)
+-- 駅と路線の所属関係（所属ごとに1行）
+CREATE TABLE StationLines (
+    Station_ID TEXT NOT NULL,
+    Line_ID TEXT NOT NULL,
+    PRIMARY KEY (Station_ID, Line_ID),
+    FOREIGN KEY (Station_ID) REFERENCES Stations (Station_ID),
+    FOREIGN KEY (Line_ID) REFERENCES Lines (Line_ID)
+) WITHOUT ROWID;
+
 -- Create Passengers table
 CREATE TABLE Passengers (
     Station_ID TEXT NOT NULL,
     English_Name TEXT,
-    Daily_Passenger_Avg INTEGER NOT NULL,
-    Year_Over_Year_Change REAL NOT NULL,
-    PRIMARY KEY (Station_ID, Daily_Passenger_Avg),
+    Daily_Passenger_Avg INTEGER NOT NULL CHECK (typeof(Daily_Passenger_Avg) = 'integer'),
+    Year_Over_Year_Change REAL NOT NULL CHECK (typeof(Year_Over_Year_Change) = 'real'),
+    PRIMARY KEY (Station_ID),
     FOREIGN KEY (Station_ID) REFERENCES Stations (Station_ID)
 );
 
--- Create Revenue table
+-- Create Revenue table (one row per fiscal month; the key is also the incremental sync key)
+-- 会計月ごとに1行。キーは増分同期のキーでもあります
 CREATE TABLE Revenue (
     Fiscal_Year INTEGER NOT NULL,
     Fiscal_Month INTEGER NOT NULL,
@@ -37,5 +44,208 @@ CREATE TABLE Revenue (
     Non_Commuter_Revenue INTEGER NOT NULL,
     Non_Commuter_YoY_Percentage REAL NOT NULL,
     Total_Revenue INTEGER NOT NULL,
-    Total_YoY_Percentage REAL NOT NULL
+    Total_YoY_Percentage REAL NOT NULL,
+    PRIMARY KEY (Fiscal_Year, Fiscal_Month)
+);
+
+-- Create ODMatrix table (populated by build_od_matrix.py)
+CREATE TABLE ODMatrix (
+    Origin_ID TEXT NOT NULL,
+    Destination_ID TEXT NOT NULL,
+    Distance_Km REAL NOT NULL,
+    Hops INTEGER NOT NULL,
+    Transfers INTEGER NOT NULL,
+    PRIMARY KEY (Origin_ID, Destination_ID)
+) WITHOUT ROWID;
+
+-- Create StationCentrality table (populated by build_centrality.py)
+-- 駅の構造的なハブ指標（build_centrality.py が作成）
+CREATE TABLE StationCentrality (
+    Station_ID TEXT PRIMARY KEY,
+    Betweenness REAL NOT NULL,
+    Closeness REAL NOT NULL,
+    Degree INTEGER NOT NULL,
+    Transfer_Degree INTEGER NOT NULL,
+    Hub_Rank INTEGER NOT NULL
+);
+
+-- Create DisruptionImpact table (populated by disruption_scenarios.py)
+-- 閉鎖シナリオごとの乗客影響（disruption_scenarios.py が作成）
+CREATE TABLE DisruptionImpact (
+    Scenario TEXT PRIMARY KEY,
+    Closed_Stations TEXT NOT NULL,
+    Closed_Segments TEXT NOT NULL,
+    Penalized_Segments TEXT NOT NULL,
+    Trees_Repaired INTEGER NOT NULL,
+    Paths_Recomputed INTEGER NOT NULL,
+    Pairs_Longer INTEGER NOT NULL,
+    Pairs_Disconnected INTEGER NOT NULL,
+    Affected_Trips REAL NOT NULL,
+    Extra_Trip_Minutes REAL NOT NULL,
+    Avg_Extra_Minutes REAL NOT NULL,
+    Max_Extra_Minutes REAL NOT NULL,
+    Unserved_Trips REAL NOT NULL,
+    Impact_Rank INTEGER NOT NULL
+);
+
+-- Create SegmentLoad table (populated by build_segment_load.py)
+-- 方向別区間ごとの配分乗客数（build_segment_load.py が作成）
+CREATE TABLE SegmentLoad (
+    Snapshot_Year INTEGER NOT NULL,
+    From_Station_ID TEXT NOT NULL,
+    To_Station_ID TEXT NOT NULL,
+    Transition_Type TEXT NOT NULL,
+    Distance_km REAL NOT NULL,
+    Duration_min REAL NOT NULL,
+    Daily_Load REAL NOT NULL,
+    Load_Share REAL NOT NULL,
+    Load_Rank INTEGER NOT NULL,
+    PRIMARY KEY (Snapshot_Year, From_Station_ID, To_Station_ID)
+);
+
+-- Create Isochrones and ReachabilitySummary tables (populated by reachability.py)
+-- 始点ごとの等時圏と到達駅数（reachability.py が作成）
+CREATE TABLE Isochrones (
+    Metric TEXT NOT NULL,
+    Origin_ID TEXT NOT NULL,
+    Station_ID TEXT NOT NULL,
+    Band REAL NOT NULL,
+    PRIMARY KEY (Metric, Origin_ID, Station_ID)
+) WITHOUT ROWID;
+
+CREATE TABLE ReachabilitySummary (
+    Metric TEXT NOT NULL,
+    Threshold REAL NOT NULL,
+    Origin_ID TEXT NOT NULL,
+    Reachable_Stations INTEGER NOT NULL,
+    PRIMARY KEY (Metric, Threshold, Origin_ID)
+);
+
+-- =========================================================
+-- Indexes / インデックス
+-- =========================================================
+
+-- Covering index for per-station passenger lookups and summary refreshes
+-- 駅単位の乗客参照とサマリー更新のためのカバリングインデックス
+CREATE INDEX idx_passengers_station ON Passengers (Station_ID, English_Name, Daily_Passenger_Avg);
+
+-- Stations on a line, for line-level joins (路線単位の結合のための路線別駅一覧)
+CREATE INDEX idx_station_lines_line ON StationLines (Line_ID, Station_ID);
+
+-- =========================================================
+-- Summary tables (maintained by import_data_to_sqlite.py)
+-- サマリーテーブル（import_data_to_sqlite.py が更新）
+-- =========================================================
+
+-- Passenger demand by line (路線別の乗客需要)
+CREATE TABLE LineDemandSummary (
+    Line_ID TEXT PRIMARY KEY,
+    Station_Count INTEGER NOT NULL,
+    Total_Daily_Passengers INTEGER NOT NULL
 );
+
+CREATE INDEX idx_line_demand_total ON LineDemandSummary (Total_Daily_Passengers DESC);
+
+-- Passenger demand by station name and line (駅名・路線別の乗客需要)
+CREATE TABLE StationRankingSummary (
+    English_Name TEXT,
+    Line_ID TEXT,
+    Total_Daily_Passengers INTEGER NOT NULL,
+    PRIMARY KEY (English_Name, Line_ID)
+);
+
+CREATE INDEX idx_station_ranking_total ON StationRankingSummary (Total_Daily_Passengers DESC);
+
+-- Revenue totals and mix by fiscal year (会計年度別の収益合計と構成)
+CREATE TABLE RevenueYearSummary (
+    Fiscal_Year INTEGER PRIMARY KEY,
+    Month_Count INTEGER NOT NULL,
+    Commuter_Revenue INTEGER NOT NULL,
+    Non_Commuter_Revenue INTEGER NOT NULL,
+    Total_Revenue INTEGER NOT NULL,
+    Avg_Total_YoY_Percentage REAL NOT NULL
+);
+
+-- Groups whose summary rows are stale. The triggers below record every group a
+-- row change touches; refresh_summary_tables() recomputes only those groups.
+-- サマリーが古くなったグループ。下のトリガーが行の変更で影響を受けるグループを記録し、
+-- refresh_summary_tables() はそのグループのみを再計算します。
+CREATE TABLE DirtyLineGroups (
+    Line_ID TEXT PRIMARY KEY
+);
+
+CREATE TABLE DirtyStationGroups (
+    English_Name TEXT,
+    Line_ID TEXT,
+    UNIQUE (English_Name, Line_ID)
+);
+
+CREATE TABLE DirtyFiscalYears (
+    Fiscal_Year INTEGER PRIMARY KEY
+);
+
+CREATE TRIGGER trg_passengers_insert AFTER INSERT ON Passengers
+BEGIN
+    INSERT OR IGNORE INTO DirtyLineGroups
+        SELECT Line_ID FROM StationLines WHERE Station_ID = NEW.Station_ID;
+    INSERT OR IGNORE INTO DirtyStationGroups
+        SELECT NEW.English_Name, Line_ID FROM StationLines WHERE Station_ID = NEW.Station_ID;
+END;
+
+CREATE TRIGGER trg_passengers_update AFTER UPDATE ON Passengers
+BEGIN
+    INSERT OR IGNORE INTO DirtyLineGroups
+        SELECT Line_ID FROM StationLines WHERE Station_ID IN (OLD.Station_ID, NEW.Station_ID);
+    INSERT OR IGNORE INTO DirtyStationGroups
+        SELECT OLD.English_Name, Line_ID FROM StationLines WHERE Station_ID = OLD.Station_ID;
+    INSERT OR IGNORE INTO DirtyStationGroups
+        SELECT NEW.English_Name, Line_ID FROM StationLines WHERE Station_ID = NEW.Station_ID;
+END;
+
+CREATE TRIGGER trg_passengers_delete AFTER DELETE ON Passengers
+BEGIN
+    INSERT OR IGNORE INTO DirtyLineGroups
+        SELECT Line_ID FROM StationLines WHERE Station_ID = OLD.Station_ID;
+    INSERT OR IGNORE INTO DirtyStationGroups
+        SELECT OLD.English_Name, Line_ID FROM StationLines WHERE Station_ID = OLD.Station_ID;
+END;
+
+CREATE TRIGGER trg_station_lines_insert AFTER INSERT ON StationLines
+BEGIN
+    INSERT OR IGNORE INTO DirtyLineGroups VALUES (NEW.Line_ID);
+    INSERT OR IGNORE INTO DirtyStationGroups
+        SELECT English_Name, NEW.Line_ID FROM Passengers WHERE Station_ID = NEW.Station_ID;
+END;
+
+CREATE TRIGGER trg_station_lines_update AFTER UPDATE ON StationLines
+BEGIN
+    INSERT OR IGNORE INTO DirtyLineGroups VALUES (OLD.Line_ID);
+    INSERT OR IGNORE INTO DirtyLineGroups VALUES (NEW.Line_ID);
+    INSERT OR IGNORE INTO DirtyStationGroups
+        SELECT English_Name, OLD.Line_ID FROM Passengers WHERE Station_ID = OLD.Station_ID;
+    INSERT OR IGNORE INTO DirtyStationGroups
+        SELECT English_Name, NEW.Line_ID FROM Passengers WHERE Station_ID = NEW.Station_ID;
+END;
+
+CREATE TRIGGER trg_station_lines_delete AFTER DELETE ON StationLines
+BEGIN
+    INSERT OR IGNORE INTO DirtyLineGroups VALUES (OLD.Line_ID);
+    INSERT OR IGNORE INTO DirtyStationGroups
+        SELECT English_Name, OLD.Line_ID FROM Passengers WHERE Station_ID = OLD.Station_ID;
+END;
+
+CREATE TRIGGER trg_revenue_insert AFTER INSERT ON Revenue
+BEGIN
+    INSERT OR IGNORE INTO DirtyFiscalYears VALUES (NEW.Fiscal_Year);
+END;
+
+CREATE TRIGGER trg_revenue_update AFTER UPDATE ON Revenue
+BEGIN
+    INSERT OR IGNORE INTO DirtyFiscalYears VALUES (OLD.Fiscal_Year);
+    INSERT OR IGNORE INTO DirtyFiscalYears VALUES (NEW.Fiscal_Year);
+END;
+
+CREATE TRIGGER trg_revenue_delete AFTER DELETE ON Revenue
+BEGIN
+    INSERT OR IGNORE INTO DirtyFiscalYears VALUES (OLD.Fiscal_Year);
+END;